@@ -0,0 +1,213 @@
+"""
+Per-tenant fair admission of expensive operations.
+
+Cluster create, scale, suspend, resume and delete fan out into many
+Kubernetes calls. Admission runs as middleware in front of them: at most
+ADMISSION_MAX_CONCURRENCY of them run at once in a process, and at most
+ADMISSION_TENANT_CONCURRENCY for any one tenant (bearer token). Requests
+beyond that wait in a weighted fair queue: each tenant's requests get
+virtual finish tags that grow by the operation's cost, and a free slot goes to
+the waiting request with the smallest tag whose tenant is below its cap. A
+tenant with hundreds of queued operations therefore delays other tenants by
+at most one operation each.
+
+Load is shed early rather than queued: when the expected wait, estimated
+from measured operation durations, exceeds ADMISSION_TARGET_WAIT_SECONDS, or
+a request has waited that long, it is answered with 429 and Retry-After.
+Cheap requests such as GETs are never queued. Limits are per API process.
+"""
+import asyncio
+import itertools
+import math
+import time
+from typing import Dict, List, Optional
+
+from fastapi.routing import APIRoute
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+from app.config import settings
+from app.metrics import ADMISSION_QUEUED, ADMISSION_SHED, ADMISSION_WAIT
+from app.tokens import bearer_token, hash_token
+
+# Weight of the duration estimates already measured against a new sample
+SERVICE_TIME_DECAY = 0.8
+
+
+class Overloaded(Exception):
+    """An expensive operation was shed instead of queued"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Too many operations in progress, retry later")
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class _Waiter:
+    __slots__ = ("tenant", "operation", "start_tag", "finish_tag", "seq", "future")
+
+    def __init__(self, tenant: str, operation: str, start_tag: float, finish_tag: float, seq: int):
+        self.tenant = tenant
+        self.operation = operation
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.future: Optional[asyncio.Future] = None
+
+
+class FairAdmission:
+    """Concurrency limits with weighted fair queueing across tenants"""
+
+    def __init__(self, capacity: int, tenant_capacity: int, target_wait: float, costs: Dict[str, float]):
+        self.capacity = capacity
+        self.tenant_capacity = tenant_capacity
+        self.target_wait = target_wait
+        self.costs = costs
+        self.in_flight = 0
+        self._tenant_in_flight: Dict[str, int] = {}
+        self._finish_tags: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        # Estimated duration of each operation, refined as operations complete
+        self._service_time: Dict[str, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def operation(self, request: Request) -> Optional[str]:
+        """Name of the expensive route a request is for, None for anything else"""
+        if request.method in ("GET", "HEAD", "OPTIONS"):
+            return None
+        for route in request.app.routes:
+            if isinstance(route, APIRoute) and route.name in self.costs:
+                match, _ = route.matches(request.scope)
+                if match == Match.FULL:
+                    return route.name
+        return None
+
+    def service_time(self, operation: str) -> float:
+        return self._service_time.get(operation, self.costs[operation])
+
+    def expected_wait(self, tenant: str, finish_tag: float) -> float:
+        """Seconds until a request with finish_tag would likely be admitted"""
+        ahead = sum(self.service_time(w.operation) for w in self._queue if w.finish_tag <= finish_tag)
+        own = sum(self.service_time(w.operation) for w in self._queue if w.tenant == tenant)
+        return max(ahead / self.capacity, own / self.tenant_capacity)
+
+    def _can_run(self, tenant: str) -> bool:
+        return self.in_flight < self.capacity and self._tenant_in_flight.get(tenant, 0) < self.tenant_capacity
+
+    def _start(self, tenant: str):
+        self.in_flight += 1
+        self._tenant_in_flight[tenant] = self._tenant_in_flight.get(tenant, 0) + 1
+
+    async def acquire(self, tenant: str, operation: str):
+        """Wait for a slot, raising Overloaded when the wait would exceed the target"""
+        start_tag = max(self._virtual_time, self._finish_tags.get(tenant, 0.0))
+        finish_tag = start_tag + self.costs[operation]
+        waiter = _Waiter(tenant, operation, start_tag, finish_tag, next(self._seq))
+        waiter.future = asyncio.get_running_loop().create_future()
+        self._queue.append(waiter)
+        self._dispatch()
+        if waiter.future.done():
+            self._finish_tags[tenant] = finish_tag
+            ADMISSION_WAIT.labels(operation=operation).observe(0)
+            return
+
+        expected = self.expected_wait(tenant, finish_tag)
+        if expected > self.target_wait:
+            self._queue.remove(waiter)
+            ADMISSION_QUEUED.set(len(self._queue))
+            ADMISSION_SHED.labels(operation=operation).inc()
+            raise Overloaded(expected)
+
+        self._finish_tags[tenant] = finish_tag
+        enqueued = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.target_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as the wait ended; give the slot back
+                self.release(tenant, operation, None)
+            else:
+                waiter.future.cancel()
+                self._queue.remove(waiter)
+                ADMISSION_QUEUED.set(len(self._queue))
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            ADMISSION_SHED.labels(operation=operation).inc()
+            raise Overloaded(self.expected_wait(tenant, finish_tag)) from None
+        ADMISSION_WAIT.labels(operation=operation).observe(time.monotonic() - enqueued)
+
+    def release(self, tenant: str, operation: str, duration: Optional[float]):
+        """Free a slot and hand it to the next eligible waiter"""
+        if duration is not None:
+            previous = self._service_time.get(operation)
+            self._service_time[operation] = duration if previous is None else (
+                SERVICE_TIME_DECAY * previous + (1 - SERVICE_TIME_DECAY) * duration
+            )
+        self.in_flight -= 1
+        remaining = self._tenant_in_flight[tenant] - 1
+        if remaining:
+            self._tenant_in_flight[tenant] = remaining
+        else:
+            del self._tenant_in_flight[tenant]
+        self._dispatch()
+        if tenant not in self._tenant_in_flight and self._finish_tags.get(tenant, 0.0) <= self._virtual_time:
+            self._finish_tags.pop(tenant, None)
+
+    def _dispatch(self):
+        while self.in_flight < self.capacity:
+            eligible = [w for w in self._queue if self._can_run(w.tenant)]
+            if not eligible:
+                break
+            waiter = min(eligible, key=lambda w: (w.finish_tag, w.seq))
+            self._queue.remove(waiter)
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            self._start(waiter.tenant)
+            waiter.future.set_result(None)
+        ADMISSION_QUEUED.set(len(self._queue))
+
+    async def run(self, request: Request, call_next):
+        """Call the rest of the app for a request, after admission if it is expensive"""
+        operation = self.operation(request) if self.enabled else None
+        token = bearer_token(request) if operation is not None else None
+        if token is None:
+            return await call_next(request)
+        tenant = hash_token(token)
+        await self.acquire(tenant, operation)
+        started = time.monotonic()
+        try:
+            return await call_next(request)
+        finally:
+            self.release(tenant, operation, time.monotonic() - started)
+
+
+class AdmissionMiddleware(BaseHTTPMiddleware):
+    """Runs requests through a FairAdmission and answers shed ones with 429 and Retry-After"""
+
+    def __init__(self, app, admission: FairAdmission):
+        super().__init__(app)
+        self.admission = admission
+
+    async def dispatch(self, request: Request, call_next):
+        try:
+            return await self.admission.run(request, call_next)
+        except Overloaded as e:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": str(e)},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+
+
+# Singleton instance
+admission = FairAdmission(
+    settings.ADMISSION_MAX_CONCURRENCY,
+    tenant_capacity=settings.ADMISSION_TENANT_CONCURRENCY,
+    target_wait=settings.ADMISSION_TARGET_WAIT_SECONDS,
+    costs=settings.ADMISSION_OPERATION_COSTS,
+)
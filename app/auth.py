@@ -1,12 +1,39 @@
 from fastapi import Depends, HTTPException, status, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import SessionLocal, get_db
 from app.models import User
+from app.replicas import get_read_db, is_replica_session
+from app.cache import cache, token_key
+from app.config import settings
+from app.tokens import digests_match, hash_token, token_prefix
 
 security = HTTPBearer()
 
 
+def _authenticate(db: Session, token: str):
+    token_hash = hash_token(token)
+    
+    # Resolve token -> user id from the cache, then load by primary key
+    user = None
+    user_id = cache.get(token_key(token_hash))
+    if user_id is not None:
+        user = db.get(User, user_id)
+    if user is None:
+        user = find_user_by_token(db, token_hash)
+        if user:
+            cache.set(token_key(token_hash), user.id)
+    return user
+
+
+def _unauthorized() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid authentication token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Security(security),
     db: Session = Depends(get_db)
@@ -14,18 +41,57 @@ async def get_current_user(
     """
     Authenticate user based on bearer token
     """
-    token = credentials.credentials
-    
-    user = db.query(User).filter(User.token == token).first()
-    
+    user = _authenticate(db, credentials.credentials)
+    if not user:
+        raise _unauthorized()
+    return user
+
+
+async def get_current_user_read(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    db: Session = Depends(get_read_db)
+) -> User:
+    """
+    Authenticate user for a read-only route, using the route's read session.
+    A user the replica does not have yet, e.g. just created, is looked up on the primary.
+    """
+    user = _authenticate(db, credentials.credentials)
+    if user is None and is_replica_session(db):
+        primary = SessionLocal()
+        try:
+            user = _authenticate(primary, credentials.credentials)
+        finally:
+            primary.close()
     if not user:
+        raise _unauthorized()
+    return user
+
+
+async def require_admin(
+    credentials: HTTPAuthorizationCredentials = Security(security)
+):
+    """
+    Allow admin operations only with ADMIN_TOKEN, and refuse them when it is not configured
+    """
+    if not settings.ADMIN_TOKEN:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication token",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin operations are disabled, set ADMIN_TOKEN to enable them",
         )
-    
-    return user
+    if not digests_match(credentials.credentials.encode(), settings.ADMIN_TOKEN.encode()):
+        raise _unauthorized()
+
+
+def find_user_by_token(db: Session, token_hash: str):
+    """
+    Look up a user by token digest. The indexed prefix narrows the candidates,
+    the full digest is compared in constant time.
+    """
+    candidates = db.query(User).filter(User.token_prefix == token_prefix(token_hash)).all()
+    for user in candidates:
+        if digests_match(user.token_hash, token_hash):
+            return user
+    return None
 
 
 def check_quota(user: User, cpu_needed: float, memory_needed: float) -> bool:
@@ -42,9 +108,25 @@ def update_quota(db: Session, user: User, cpu_delta: float, memory_delta: float)
     """
     Update user's resource usage
     cpu_delta and memory_delta can be positive (allocation) or negative (deallocation)
+    The increment runs in SQL, so it cannot overwrite a concurrent reservation.
     """
-    user.used_cpu += cpu_delta
-    user.used_memory += memory_delta
+    user.used_cpu = User.used_cpu + cpu_delta
+    user.used_memory = User.used_memory + memory_delta
     db.commit()
     db.refresh(user)
 
+
+def reserve_quota(db: Session, user: User, cpu_needed: float, memory_needed: float) -> bool:
+    """
+    Atomically add to the user's usage if the result stays within quota.
+    Does not commit, so the reservation belongs to the caller's transaction.
+    """
+    updated = db.query(User).filter(
+        User.id == user.id,
+        User.used_cpu + cpu_needed <= User.quota_cpu,
+        User.used_memory + memory_needed <= User.quota_memory
+    ).update({
+        User.used_cpu: User.used_cpu + cpu_needed,
+        User.used_memory: User.used_memory + memory_needed,
+    }, synchronize_session=False)
+    return bool(updated)
@@ -0,0 +1,244 @@
+"""
+Shared cache used by authentication and the routers.
+
+Two backends are available:
+- MemoryCache: per-process TTL/LRU cache, suitable for a single replica.
+- RedisCache: values live in Redis so every replica sees the same data. Each
+  replica also keeps a short-lived local copy; deletes are broadcast on a
+  pub/sub channel so other replicas drop their local copies immediately.
+  While Redis is unreachable reads are misses and writes are skipped, so
+  requests fall through to the database instead of failing.
+
+Values must be JSON serializable.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """Interface shared by all cache backends"""
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, *keys: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LocalBroker:
+    """
+    In-process stand-in for a pub/sub channel.
+    Several MemoryCache instances sharing a broker behave like replicas that
+    broadcast invalidations to each other, without a network service.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[List[str]], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[List[str]], None]):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def publish(self, keys: List[str]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            callback(keys)
+
+
+class MemoryCache(CacheBackend):
+    """Thread-safe in-process cache with per-entry TTL and LRU eviction"""
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 30.0,
+                 broker: Optional[LocalBroker] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._broker = broker
+        if broker is not None:
+            broker.subscribe(self._evict)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str):
+        if not keys:
+            return
+        if self._broker is not None:
+            self._broker.publish(list(keys))
+        else:
+            self._evict(list(keys))
+
+    def _evict(self, keys: List[str]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(CacheBackend):
+    """
+    Redis-backed cache with a local near-cache kept coherent through pub/sub.
+    Accepts any client exposing the redis-py get/set/delete/publish/pubsub API.
+    """
+
+    def __init__(self, client, channel: str, default_ttl: float = 30.0,
+                 local_ttl: float = 5.0, local_max_entries: int = 10000):
+        self.client = client
+        self.channel = channel
+        self.default_ttl = default_ttl
+        self.local_ttl = local_ttl
+        self.replica_id = uuid.uuid4().hex
+        self.available = True
+        self._local = MemoryCache(max_entries=local_max_entries, default_ttl=local_ttl)
+
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{channel: self._on_invalidate})
+        # The handler keeps the listener thread alive across connection errors
+        self._listener = self._pubsub.run_in_thread(
+            sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error
+        )
+
+    def _on_listener_error(self, error, pubsub, thread):
+        self._failed(error)
+        time.sleep(1.0)
+
+    def _failed(self, error: Exception):
+        if self.available:
+            logger.warning("Redis cache unavailable, serving misses until it recovers: %s", error)
+        self.available = False
+
+    def _recovered(self):
+        if not self.available:
+            logger.info("Redis cache available again")
+        self.available = True
+
+    def _on_invalidate(self, message):
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError):
+            logger.warning("Ignoring malformed cache invalidation message")
+            return
+        if payload.get("origin") != self.replica_id:
+            self._local.delete(*payload.get("keys", []))
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._local.get(key)
+        if value is not None:
+            return value
+        try:
+            raw = self.client.get(key)
+        except Exception as e:
+            self._failed(e)
+            return None
+        self._recovered()
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        self._local.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.default_ttl
+        try:
+            self.client.set(key, json.dumps(value, default=str), px=int(ttl * 1000))
+        except Exception as e:
+            # Without a shared copy, a local one could miss other replicas' invalidations
+            self._failed(e)
+            return
+        self._recovered()
+        self._local.set(key, value, min(ttl, self.local_ttl))
+
+    def delete(self, *keys: str):
+        if not keys:
+            return
+        self._local.delete(*keys)
+        try:
+            self.client.delete(*keys)
+            self.client.publish(self.channel, json.dumps({"origin": self.replica_id, "keys": list(keys)}))
+        except Exception as e:
+            # Entries written before the outage expire within CACHE_TTL_SECONDS
+            self._failed(e)
+            return
+        self._recovered()
+
+    def close(self):
+        self._listener.stop()
+        self._pubsub.close()
+
+
+def token_key(token_hash: str) -> str:
+    # Keys may be visible to anyone with access to the cache, never embed the raw token
+    return "auth:token:" + token_hash
+
+
+def cluster_key(cluster_id: int) -> str:
+    return f"cluster:{cluster_id}"
+
+
+def instance_status_key(instance_id: int) -> str:
+    return f"instance:status:{instance_id}"
+
+
+def create_cache() -> CacheBackend:
+    """Build the backend selected by CACHE_BACKEND"""
+    if settings.CACHE_BACKEND == "redis":
+        import redis
+        return RedisCache(
+            redis.Redis.from_url(
+                settings.CACHE_URL,
+                socket_timeout=settings.CACHE_TIMEOUT_SECONDS,
+                socket_connect_timeout=settings.CACHE_TIMEOUT_SECONDS,
+            ),
+            channel=settings.CACHE_CHANNEL,
+            default_ttl=settings.CACHE_TTL_SECONDS,
+            local_ttl=settings.CACHE_LOCAL_TTL_SECONDS,
+            local_max_entries=settings.CACHE_MAX_ENTRIES,
+        )
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCache(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            default_ttl=settings.CACHE_TTL_SECONDS,
+        )
+    raise ValueError(f"Unknown cache backend '{settings.CACHE_BACKEND}'")
+
+
+# Singleton instance
+cache = create_cache()
@@ -0,0 +1,325 @@
+"""
+Watch-maintained view of free capacity in each target Kubernetes cluster.
+
+Every target has a CapacityTracker that lists nodes and active pods once and
+then follows them with watches, keeping node allocatable and pod requests in
+memory. Admission and placement read this view instead of listing nodes and
+pods on every request.
+
+Clusters that were admitted but whose pods the watch has not seen yet hold a
+reservation against their namespace. Each instance pod (labelled
+managed-by=cmp) that appears in the namespace releases its share, callers
+release what they could not provision, and leftovers expire after
+CAPACITY_RESERVATION_SECONDS. Instances started from the VM pool run in
+VM_POOL_NAMESPACE, so their share is transferred there and used up by the
+VM's launcher pod.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+from app.config import settings
+from app.k8s_service import (
+    ACTIVE_POD_SELECTOR, MANAGED_BY_LABEL, MANAGED_BY_VALUE, KubernetesRegistry, KubernetesService,
+    k8s_registry, node_allocatable, pod_requests
+)
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientCapacity(Exception):
+    """A cluster does not fit into the free capacity of its target"""
+
+    def __init__(self, target: str, headroom: Dict):
+        super().__init__(f"Insufficient capacity on target '{target}'")
+        self.target = target
+        self.headroom = headroom
+
+
+class CapacityTracker:
+    """Free capacity of one target, kept current by node and pod watches"""
+
+    def __init__(self, service: KubernetesService, reservation_ttl: float, watch_timeout: int):
+        self.service = service
+        self.reservation_ttl = reservation_ttl
+        self.watch_timeout = watch_timeout
+        self._nodes: Dict[str, Tuple[float, float]] = {}
+        # uid -> (namespace, node name or None while pending, cpu, memory)
+        self._pods: Dict[str, Tuple[str, Optional[str], float, float]] = {}
+        # namespace -> [cpu, memory, expires_at]
+        self._reservations: Dict[str, list] = {}
+        self._synced = {"nodes": False, "pods": False}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watches: Dict[str, watch.Watch] = {}
+        self._threads = []
+
+    @property
+    def synced(self) -> bool:
+        return all(self._synced.values())
+
+    def start(self):
+        if self.service.core_api is None:
+            logger.warning("Kubernetes target '%s' is not configured, capacity is not tracked",
+                           self.service.name)
+            return
+        self._stop.clear()
+        for kind in ("nodes", "pods"):
+            thread = threading.Thread(
+                target=self._run, args=(kind,),
+                name=f"capacity-{self.service.name}-{kind}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        for stream in list(self._watches.values()):
+            stream.stop()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _list_and_watch(self, kind: str):
+        if kind == "nodes":
+            list_func, kwargs = self.service.core_api.list_node, {}
+        else:
+            list_func = self.service.core_api.list_pod_for_all_namespaces
+            kwargs = {"field_selector": ACTIVE_POD_SELECTOR}
+
+        listing = self.service._call("list", list_func, **kwargs)
+        with self._lock:
+            if kind == "nodes":
+                self._nodes = {}
+                for node in listing.items:
+                    self._apply_node("ADDED", node)
+            else:
+                self._pods = {}
+                for pod in listing.items:
+                    self._apply_pod("ADDED", pod, release=False)
+            self._synced[kind] = True
+        logger.info("Capacity of target '%s': listed %s %s",
+                    self.service.name, len(listing.items), kind)
+
+        stream = watch.Watch()
+        self._watches[kind] = stream
+        try:
+            for event in stream.stream(
+                list_func,
+                resource_version=listing.metadata.resource_version,
+                timeout_seconds=self.watch_timeout,
+                _request_timeout=self.watch_timeout + 30,
+                **kwargs
+            ):
+                if event["type"] == "ERROR":
+                    # Usually 410 Gone: the resource version is too old, relist
+                    raise ApiException(status=event["raw_object"].get("code", 500),
+                                       reason=event["raw_object"].get("message"))
+                with self._lock:
+                    if kind == "nodes":
+                        self._apply_node(event["type"], event["object"])
+                    else:
+                        self._apply_pod(event["type"], event["object"])
+        finally:
+            self._watches.pop(kind, None)
+
+    def _run(self, kind: str):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                self._list_and_watch(kind)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if failures > 1:
+                    # Stale data must not admit or reject clusters
+                    self._synced[kind] = False
+                logger.warning("Capacity watch of %s on target '%s' failed: %s",
+                               kind, self.service.name, e)
+                self._stop.wait(min(30.0, 2 ** failures))
+
+    def _apply_node(self, event_type: str, node):
+        name = node.metadata.name
+        allocatable = node_allocatable(node) if event_type != "DELETED" else None
+        if allocatable is None:
+            self._nodes.pop(name, None)
+        else:
+            self._nodes[name] = allocatable
+
+    def _apply_pod(self, event_type: str, pod, release: bool = True):
+        uid = pod.metadata.uid
+        if event_type == "DELETED":
+            self._pods.pop(uid, None)
+            return
+        namespace = pod.metadata.namespace
+        cpu, memory = pod_requests(pod)
+        labels = pod.metadata.labels or {}
+        # Only the cluster's own instance pods use up its reservation
+        if release and uid not in self._pods and labels.get(MANAGED_BY_LABEL) == MANAGED_BY_VALUE:
+            reservation = self._reservations.get(namespace)
+            if reservation is not None:
+                reservation[0] = max(0.0, reservation[0] - cpu)
+                reservation[1] = max(0.0, reservation[1] - memory)
+        self._pods[uid] = (namespace, pod.spec.node_name, cpu, memory)
+
+    def _free_by_node(self) -> Dict[str, list]:
+        """Allocatable minus requests of the pods bound to each node"""
+        node_free = {name: list(allocatable) for name, allocatable in self._nodes.items()}
+        for _, node_name, cpu, memory in self._pods.values():
+            if node_name in node_free:
+                node_free[node_name][0] -= cpu
+                node_free[node_name][1] -= memory
+        return node_free
+
+    def _headroom(self, node_free: Dict[str, list]) -> Dict:
+        """Free capacity of the target; the caller holds the lock"""
+        now = time.monotonic()
+        self._reservations = {
+            namespace: reservation for namespace, reservation in self._reservations.items()
+            if reservation[2] > now and (reservation[0] > 0 or reservation[1] > 0)
+        }
+        # Pending pods and reservations count against the total but no node
+        free_cpu = sum(cpu for cpu, _ in self._nodes.values())
+        free_memory = sum(memory for _, memory in self._nodes.values())
+        for _, node_name, cpu, memory in self._pods.values():
+            if node_name is not None and node_name not in self._nodes:
+                continue  # Runs on a cordoned node whose allocatable is not counted
+            free_cpu -= cpu
+            free_memory -= memory
+        for cpu, memory, _ in self._reservations.values():
+            free_cpu -= cpu
+            free_memory -= memory
+
+        largest = max(node_free.values(), key=lambda free: free[0], default=[0.0, 0.0])
+        return {
+            "cpu": round(free_cpu, 3),
+            "memory": round(free_memory, 3),
+            "largest_node": {"cpu": round(largest[0], 3), "memory": round(largest[1], 3)},
+            "nodes": len(self._nodes),
+        }
+
+    def headroom(self) -> Optional[Dict]:
+        """Free capacity of the target, None until both watches have synced"""
+        if not self.synced:
+            return None
+        with self._lock:
+            return self._headroom(self._free_by_node())
+
+    def try_reserve(self, namespace: str, count: int, cpu: float, memory: float) -> Tuple[bool, Dict]:
+        """
+        Reserve room for count instances of cpu/memory if they fit, and return
+        the headroom the decision was based on. Each instance must fit on a
+        single node, and all of them must fit into the target's total.
+        """
+        with self._lock:
+            node_free = self._free_by_node()
+            headroom = self._headroom(node_free)
+            fits_node = any(
+                node_cpu >= cpu and node_memory >= memory for node_cpu, node_memory in node_free.values()
+            )
+            fits = fits_node and headroom["cpu"] >= cpu * count and headroom["memory"] >= memory * count
+            if fits:
+                reservation = self._reservations.setdefault(namespace, [0.0, 0.0, 0.0])
+                reservation[0] += cpu * count
+                reservation[1] += memory * count
+                reservation[2] = time.monotonic() + self.reservation_ttl
+            return fits, headroom
+
+    def release(self, namespace: str, cpu: float, memory: float):
+        """Give back reserved room that will not be used, e.g. after a failed create"""
+        with self._lock:
+            reservation = self._reservations.get(namespace)
+            if reservation is not None:
+                reservation[0] = max(0.0, reservation[0] - cpu)
+                reservation[1] = max(0.0, reservation[1] - memory)
+
+    def move_reservation(self, old_namespace: str, new_namespace: str):
+        """Re-key a reservation when a cluster ends up in a different namespace"""
+        with self._lock:
+            reservation = self._reservations.pop(old_namespace, None)
+            if reservation is not None:
+                self._reservations[new_namespace] = reservation
+
+    def transfer(self, old_namespace: str, new_namespace: str, cpu: float, memory: float):
+        """Move part of a reservation to another namespace, e.g. for instances started from the VM pool"""
+        with self._lock:
+            reservation = self._reservations.get(old_namespace)
+            if reservation is None:
+                return
+            cpu = min(cpu, reservation[0])
+            memory = min(memory, reservation[1])
+            reservation[0] -= cpu
+            reservation[1] -= memory
+            moved = self._reservations.setdefault(new_namespace, [0.0, 0.0, 0.0])
+            moved[0] += cpu
+            moved[1] += memory
+            moved[2] = max(moved[2], reservation[2])
+
+
+class CapacityMonitor:
+    """Capacity trackers for every target"""
+
+    def __init__(self, registry: KubernetesRegistry):
+        self.trackers = {
+            service.name: CapacityTracker(
+                service,
+                reservation_ttl=settings.CAPACITY_RESERVATION_SECONDS,
+                watch_timeout=settings.CAPACITY_WATCH_TIMEOUT_SECONDS,
+            )
+            for service in registry.services()
+        }
+
+    def start(self):
+        for tracker in self.trackers.values():
+            tracker.start()
+
+    def stop(self):
+        for tracker in self.trackers.values():
+            tracker.stop()
+
+    def headroom(self, target: str) -> Optional[Dict]:
+        tracker = self.trackers.get(target)
+        return tracker.headroom() if tracker is not None else None
+
+    def move_reservation(self, target: str, old_namespace: str, new_namespace: str):
+        tracker = self.trackers.get(target)
+        if tracker is not None:
+            tracker.move_reservation(old_namespace, new_namespace)
+
+    def admit(self, target: str, namespace: str, count: int, cpu: float, memory: float) -> bool:
+        """
+        Reserve capacity for a cluster's instances or raise InsufficientCapacity.
+        Admission is skipped while the target's watches are not synced, so an
+        unreachable API server never blocks requests on stale data.
+        Returns whether a reservation was made that release() must undo on failure.
+        """
+        if not settings.CAPACITY_ADMISSION_ENABLED:
+            return False
+        tracker = self.trackers.get(target)
+        if tracker is None or not tracker.synced:
+            logger.debug("Capacity of target '%s' unknown, admitting without a check", target)
+            return False
+        fits, headroom = tracker.try_reserve(namespace, count, cpu, memory)
+        if not fits:
+            raise InsufficientCapacity(target, headroom)
+        return True
+
+    def release(self, target: str, namespace: str, count: int, cpu: float, memory: float):
+        """Undo an admission whose instances will not be created"""
+        tracker = self.trackers.get(target)
+        if tracker is not None:
+            tracker.release(namespace, cpu * count, memory * count)
+
+    def transfer(self, target: str, namespace: str, new_namespace: str, count: int, cpu: float, memory: float):
+        """Keep the room of count admitted instances reserved, for pods that appear in new_namespace"""
+        tracker = self.trackers.get(target)
+        if tracker is not None:
+            tracker.transfer(namespace, new_namespace, cpu * count, memory * count)
+
+
+# Singleton instance
+capacity_monitor = CapacityMonitor(k8s_registry)
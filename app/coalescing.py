@@ -0,0 +1,119 @@
+"""
+Coalescing of concurrent Kubernetes reads.
+
+SingleFlight lets concurrent callers asking for the same key share one call:
+the first caller runs it, the others wait for its result.
+
+ReadBatcher additionally merges reads of different names under one key, e.g.
+the statuses of many instances in one namespace. The first caller opens a
+batch and fetches it right away when no fetch for the key is in flight, so an
+uncontended read pays no delay. While one is, the batch stays open for others
+to join until that fetch finishes or window seconds pass, then one fetch
+answers the whole batch. A caller whose name is part of a batch that is
+already being fetched waits for that fetch instead of starting another one.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Run at most one call per key at a time, sharing its outcome"""
+
+    def __init__(self, on_shared: Callable[[], None] = None):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self._on_shared = on_shared
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            if self._on_shared is not None:
+                self._on_shared()
+            return flight.wait()
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.wait()
+
+
+class _Batch(_Flight):
+    def __init__(self):
+        super().__init__()
+        self.names: Set[Hashable] = set()
+
+
+class ReadBatcher:
+    """Merge concurrent reads of names under the same key into one fetch"""
+
+    def __init__(self, window: float, fetch: Callable[[Hashable, Iterable], Dict],
+                 on_shared: Callable[[], None] = None):
+        self.window = window
+        self._fetch = fetch
+        self._open: Dict[Hashable, _Batch] = {}
+        self._in_flight: Dict[Hashable, list] = {}
+        self._lock = threading.Lock()
+        # Notified when the last fetch of a key finishes
+        self._idle = threading.Condition(self._lock)
+        self._on_shared = on_shared
+
+    def get(self, key: Hashable, name: Hashable) -> Any:
+        """Value of name under key, None if the fetch did not return it"""
+        with self._lock:
+            batch = next((batch for batch in self._in_flight.get(key, ()) if name in batch.names), None)
+            leader = False
+            if batch is None:
+                batch = self._open.get(key)
+                if batch is None:
+                    batch = self._open[key] = _Batch()
+                    leader = True
+                batch.names.add(name)
+        if not leader:
+            if self._on_shared is not None:
+                self._on_shared()
+            return batch.wait().get(name)
+
+        with self._lock:
+            deadline = time.monotonic() + self.window
+            while self._in_flight.get(key):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._idle.wait(remaining)
+            del self._open[key]
+            self._in_flight.setdefault(key, []).append(batch)
+        try:
+            batch.result = self._fetch(key, batch.names)
+        except BaseException as e:
+            batch.error = e
+        finally:
+            with self._lock:
+                in_flight = self._in_flight[key]
+                in_flight.remove(batch)
+                if not in_flight:
+                    del self._in_flight[key]
+                    self._idle.notify_all()
+            batch.done.set()
+        return batch.wait().get(name)
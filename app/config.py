@@ -1,11 +1,129 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
+
+DEFAULT_TOKEN_HASH_KEY = "change-me"
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./cmp.db"
+    DATABASE_REPLICA_URLS: List[str] = []  # Read replicas for read-only routes, empty reads from DATABASE_URL
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = 5.0  # Replicas lagging more than this get no reads
+    DATABASE_REPLICA_CHECK_SECONDS: float = 2.0  # How often replica lag is measured
+    # Key of the HMAC that API tokens are stored as; changing it invalidates every token
+    TOKEN_HASH_KEY: str = DEFAULT_TOKEN_HASH_KEY
+    # Bearer token of admin operations (fleet export/import); unset disables them
+    ADMIN_TOKEN: Optional[str] = None
     K8S_NAMESPACE: str = "default"
     K8S_CONFIG_PATH: Optional[str] = None  # Path to kubeconfig, None uses default
+    # Target clusters as {"name": "/path/to/kubeconfig"}; an empty path uses in-cluster config.
+    # When unset, a single target named K8S_DEFAULT_TARGET uses K8S_CONFIG_PATH.
+    K8S_TARGETS: Dict[str, str] = {}
+    K8S_DEFAULT_TARGET: str = "default"
+    K8S_CAPACITY_TTL_SECONDS: float = 30.0  # How long placement reuses a target's free capacity
+    # Reject clusters that do not fit into node allocatable minus pod requests (watch-maintained)
+    CAPACITY_ADMISSION_ENABLED: bool = True
+    CAPACITY_RESERVATION_SECONDS: float = 120.0  # How long admitted instances count before their pods appear
+    CAPACITY_WATCH_TIMEOUT_SECONDS: int = 300  # Server-side timeout after which a watch is re-established
+    NAMESPACE_POOL_SIZE: int = 0  # Pre-created namespaces kept per target, 0 disables the pool
+    NAMESPACE_POOL_PREFIX: str = "cmp-pool"
+    NAMESPACE_POOL_REFILL_SECONDS: float = 30.0  # Refill interval; claims also trigger a refill
+    # New container clusters are one StatefulSet instead of a bare pod per instance
+    CONTAINER_STATEFULSET_ENABLED: bool = False
+    # Stopped KubeVirt VMs kept per target and shape, as {"<cpu>x<memory>": count}; empty disables the pool
+    VM_POOL_SHAPES: Dict[str, int] = {}
+    VM_POOL_NAMESPACE: str = "cmp-vm-pool"
+    VM_POOL_REFILL_SECONDS: float = 30.0
+    K8S_MAX_CONCURRENCY: int = 16  # Parallel API calls for multi-instance operations
+    K8S_READ_BATCH_WINDOW_SECONDS: float = 0.01  # Longest a status read waits behind a fetch in flight to be merged
+    K8S_REQUEST_TIMEOUT_SECONDS: float = 10.0  # Timeout of a single API request
+    K8S_CALL_DEADLINE_SECONDS: float = 30.0  # Overall budget for a call including retries
+    K8S_RETRY_MAX_ATTEMPTS: int = 4
+    K8S_RETRY_BASE_SECONDS: float = 0.2
+    K8S_RETRY_MAX_BACKOFF_SECONDS: float = 5.0
+    K8S_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failed calls (after retries) that open the circuit
+    K8S_BREAKER_RESET_SECONDS: float = 30.0  # Time the circuit stays open before a trial call
+
+    # Tracing (requires the opentelemetry packages)
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "file"  # console, file, memory or otlp
+    TRACING_FILE_PATH: str = "./traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4317"
+    TRACING_SERVICE_NAME: str = "kubekloud-api"
+
+    # Operation queue. When enabled, routers enqueue k8s mutations instead of calling the API server.
+    WORK_QUEUE_ENABLED: bool = False
+    WORK_QUEUE_WORKERS: int = 4  # Worker threads started in each API process, 0 to run them separately
+    WORK_QUEUE_RATE: float = 20.0  # Operations per second across the workers of one process
+    WORK_QUEUE_BATCH_SIZE: int = 10  # Operations claimed per poll
+    WORK_QUEUE_POLL_SECONDS: float = 1.0
+    WORK_QUEUE_LEASE_SECONDS: float = 60.0  # Claimed operations are reclaimable after this
+    WORK_QUEUE_MAX_ATTEMPTS: int = 5
+    WORK_QUEUE_RETRY_BASE_SECONDS: float = 2.0
+
+    # Admission of expensive operations per API process. 0 disables the limits.
+    ADMISSION_MAX_CONCURRENCY: int = 8  # Keep below the threadpool size so cheap requests get threads
+    ADMISSION_TENANT_CONCURRENCY: int = 2  # Running expensive operations per bearer token
+    ADMISSION_TARGET_WAIT_SECONDS: float = 10.0  # Requests expected to queue longer get 429
+    # Route name -> fair-queueing cost, also the duration estimate in seconds until one is measured
+    ADMISSION_OPERATION_COSTS: Dict[str, float] = {
+        "create_cluster": 2.0,
+        "create_clusters_bulk": 10.0,
+        "scale_cluster": 2.0,
+        "delete_cluster": 1.0,
+        "suspend_cluster": 1.0,
+        "resume_cluster": 1.0,
+        "operate_instance": 0.5,
+    }
+
+    TRANSFER_BATCH_SIZE: int = 5000  # Rows per cursor fetch on export and per insert batch on import
+
+    # Response compression (brotli when the brotli package is installed, else gzip)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Smaller responses are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # 0-11; higher is smaller but much slower
+
+    # Health probes
+    HEALTH_CACHE_SECONDS: float = 5.0  # Dependency check results are reused for this long
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2.0
+    HEALTH_REQUIRE_K8S: bool = False  # Not-ready instead of degraded when no Kubernetes API is reachable
+
+    # Cache shared by auth and the routers. Use redis when running more than one replica.
+    CACHE_BACKEND: str = "memory"  # memory or redis
+    CACHE_URL: str = "redis://localhost:6379/0"
+    CACHE_CHANNEL: str = "kubekloud:cache:invalidate"
+    CACHE_TTL_SECONDS: float = 30.0
+    CACHE_LOCAL_TTL_SECONDS: float = 5.0  # Near-cache lifetime in front of redis
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_TIMEOUT_SECONDS: float = 0.5  # Redis calls slower than this count as a miss
+    CACHE_STATUS_TTL_SECONDS: float = 5.0  # How long an instance status read from k8s is reused
+
+    # Usage metering
+    USAGE_ROLLUP_INTERVAL_SECONDS: float = 60.0  # How often completed hours are rolled up
+    USAGE_ROLLUP_DELAY_SECONDS: float = 300.0  # An hour is rolled up this long after it ends
+    USAGE_ROLLUP_MAX_HOURS: int = 24  # Hours rolled up per pass while catching up
+
+    # Scheduled suspend/resume
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_INTERVAL_SECONDS: float = 30.0  # How often due schedules are looked up
+    SCHEDULER_BATCH_SIZE: int = 100  # Due schedules claimed per lookup
+    SCHEDULER_CONCURRENCY: int = 4  # Clusters suspended or resumed at once per process
+    SCHEDULER_RATE: float = 5.0  # Clusters started per second per process
+    SCHEDULER_RUN_RETENTION_DAYS: int = 30  # Recorded runs older than this are deleted
+
+    # Live resource usage from the metrics.k8s.io API (requires metrics-server)
+    METRICS_POLL_ENABLED: bool = True
+    METRICS_POLL_INTERVAL_SECONDS: float = 30.0  # How often each namespace is polled
+    METRICS_POLL_WORKERS: int = 2  # Threads polling namespaces in each API process
+    METRICS_HISTORY_SIZE: int = 60  # Samples kept per instance
+    METRICS_NAMESPACE_REFRESH_SECONDS: float = 60.0  # How often namespaces to poll are read from the database
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json or text
+    LOG_QUEUE_SIZE: int = 10000  # Records beyond this are dropped instead of blocking requests
+    LOG_SAMPLING: Dict[str, float] = {}  # Logger prefix -> fraction of sub-WARNING records kept
+    LOG_RATE_LIMITS: Dict[str, float] = {"app.routers": 50.0}  # Logger prefix -> sub-WARNING records/second per message
     
     class Config:
         env_file = ".env"
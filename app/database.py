@@ -1,6 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
-from app.models import Base
+from app.models import Base, User
 from app.config import settings
 
 engine = create_engine(
@@ -23,4 +23,63 @@ def get_db():
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    migrate_schema()
+    hash_legacy_tokens()
 
+
+# SQL expressions filling columns that older releases did not have, for the
+# rows that exist when the column is added
+COLUMN_BACKFILLS = {
+    "clusters": {
+        # Instance names so far ran from 0 to instance_count - 1
+        "next_instance_index": "instance_count",
+    },
+}
+
+
+def migrate_schema():
+    """
+    Add columns and indexes that exist on the models but not yet in the database.
+    create_all() only creates missing tables, so columns and indexes added to
+    existing models need this to reach databases created by an older release.
+    Added columns are filled from COLUMN_BACKFILLS where it has an entry.
+    """
+    with engine.begin() as conn:
+        # Reflect on the migration's own connection, inside its transaction
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                backfill = COLUMN_BACKFILLS.get(table.name, {}).get(column.name)
+                if backfill is not None:
+                    conn.execute(text(
+                        f'UPDATE {table.name} SET {column.name} = {backfill} WHERE {column.name} IS NULL'
+                    ))
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+
+
+def hash_legacy_tokens(batch_size: int = 500):
+    """
+    Replace plaintext tokens stored by older releases with their keyed digest.
+    Rows without a token_prefix have not been hashed yet.
+    """
+    db = SessionLocal()
+    try:
+        while True:
+            users = db.query(User).filter(User.token_prefix.is_(None)).limit(batch_size).all()
+            if not users:
+                break
+            for user in users:
+                user.set_token(user.token_hash)
+            db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,136 @@
+"""
+Fleet-wide instance counters.
+
+instance_counters holds one row per owner, instance type and status. Before
+every flush that creates, deletes or changes the status of instances, a
+listener applies the net change to those rows on the flush's connection, so
+counters commit or roll back together with the instances they count. The
+fleet summary reads the counter rows, whose number depends on owners rather
+than on instances, instead of scanning instances.
+
+Rows are updated in a fixed key order so concurrent transactions cannot
+deadlock on them, and there is no fleet-wide row that every transaction
+would have to lock.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import event, func, insert, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Cluster, Instance, InstanceCounter, InstanceStatus
+
+CounterKey = Tuple[int, str, str]  # owner_id, instance type value, status value
+
+
+def _cluster_keys(session: Session, cluster_ids: Iterable[int]) -> Dict[int, Tuple[int, str]]:
+    """cluster id -> (owner id, instance type value)"""
+    rows = session.connection().execute(
+        select(Cluster.id, Cluster.owner_id, Cluster.instance_type).where(Cluster.id.in_(set(cluster_ids)))
+    )
+    return {cluster_id: (owner_id, instance_type.value) for cluster_id, owner_id, instance_type in rows}
+
+
+def apply_changes(session: Session, changes):
+    """Apply (instance, old status, new status) changes; None stands for no instance"""
+    changes = [change for change in changes if change[1] != change[2]]
+    if not changes:
+        return
+    clusters = _cluster_keys(session, (instance.cluster_id for instance, _, _ in changes))
+    deltas: Dict[CounterKey, int] = defaultdict(int)
+    for instance, old, new in changes:
+        owner_id, instance_type = clusters.get(instance.cluster_id, (None, None))
+        if owner_id is None:
+            continue
+        if old is not None:
+            deltas[(owner_id, instance_type, old.value)] -= 1
+        if new is not None:
+            deltas[(owner_id, instance_type, new.value)] += 1
+
+    conn = session.connection()
+    dialect = conn.dialect.name
+    for (owner_id, instance_type, status), delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        values = {"owner_id": owner_id, "instance_type": instance_type, "status": status, "count": delta}
+        if dialect in ("postgresql", "sqlite"):
+            upsert = (postgresql if dialect == "postgresql" else sqlite).insert(InstanceCounter).values(**values)
+            conn.execute(upsert.on_conflict_do_update(
+                index_elements=["owner_id", "instance_type", "status"],
+                set_={"count": InstanceCounter.count + upsert.excluded.count}
+            ))
+            continue
+        updated = conn.execute(
+            update(InstanceCounter).where(
+                InstanceCounter.owner_id == owner_id,
+                InstanceCounter.instance_type == instance_type,
+                InstanceCounter.status == status
+            ).values(count=InstanceCounter.count + delta)
+        ).rowcount
+        if not updated:
+            conn.execute(insert(InstanceCounter).values(**values))
+
+
+def count_removed(session: Session, instances):
+    """
+    Count instances removed with a bulk statement, which the flush listener
+    does not see. Call before the rows are deleted.
+    """
+    apply_changes(session, [(instance, instance.status, None) for instance in instances])
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _count_transitions(session: Session, flush_context, instances):
+    changes = []
+    for instance in session.new:
+        if isinstance(instance, Instance):
+            changes.append((instance, None, inspect(instance).dict.get("status") or InstanceStatus.PENDING))
+    for instance in session.dirty:
+        if isinstance(instance, Instance):
+            history = inspect(instance).attrs.status.history
+            if history.has_changes() and history.deleted:
+                changes.append((instance, history.deleted[0], instance.status))
+    for instance in session.deleted:
+        if isinstance(instance, Instance):
+            history = inspect(instance).attrs.status.history
+            changes.append((instance, history.deleted[0] if history.deleted else instance.status, None))
+    apply_changes(session, changes)
+
+
+def backfill_counters():
+    """Count existing instances once, for a database that predates the counters"""
+    db = SessionLocal()
+    try:
+        if db.query(InstanceCounter.id).first() is None and db.query(Instance.id).first() is not None:
+            rebuild_counters(db)
+    finally:
+        db.close()
+
+
+def rebuild_counters(db: Session):
+    """Recount every owner's instances from the instances table"""
+    db.query(InstanceCounter).delete(synchronize_session=False)
+    rows = db.query(
+        Cluster.owner_id, Cluster.instance_type, Instance.status, func.count(Instance.id)
+    ).join(Cluster, Instance.cluster_id == Cluster.id).group_by(
+        Cluster.owner_id, Cluster.instance_type, Instance.status
+    )
+    db.add_all(
+        InstanceCounter(owner_id=owner_id, instance_type=instance_type.value, status=status.value, count=count)
+        for owner_id, instance_type, status, count in rows.all()
+    )
+    db.commit()
+
+
+def fleet_summary(db: Session) -> dict:
+    """Instance counts per type and status, fleet-wide and per owner"""
+    totals: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    owners: Dict[int, Dict[str, Dict[str, int]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    for owner_id, instance_type, status, count in db.query(
+        InstanceCounter.owner_id, InstanceCounter.instance_type, InstanceCounter.status, InstanceCounter.count
+    ).filter(InstanceCounter.count != 0):
+        totals[instance_type][status] += count
+        owners[owner_id][instance_type][status] += count
+    return {"totals": totals, "owners": owners}
@@ -0,0 +1,121 @@
+"""
+Dependency health checks for the liveness and readiness probes.
+
+Each check result is cached for HEALTH_CACHE_SECONDS and refreshed by at most
+one caller at a time, so probe traffic from many kubelets (or a tight probe
+period) never turns into database or API-server load.
+"""
+import logging
+import threading
+import time
+from functools import partial
+from typing import Callable, Dict
+
+from kubernetes import client
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+from app.k8s_service import KubernetesService, k8s_registry
+
+logger = logging.getLogger(__name__)
+
+
+def check_database() -> Dict:
+    """Round-trip a trivial query and report connection pool usage"""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    pool = engine.pool
+    detail = {"pool": pool.status()}
+    if hasattr(pool, "checkedout"):
+        detail.update({
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    return detail
+
+
+def check_kubernetes(service: KubernetesService) -> Dict:
+    """Ask a target's API server for its version with a short timeout, bypassing retries"""
+    if service.core_api is None:
+        raise RuntimeError("Kubernetes client is not configured")
+    version = client.VersionApi(service.core_api.api_client).get_code(
+        _request_timeout=settings.HEALTH_CHECK_TIMEOUT_SECONDS
+    )
+    return {
+        "version": version.git_version,
+        "circuit_state": service._caller.breaker.state,
+    }
+
+
+class CachedCheck:
+    """A health check whose result is reused for ttl seconds"""
+
+    def __init__(self, name: str, check: Callable[[], Dict], ttl: float):
+        self.name = name
+        self.check = check
+        self.ttl = ttl
+        self._result = None
+        self._checked_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def result(self) -> Dict:
+        if self._result is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._result
+        # One caller refreshes; concurrent callers keep serving the previous result
+        if not self._refresh_lock.acquire(blocking=self._result is None):
+            return self._result
+        try:
+            if self._result is None or time.monotonic() - self._checked_at >= self.ttl:
+                self._result = self._run()
+                self._checked_at = time.monotonic()
+            return self._result
+        finally:
+            self._refresh_lock.release()
+
+    def _run(self) -> Dict:
+        start = time.perf_counter()
+        try:
+            detail = self.check()
+            healthy = True
+        except Exception as e:
+            logger.warning("Health check '%s' failed: %s", self.name, e)
+            detail = {"error": str(e)}
+            healthy = False
+        return {
+            "healthy": healthy,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "checked_at": time.time(),
+            **detail,
+        }
+
+
+checks = {
+    "database": CachedCheck("database", check_database, settings.HEALTH_CACHE_SECONDS),
+}
+for _service in k8s_registry.services():
+    checks[f"kubernetes:{_service.name}"] = CachedCheck(
+        f"kubernetes:{_service.name}", partial(check_kubernetes, _service), settings.HEALTH_CACHE_SECONDS
+    )
+
+
+def readiness() -> Dict:
+    """Run (or reuse) every dependency check and decide whether to take traffic"""
+    results = {name: check.result() for name, check in checks.items()}
+    # One reachable target is enough to serve requests for the clusters placed on it
+    kubernetes_up = any(
+        result["healthy"] for name, result in results.items() if name.startswith("kubernetes:")
+    )
+    if not results["database"]["healthy"] or (settings.HEALTH_REQUIRE_K8S and not kubernetes_up):
+        status = "not_ready"
+    elif not kubernetes_up:
+        # The API servers are shared by every pod; failing the probe would empty the
+        # Service and take the database-only routes down with the Kubernetes ones
+        status = "degraded"
+    else:
+        status = "ready"
+    return {
+        "status": status,
+        "dependencies": results,
+    }
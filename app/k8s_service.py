@@ -1,38 +1,138 @@
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
-from typing import Dict, Optional
+from kubernetes.utils import parse_quantity
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 import yaml
 from app.config import settings
 from app.models import InstanceType, InstanceStatus
+from app.tracing import traced, bind_context
+from app.resilience import ResilientCaller
+from app.coalescing import ReadBatcher, SingleFlight
+from app.metrics import K8S_COALESCED_READS
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _load_api_client(config_path: Optional[str]) -> client.ApiClient:
+    """Build an API client of its own, so several targets can coexist in one process"""
+    if config_path:
+        return config.new_client_from_config(config_file=config_path)
+    # Try in-cluster config first, fall back to default kubeconfig
+    try:
+        configuration = client.Configuration()
+        config.load_incluster_config(client_configuration=configuration)
+        return client.ApiClient(configuration)
+    except config.ConfigException:
+        return config.new_client_from_config()
+
+
+# Pods that still hold their resource requests
+ACTIVE_POD_SELECTOR = "status.phase!=Succeeded,status.phase!=Failed"
+
+
+def node_allocatable(node) -> Optional[Tuple[float, float]]:
+    """Allocatable CPU (cores) and memory (GB) of a node, None if it is unschedulable"""
+    if node.spec is not None and node.spec.unschedulable:
+        return None
+    allocatable = (node.status.allocatable if node.status else None) or {}
+    return (
+        float(parse_quantity(allocatable.get("cpu", "0"))),
+        float(parse_quantity(allocatable.get("memory", "0"))) / 1024 ** 3,
+    )
+
+
+def pod_requests(pod) -> Tuple[float, float]:
+    """Requested CPU (cores) and memory (GB) summed over a pod's containers"""
+    cpu = 0.0
+    memory = 0.0
+    for container in pod.spec.containers:
+        requests = (container.resources.requests if container.resources else None) or {}
+        cpu += float(parse_quantity(requests.get("cpu", "0")))
+        memory += float(parse_quantity(requests.get("memory", "0"))) / 1024 ** 3
+    return cpu, memory
+
+
+# Labels KubeVirt puts on the virt-launcher pod of a VirtualMachine
+VM_POD_LABELS = ("vm.kubevirt.io/name", "kubevirt.io/domain")
+
+
+def pod_usage(pod_metrics: Dict) -> Tuple[str, float, float]:
+    """
+    Instance resource name and used CPU (cores) and memory (GB) of one
+    metrics.k8s.io PodMetrics item. VM instances are named after their VM.
+    """
+    labels = pod_metrics["metadata"].get("labels") or {}
+    name = next((labels[label] for label in VM_POD_LABELS if label in labels), pod_metrics["metadata"]["name"])
+    cpu = 0.0
+    memory = 0.0
+    for container in pod_metrics.get("containers", []):
+        usage = container.get("usage") or {}
+        cpu += float(parse_quantity(usage.get("cpu", "0")))
+        memory += float(parse_quantity(usage.get("memory", "0"))) / 1024 ** 3
+    return name, cpu, memory
+
+
+def pod_status(pod) -> InstanceStatus:
+    """Instance status of a container instance's pod"""
+    phase = pod.status.phase if pod.status else None
+    if phase == "Running":
+        return InstanceStatus.RUNNING
+    elif phase == "Pending":
+        return InstanceStatus.PENDING
+    elif phase in ["Failed", "Unknown"]:
+        return InstanceStatus.FAILED
+    else:
+        return InstanceStatus.STOPPED
+
+
+def vm_status(vm: Dict) -> InstanceStatus:
+    """Instance status of a VM instance's VirtualMachine"""
+    if vm.get("spec", {}).get("running"):
+        return InstanceStatus.RUNNING
+    return InstanceStatus.STOPPED
+
+
+STATEFULSET_LABEL = "cmp-statefulset"
+# Carried by every instance pod, including the virt-launcher pods of VMs
+MANAGED_BY_LABEL = "managed-by"
+MANAGED_BY_VALUE = "cmp"
+
+
 class KubernetesService:
-    """Service for managing Kubernetes resources"""
+    """Service for managing Kubernetes resources in one target cluster"""
     
-    def __init__(self):
+    def __init__(self, name: str = "default", config_path: Optional[str] = None):
+        self.name = name
         try:
-            if settings.K8S_CONFIG_PATH:
-                config.load_kube_config(config_file=settings.K8S_CONFIG_PATH)
-            else:
-                # Try in-cluster config first, fall back to default kubeconfig
-                try:
-                    config.load_incluster_config()
-                except:
-                    config.load_kube_config()
+            api_client = _load_api_client(config_path)
             
-            self.core_api = client.CoreV1Api()
-            self.apps_api = client.AppsV1Api()
-            self.custom_api = client.CustomObjectsApi()
+            self.core_api = client.CoreV1Api(api_client)
+            self.apps_api = client.AppsV1Api(api_client)
+            self.custom_api = client.CustomObjectsApi(api_client)
         except Exception as e:
-            logger.warning(f"Failed to load k8s config: {e}. K8s operations will fail.")
+            logger.warning("Failed to load k8s config for target '%s': %s. K8s operations will fail.", name, e)
             self.core_api = None
             self.apps_api = None
             self.custom_api = None
+
+        self._caller = ResilientCaller(name)
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.K8S_MAX_CONCURRENCY,
+            thread_name_prefix=f"k8s-{name}"
+        )
+        coalesced = K8S_COALESCED_READS.labels(target=name).inc
+        self._flights = SingleFlight(on_shared=coalesced)
+        self._status_reads = ReadBatcher(settings.K8S_READ_BATCH_WINDOW_SECONDS, self._read_statuses,
+                                         on_shared=coalesced)
+    
+    def _call(self, verb: str, func, **kwargs):
+        """Issue an API call with deadline, retries and circuit breaking"""
+        return self._caller.call(verb, func, **kwargs)
     
-    def create_namespace(self, namespace_name: str) -> bool:
+    @traced
+    def create_namespace(self, namespace_name: str, labels: Optional[Dict[str, str]] = None) -> bool:
         """Create a Kubernetes namespace"""
         try:
             namespace = client.V1Namespace(
@@ -40,31 +140,68 @@ class KubernetesService:
                     name=namespace_name,
                     labels={
                         "managed-by": "cmp",
-                        "cluster-namespace": "true"
+                        "cluster-namespace": "true",
+                        **(labels or {})
                     }
                 )
             )
-            self.core_api.create_namespace(body=namespace)
-            logger.info(f"Created namespace: {namespace_name}")
+            self._call("create", self.core_api.create_namespace, body=namespace)
+            logger.info("Created namespace: %s", namespace_name)
             return True
         except ApiException as e:
             if e.status == 409:  # Namespace already exists
-                logger.warning(f"Namespace {namespace_name} already exists")
+                logger.warning("Namespace %s already exists", namespace_name)
                 return True
-            logger.error(f"Failed to create namespace {namespace_name}: {e}")
+            logger.error("Failed to create namespace %s: %s", namespace_name, e)
             return False
     
+    @traced
     def delete_namespace(self, namespace_name: str) -> bool:
         """Delete a Kubernetes namespace"""
         try:
-            self.core_api.delete_namespace(name=namespace_name)
-            logger.info(f"Deleted namespace: {namespace_name}")
+            self._call("delete", self.core_api.delete_namespace, name=namespace_name)
+            logger.info("Deleted namespace: %s", namespace_name)
             return True
         except ApiException as e:
             if e.status == 404:  # Namespace doesn't exist
-                logger.warning(f"Namespace {namespace_name} not found")
+                logger.warning("Namespace %s not found", namespace_name)
                 return True
-            logger.error(f"Failed to delete namespace {namespace_name}: {e}")
+            logger.error("Failed to delete namespace %s: %s", namespace_name, e)
+            return False
+    
+    @traced
+    def list_namespaces(self, label_selector: str) -> Dict[str, str]:
+        """Names and resource versions of the namespaces matching label_selector"""
+        namespaces = self._call("list", self.core_api.list_namespace, label_selector=label_selector)
+        return {
+            namespace.metadata.name: namespace.metadata.resource_version
+            for namespace in namespaces.items
+            if namespace.status is None or namespace.status.phase != "Terminating"
+        }
+    
+    @traced
+    def update_namespace_metadata(self, namespace_name: str, labels: Dict[str, str],
+                                  annotations: Optional[Dict[str, str]] = None,
+                                  resource_version: Optional[str] = None) -> bool:
+        """
+        Merge labels and annotations into a namespace.
+        With resource_version the update only applies if nobody changed the
+        namespace since it was read, which makes it usable as a claim.
+        """
+        metadata = {"labels": labels}
+        if annotations:
+            metadata["annotations"] = annotations
+        if resource_version is not None:
+            metadata["resourceVersion"] = resource_version
+        try:
+            self._call("patch", self.core_api.patch_namespace,
+                       name=namespace_name, body={"metadata": metadata})
+            return True
+        except ApiException as e:
+            if e.status in (404, 409):  # Gone, or changed since it was read
+                logger.debug("Namespace %s was not updated: %s", namespace_name, e.reason)
+                return False
+            logger.error("Failed to update namespace %s: %s", namespace_name, e)
             return False
     
     def get_pod_manifest_template(self, instance_name: str, cpu: float, memory: float, 
@@ -128,7 +265,8 @@ class KubernetesService:
                 "template": {
                     "metadata": {
                         "labels": {
-                            "kubevirt.io/vm": instance_name
+                            "kubevirt.io/vm": instance_name,
+                            MANAGED_BY_LABEL: MANAGED_BY_VALUE
                         }
                     },
                     "spec": {
@@ -166,13 +304,88 @@ class KubernetesService:
         }
         return manifest
     
+    @traced
+    def create_stopped_vm(self, vm_name: str, cpu: float, memory: float, namespace: str,
+                          labels: Dict[str, str]) -> bool:
+        """Create a VirtualMachine that is defined but not running, for the warm pool"""
+        manifest = self.get_vm_manifest_template(vm_name, cpu, memory, namespace)
+        manifest["metadata"]["labels"].update(labels)
+        manifest["spec"]["running"] = False
+        try:
+            self._call(
+                "create", self.custom_api.create_namespaced_custom_object,
+                group="kubevirt.io",
+                version="v1",
+                namespace=namespace,
+                plural="virtualmachines",
+                body=manifest
+            )
+            return True
+        except ApiException as e:
+            logger.error("Failed to create pooled VM %s: %s", vm_name, e)
+            return False
+    
+    @traced
+    def list_vms(self, namespace: str, label_selector: str) -> Dict[str, Dict]:
+        """Labels and resource version of the VirtualMachines in namespace matching label_selector"""
+        vms = self._call(
+            "list", self.custom_api.list_namespaced_custom_object,
+            group="kubevirt.io",
+            version="v1",
+            namespace=namespace,
+            plural="virtualmachines",
+            label_selector=label_selector
+        )
+        return {
+            vm["metadata"]["name"]: {
+                "labels": vm["metadata"].get("labels", {}),
+                "resource_version": vm["metadata"].get("resourceVersion"),
+            }
+            for vm in vms.get("items", [])
+        }
+    
+    @traced
+    def claim_vm(self, vm_name: str, namespace: str, labels: Dict[str, str],
+                 annotations: Dict[str, str], resource_version: str) -> bool:
+        """
+        Relabel a pooled VirtualMachine and start it, provided nobody changed
+        it since resource_version was read
+        """
+        body = {
+            "metadata": {
+                "labels": labels,
+                "annotations": annotations,
+                "resourceVersion": resource_version,
+            },
+            "spec": {"running": True},
+        }
+        try:
+            self._call(
+                "patch", self.custom_api.patch_namespaced_custom_object,
+                group="kubevirt.io",
+                version="v1",
+                namespace=namespace,
+                plural="virtualmachines",
+                name=vm_name,
+                body=body
+            )
+            return True
+        except ApiException as e:
+            if e.status in (404, 409):  # Gone, or claimed by someone else
+                logger.debug("Pooled VM %s was not claimed: %s", vm_name, e.reason)
+                return False
+            logger.error("Failed to claim pooled VM %s: %s", vm_name, e)
+            return False
+    
+    @traced
     def create_instance(self, instance_name: str, cpu: float, memory: float, 
                        instance_type: InstanceType, namespace: str) -> bool:
         """Create a new instance (Pod or VM)"""
         try:
             if instance_type == InstanceType.CONTAINER:
                 manifest = self.get_pod_manifest_template(instance_name, cpu, memory, instance_type, namespace)
-                self.core_api.create_namespaced_pod(
+                self._call(
+                    "create", self.core_api.create_namespaced_pod,
                     namespace=namespace,
                     body=manifest
                 )
@@ -180,7 +393,8 @@ class KubernetesService:
                 manifest = self.get_vm_manifest_template(instance_name, cpu, memory, namespace)
                 # For VMs, we need to use dynamic client or custom API
                 # For now, we'll create it as a generic k8s resource
-                self.custom_api.create_namespaced_custom_object(
+                self._call(
+                    "create", self.custom_api.create_namespaced_custom_object,
                     group="kubevirt.io",
                     version="v1",
                     namespace=namespace,
@@ -189,19 +403,25 @@ class KubernetesService:
                 )
             return True
         except ApiException as e:
-            logger.error(f"Failed to create instance {instance_name}: {e}")
+            if e.status == 409:  # Already exists, e.g. a retried create
+                logger.warning("Instance %s already exists", instance_name)
+                return True
+            logger.error("Failed to create instance %s: %s", instance_name, e)
             return False
     
+    @traced
     def delete_instance(self, instance_name: str, instance_type: InstanceType, namespace: str) -> bool:
         """Delete an instance"""
         try:
             if instance_type == InstanceType.CONTAINER:
-                self.core_api.delete_namespaced_pod(
+                self._call(
+                    "delete", self.core_api.delete_namespaced_pod,
                     name=instance_name,
                     namespace=namespace
                 )
             else:  # VM
-                self.custom_api.delete_namespaced_custom_object(
+                self._call(
+                    "delete", self.custom_api.delete_namespaced_custom_object,
                     group="kubevirt.io",
                     version="v1",
                     namespace=namespace,
@@ -210,16 +430,21 @@ class KubernetesService:
                 )
             return True
         except ApiException as e:
-            logger.error(f"Failed to delete instance {instance_name}: {e}")
+            if e.status == 404:  # Already gone, e.g. a retried delete
+                logger.warning("Instance %s not found", instance_name)
+                return True
+            logger.error("Failed to delete instance %s: %s", instance_name, e)
             return False
     
+    @traced
     def start_instance(self, instance_name: str, instance_type: InstanceType, namespace: str) -> bool:
         """Start a stopped instance"""
         if instance_type == InstanceType.VM:
             try:
                 # Patch the VM to set running: true
                 patch = {"spec": {"running": True}}
-                self.custom_api.patch_namespaced_custom_object(
+                self._call(
+                    "patch", self.custom_api.patch_namespaced_custom_object,
                     group="kubevirt.io",
                     version="v1",
                     namespace=namespace,
@@ -229,7 +454,7 @@ class KubernetesService:
                 )
                 return True
             except ApiException as e:
-                logger.error(f"Failed to start VM {instance_name}: {e}")
+                logger.error("Failed to start VM %s: %s", instance_name, e)
                 return False
         else:
             # For containers (pods), we can't really "start" them
@@ -237,13 +462,15 @@ class KubernetesService:
             logger.warning("Container instances cannot be started, they need to be recreated")
             return False
     
+    @traced
     def stop_instance(self, instance_name: str, instance_type: InstanceType, namespace: str) -> bool:
         """Stop a running instance"""
         if instance_type == InstanceType.VM:
             try:
                 # Patch the VM to set running: false
                 patch = {"spec": {"running": False}}
-                self.custom_api.patch_namespaced_custom_object(
+                self._call(
+                    "patch", self.custom_api.patch_namespaced_custom_object,
                     group="kubevirt.io",
                     version="v1",
                     namespace=namespace,
@@ -253,46 +480,275 @@ class KubernetesService:
                 )
                 return True
             except ApiException as e:
-                logger.error(f"Failed to stop VM {instance_name}: {e}")
+                logger.error("Failed to stop VM %s: %s", instance_name, e)
                 return False
         else:
             # For containers, we delete them
             return self.delete_instance(instance_name, instance_type, namespace)
     
+    @traced
     def get_instance_status(self, instance_name: str, instance_type: InstanceType, namespace: str) -> Optional[InstanceStatus]:
-        """Get the status of an instance"""
+        """
+        Get the status of an instance.
+        Concurrent reads in the same namespace are merged into one call.
+        """
+        return self._status_reads.get((namespace, instance_type), instance_name)
+
+    def _read_statuses(self, key: Tuple[str, InstanceType], names) -> Dict[str, Optional[InstanceStatus]]:
+        """Fetch a batch of status reads: a single get, or one label-selected list"""
+        namespace, instance_type = key
+        if len(names) == 1:
+            name = next(iter(names))
+            return {name: self._read_instance_status(name, instance_type, namespace)}
         try:
             if instance_type == InstanceType.CONTAINER:
-                pod = self.core_api.read_namespaced_pod(
+                pods = self._call(
+                    "list", self.core_api.list_namespaced_pod,
+                    namespace=namespace,
+                    label_selector="managed-by=cmp"
+                )
+                statuses = {pod.metadata.name: pod_status(pod) for pod in pods.items}
+            else:  # VM
+                vms = self._call(
+                    "list", self.custom_api.list_namespaced_custom_object,
+                    group="kubevirt.io",
+                    version="v1",
+                    namespace=namespace,
+                    plural="virtualmachines",
+                    label_selector="managed-by=cmp"
+                )
+                statuses = {vm["metadata"]["name"]: vm_status(vm) for vm in vms.get("items", [])}
+        except ApiException as e:
+            logger.error("Failed to list statuses in namespace %s: %s", namespace, e)
+            return {}
+        # Names missing from the listing do not exist, like a 404 on a single read
+        return {name: statuses.get(name) for name in names}
+
+    def _read_instance_status(self, instance_name: str, instance_type: InstanceType,
+                              namespace: str) -> Optional[InstanceStatus]:
+        try:
+            if instance_type == InstanceType.CONTAINER:
+                pod = self._call(
+                    "get", self.core_api.read_namespaced_pod,
                     name=instance_name,
                     namespace=namespace
                 )
-                phase = pod.status.phase
-                if phase == "Running":
-                    return InstanceStatus.RUNNING
-                elif phase == "Pending":
-                    return InstanceStatus.PENDING
-                elif phase in ["Failed", "Unknown"]:
-                    return InstanceStatus.FAILED
-                else:
-                    return InstanceStatus.STOPPED
+                return pod_status(pod)
             else:  # VM
-                vm = self.custom_api.get_namespaced_custom_object(
+                vm = self._call(
+                    "get", self.custom_api.get_namespaced_custom_object,
                     group="kubevirt.io",
                     version="v1",
                     namespace=namespace,
                     plural="virtualmachines",
                     name=instance_name
                 )
-                if vm.get("spec", {}).get("running"):
-                    return InstanceStatus.RUNNING
-                else:
-                    return InstanceStatus.STOPPED
+                return vm_status(vm)
         except ApiException as e:
-            logger.error(f"Failed to get status for {instance_name}: {e}")
+            logger.error("Failed to get status for %s: %s", instance_name, e)
             return None
 
+    def get_statefulset_manifest(self, statefulset_name: str, replicas: int, cpu: float, memory: float,
+                                 namespace: str) -> Dict:
+        """
+        StatefulSet whose pods are the instances of a container cluster.
+        Pods are named <statefulset_name>-<ordinal>, matching the instance names.
+        """
+        pod = self.get_pod_manifest_template(statefulset_name, cpu, memory, InstanceType.CONTAINER, namespace)
+        labels = {"managed-by": "cmp", "instance-type": InstanceType.CONTAINER.value,
+                  STATEFULSET_LABEL: statefulset_name}
+        return {
+            "apiVersion": "apps/v1",
+            "kind": "StatefulSet",
+            "metadata": {
+                "name": statefulset_name,
+                "namespace": namespace,
+                "labels": labels
+            },
+            "spec": {
+                "replicas": replicas,
+                "serviceName": statefulset_name,
+                # Create and delete pods all at once instead of one ordinal at a time
+                "podManagementPolicy": "Parallel",
+                "selector": {"matchLabels": {STATEFULSET_LABEL: statefulset_name}},
+                "template": {
+                    "metadata": {"labels": labels},
+                    "spec": pod["spec"]
+                }
+            }
+        }
+
+    @traced
+    def create_statefulset(self, statefulset_name: str, replicas: int, cpu: float, memory: float,
+                           namespace: str) -> bool:
+        """Create the StatefulSet of a container cluster with one API call"""
+        try:
+            self._call(
+                "create", self.apps_api.create_namespaced_stateful_set,
+                namespace=namespace,
+                body=self.get_statefulset_manifest(statefulset_name, replicas, cpu, memory, namespace)
+            )
+            return True
+        except ApiException as e:
+            if e.status == 409:  # Already exists, e.g. a retried create
+                logger.warning("StatefulSet %s already exists", statefulset_name)
+                return self.scale_statefulset(statefulset_name, replicas, namespace)
+            logger.error("Failed to create StatefulSet %s: %s", statefulset_name, e)
+            return False
+
+    @traced
+    def scale_statefulset(self, statefulset_name: str, replicas: int, namespace: str) -> bool:
+        """Set the replica count; the controller adds or removes the highest ordinals"""
+        try:
+            self._call(
+                "patch", self.apps_api.patch_namespaced_stateful_set_scale,
+                name=statefulset_name,
+                namespace=namespace,
+                body={"spec": {"replicas": replicas}}
+            )
+            return True
+        except ApiException as e:
+            logger.error("Failed to scale StatefulSet %s to %s: %s", statefulset_name, replicas, e)
+            return False
+
+    @traced
+    def delete_statefulset(self, statefulset_name: str, namespace: str) -> bool:
+        """Delete a StatefulSet and, through garbage collection, its pods"""
+        try:
+            self._call(
+                "delete", self.apps_api.delete_namespaced_stateful_set,
+                name=statefulset_name,
+                namespace=namespace
+            )
+            return True
+        except ApiException as e:
+            if e.status == 404:  # Already gone, e.g. a retried delete
+                logger.warning("StatefulSet %s not found", statefulset_name)
+                return True
+            logger.error("Failed to delete StatefulSet %s: %s", statefulset_name, e)
+            return False
+
+    @traced
+    def get_statefulset_statuses(self, statefulset_name: str, namespace: str) -> Optional[Dict[str, InstanceStatus]]:
+        """
+        Status of every pod of a StatefulSet by pod name, from a single list call.
+        Concurrent callers share one in-flight call.
+        """
+        def read():
+            try:
+                pods = self._call(
+                    "list", self.core_api.list_namespaced_pod,
+                    namespace=namespace,
+                    label_selector=f"{STATEFULSET_LABEL}={statefulset_name}"
+                )
+            except ApiException as e:
+                logger.error("Failed to list pods of StatefulSet %s: %s", statefulset_name, e)
+                return None
+            return {pod.metadata.name: pod_status(pod) for pod in pods.items}
+        return self._flights.do(("statefulset-pods", namespace, statefulset_name), read)
+
+    @traced
+    def create_instances(self, instance_names: List[str], cpu: float, memory: float,
+                         instance_type: InstanceType, namespace: str) -> Dict[str, bool]:
+        """Create several instances concurrently, returning success per instance name"""
+        create = bind_context(
+            lambda name: self.create_instance(name, cpu, memory, instance_type, namespace)
+        )
+        return dict(zip(instance_names, self._executor.map(create, instance_names)))
+
+    @traced
+    def delete_instances(self, instance_names: List[str], instance_type: InstanceType,
+                         namespace: str) -> Dict[str, bool]:
+        """Delete several instances concurrently, returning success per instance name"""
+        delete = bind_context(
+            lambda name: self.delete_instance(name, instance_type, namespace)
+        )
+        return dict(zip(instance_names, self._executor.map(delete, instance_names)))
+
+    @traced
+    def get_free_capacity(self) -> Dict[str, float]:
+        """
+        Allocatable CPU (cores) and memory (GB) of schedulable nodes minus the
+        requests of pods that are not finished
+        """
+        nodes = self._call("list", self.core_api.list_node)
+        free_cpu = 0.0
+        free_memory = 0.0
+        for node in nodes.items:
+            allocatable = node_allocatable(node)
+            if allocatable is not None:
+                free_cpu += allocatable[0]
+                free_memory += allocatable[1]
+        
+        pods = self._call(
+            "list", self.core_api.list_pod_for_all_namespaces,
+            field_selector=ACTIVE_POD_SELECTOR
+        )
+        for pod in pods.items:
+            cpu, memory = pod_requests(pod)
+            free_cpu -= cpu
+            free_memory -= memory
+        return {"cpu": free_cpu, "memory": free_memory}
+
+    @traced
+    def list_pod_metrics(self, namespace: str) -> Dict[str, Tuple[str, float, float]]:
+        """
+        Current usage of the pods in a namespace from the metrics API:
+        instance resource name -> (sample timestamp, CPU cores, memory GB)
+        """
+        metrics = self._call(
+            "list", self.custom_api.list_namespaced_custom_object,
+            group="metrics.k8s.io",
+            version="v1beta1",
+            namespace=namespace,
+            plural="pods"
+        )
+        usage = {}
+        for item in metrics.get("items", []):
+            name, cpu, memory = pod_usage(item)
+            usage[name] = (item.get("timestamp"), cpu, memory)
+        return usage
+
+
+class KubernetesRegistry:
+    """
+    The target Kubernetes clusters this platform provisions into.
+    Each target has its own API client, circuit breaker and worker threads.
+    """
+    
+    def __init__(self, targets: Dict[str, Optional[str]], default: str):
+        self.default = default if default in targets else next(iter(targets))
+        self._services = {
+            name: KubernetesService(name, config_path or None)
+            for name, config_path in targets.items()
+        }
+    
+    def names(self) -> List[str]:
+        return list(self._services)
+    
+    def services(self) -> List[KubernetesService]:
+        return list(self._services.values())
+    
+    def get(self, name: Optional[str] = None) -> KubernetesService:
+        """Service for a target; None selects the default target"""
+        service = self._services.get(name or self.default)
+        if service is None:
+            raise KeyError(f"Unknown Kubernetes target '{name}'")
+        return service
+    
+    def for_cluster(self, cluster) -> KubernetesService:
+        """Service for the target a cluster was placed on"""
+        return self.get(cluster.k8s_target)
+
+
+def _configured_targets() -> Dict[str, Optional[str]]:
+    if settings.K8S_TARGETS:
+        return dict(settings.K8S_TARGETS)
+    # Single-cluster deployments keep using K8S_CONFIG_PATH
+    return {settings.K8S_DEFAULT_TARGET: settings.K8S_CONFIG_PATH}
+
 
-# Singleton instance
-k8s_service = KubernetesService()
+# Singleton instances
+k8s_registry = KubernetesRegistry(_configured_targets(), settings.K8S_DEFAULT_TARGET)
+k8s_service = k8s_registry.get()  # Default target
 
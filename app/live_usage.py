@@ -0,0 +1,244 @@
+"""
+Live CPU and memory usage of instances, from the metrics.k8s.io API.
+
+Every namespace in use (cluster namespaces, and the VM pool namespace of each
+target) has a NamespacePoller that lists the namespace's PodMetrics every
+METRICS_POLL_INTERVAL_SECONDS and appends each instance's usage to a ring
+buffer of METRICS_HISTORY_SIZE samples. Memory is therefore bounded by the
+number of running instances; instances that leave the listing lose their
+buffer. The pollers are driven by METRICS_POLL_WORKERS threads from a queue
+ordered by due time, and the namespace set is refreshed from the database
+every METRICS_NAMESPACE_REFRESH_SECONDS. A namespace whose poll fails is
+retried with exponential backoff.
+
+Routes only read the buffers; they never call the metrics API. Each API
+process polls on its own.
+"""
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.database import SessionLocal
+from app.k8s_service import KubernetesRegistry, k8s_registry
+from app.metrics import METRICS_POLL_ERRORS
+from app.models import Cluster
+from app.schemas import UsageSample
+
+logger = logging.getLogger(__name__)
+
+Sample = Tuple[datetime, float, float]  # Sampled at (naive UTC), CPU cores, memory GB
+NamespaceKey = Tuple[str, str]  # Target name, namespace
+
+MAX_BACKOFF_SECONDS = 600.0
+_REFRESH = object()  # Queue entry that refreshes the namespace set
+
+
+def _sampled_at(timestamp: Optional[str]) -> datetime:
+    if timestamp:
+        try:
+            return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).astimezone(timezone.utc).replace(tzinfo=None)
+        except ValueError:
+            pass
+    return datetime.utcnow()
+
+
+def usage_sample(sample: Optional[Sample]) -> Optional[UsageSample]:
+    if sample is None:
+        return None
+    return UsageSample(sampled_at=sample[0], cpu=sample[1], memory=sample[2])
+
+
+class UsageHistory:
+    """Ring buffers of recent usage samples per namespace and instance"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._namespaces: Dict[NamespaceKey, Dict[str, Deque[Sample]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: NamespaceKey, usage: Dict[str, Tuple[Optional[str], float, float]]):
+        """Append one poll of a namespace; instances missing from it lose their history"""
+        with self._lock:
+            previous = self._namespaces.get(key, {})
+            series = {}
+            for name, (timestamp, cpu, memory) in usage.items():
+                buffer = previous.get(name)
+                if buffer is None:
+                    buffer = deque(maxlen=self.size)
+                sampled_at = _sampled_at(timestamp)
+                # The metrics server refreshes less often than it may be polled
+                if not buffer or buffer[-1][0] != sampled_at:
+                    buffer.append((sampled_at, cpu, memory))
+                series[name] = buffer
+            self._namespaces[key] = series
+
+    def drop(self, key: NamespaceKey):
+        with self._lock:
+            self._namespaces.pop(key, None)
+
+    def samples(self, key: NamespaceKey, name: str) -> List[Sample]:
+        """Samples of one instance, oldest first"""
+        with self._lock:
+            buffer = self._namespaces.get(key, {}).get(name)
+            return list(buffer) if buffer else []
+
+    def latest(self, key: NamespaceKey, name: str) -> Optional[Sample]:
+        with self._lock:
+            buffer = self._namespaces.get(key, {}).get(name)
+            return buffer[-1] if buffer else None
+
+
+class NamespacePoller:
+    """Polls the pod metrics of one namespace into the history"""
+
+    def __init__(self, registry: KubernetesRegistry, key: NamespaceKey, history: UsageHistory, interval: float):
+        self.registry = registry
+        self.key = key
+        self.history = history
+        self.interval = interval
+        self.failures = 0
+        self.active = True
+
+    def poll(self) -> float:
+        """Poll once, returning the delay until the next poll"""
+        target, namespace = self.key
+        try:
+            usage = self.registry.get(target).list_pod_metrics(namespace)
+        except Exception as e:
+            METRICS_POLL_ERRORS.labels(target=target).inc()
+            if not self.failures:
+                logger.warning("Polling pod metrics of namespace %s on target '%s' failed: %s", namespace, target, e)
+            self.failures += 1
+            return min(self.interval * 2 ** self.failures, MAX_BACKOFF_SECONDS)
+        self.failures = 0
+        if self.active:
+            self.history.record(self.key, usage)
+        return self.interval
+
+
+class LiveUsageMonitor:
+    """Namespace pollers and the worker threads that run them when due"""
+
+    def __init__(self, registry: KubernetesRegistry, interval: float = None, workers: int = None,
+                 history_size: int = None, refresh_interval: float = None):
+        self.registry = registry
+        self.interval = interval if interval is not None else settings.METRICS_POLL_INTERVAL_SECONDS
+        self.workers = workers if workers is not None else settings.METRICS_POLL_WORKERS
+        self.refresh_interval = (
+            refresh_interval if refresh_interval is not None else settings.METRICS_NAMESPACE_REFRESH_SECONDS
+        )
+        self.history = UsageHistory(history_size if history_size is not None else settings.METRICS_HISTORY_SIZE)
+        self._pollers: Dict[NamespaceKey, NamespacePoller] = {}
+        # (due monotonic time, sequence, poller or _REFRESH)
+        self._queue: List[Tuple[float, int, object]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        self._stop.clear()
+        self._schedule(_REFRESH, 0)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"metrics-poller-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        with self._cond:
+            self._queue.clear()
+            self._pollers.clear()
+
+    def _schedule(self, entry, delay: float):
+        with self._cond:
+            heapq.heappush(self._queue, (time.monotonic() + delay, next(self._seq), entry))
+            self._cond.notify()
+
+    def _next(self):
+        """Wait for the earliest due entry, None once stopped"""
+        with self._cond:
+            while not self._stop.is_set():
+                wait = None
+                if self._queue:
+                    wait = self._queue[0][0] - time.monotonic()
+                    if wait <= 0:
+                        return heapq.heappop(self._queue)[2]
+                self._cond.wait(wait)
+        return None
+
+    def _run(self):
+        while True:
+            entry = self._next()
+            if entry is None:
+                return
+            if entry is _REFRESH:
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("Refreshing the namespaces to poll failed")
+                self._schedule(_REFRESH, self.refresh_interval)
+            elif entry.active:
+                delay = entry.poll()
+                if entry.active:
+                    self._schedule(entry, delay)
+                else:
+                    self.history.drop(entry.key)
+
+    def namespaces(self) -> Set[NamespaceKey]:
+        """Namespaces holding instances, on targets that have an API client"""
+        db = SessionLocal()
+        try:
+            keys = {
+                (target or self.registry.default, namespace)
+                for target, namespace in db.query(Cluster.k8s_target, Cluster.namespace)
+            }
+        finally:
+            db.close()
+        if settings.VM_POOL_SHAPES:
+            keys.update((name, settings.VM_POOL_NAMESPACE) for name in self.registry.names())
+        configured = {service.name for service in self.registry.services() if service.custom_api is not None}
+        return {key for key in keys if key[0] in configured}
+
+    def refresh(self):
+        """Start pollers for new namespaces and stop those of namespaces gone"""
+        current = self.namespaces()
+        added = []
+        with self._cond:
+            for key in list(self._pollers):
+                if key not in current:
+                    self._pollers.pop(key).active = False
+                    self.history.drop(key)
+            for key in current - self._pollers.keys():
+                poller = NamespacePoller(self.registry, key, self.history, self.interval)
+                self._pollers[key] = poller
+                added.append(poller)
+        for poller in added:
+            # Spread the first polls over the interval
+            self._schedule(poller, random.uniform(0, self.interval))
+
+    def _key(self, target: Optional[str], namespace: str) -> NamespaceKey:
+        return target or self.registry.default, namespace
+
+    def samples(self, target: Optional[str], namespace: str, name: str) -> List[Sample]:
+        """Recent samples of an instance's resource, oldest first"""
+        return self.history.samples(self._key(target, namespace), name)
+
+    def latest(self, target: Optional[str], namespace: str, name: str) -> Optional[Sample]:
+        return self.history.latest(self._key(target, namespace), name)
+
+
+# Singleton instance
+live_usage = LiveUsageMonitor(k8s_registry)
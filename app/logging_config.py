@@ -0,0 +1,192 @@
+"""
+Logging setup: structured JSON output through a non-blocking queue.
+
+Application threads only build a LogRecord and push it onto an in-memory queue;
+formatting and I/O happen on a single listener thread. Hot loops are protected
+by per-logger sampling and rate limiting filters.
+"""
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from app.config import settings
+from app.tracing import TraceContextFilter
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [trace=%(trace_id)s span=%(span_id)s] %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through ``extra=``
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "trace_id", "span_id", "suppressed",
+}
+
+_listener: Optional[QueueListener] = None
+_exception_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record as a single-line JSON object"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", "-")
+        if trace_id != "-":
+            payload["trace_id"] = trace_id
+            payload["span_id"] = record.span_id
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            payload["suppressed"] = suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        elif record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class _PrefixFilter(logging.Filter):
+    """Base for filters that apply to a logger and its children by name prefix"""
+
+    def __init__(self, prefix: str):
+        super().__init__()
+        self.prefix = prefix
+
+    def matches(self, record: logging.LogRecord) -> bool:
+        name = record.name
+        return name == self.prefix or name.startswith(self.prefix + ".")
+
+
+class SamplingFilter(_PrefixFilter):
+    """
+    Keep a random fraction of records below WARNING from the matching loggers.
+    Warnings and errors are never sampled out.
+    """
+
+    def __init__(self, prefix: str, ratio: float):
+        super().__init__(prefix)
+        self.ratio = ratio
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.matches(record):
+            return True
+        return random.random() < self.ratio
+
+
+class RateLimitFilter(_PrefixFilter):
+    """
+    Token bucket per (logger, message template) for the matching loggers.
+    Because messages use lazy %-formatting, every iteration of a hot loop shares
+    one template and therefore one bucket. The first record let through after a
+    burst carries the number of records suppressed in between. Warnings and
+    errors are never rate limited.
+    """
+
+    def __init__(self, prefix: str, per_second: float, burst: Optional[float] = None):
+        super().__init__(prefix)
+        self.rate = per_second
+        self.burst = burst if burst is not None else max(per_second, 1.0)
+        self._buckets: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.matches(record):
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                # [tokens, last refill time, suppressed since last emit]
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1.0:
+                bucket[0] = tokens
+                bucket[2] += 1
+                return False
+            bucket[0] = tokens - 1.0
+            record.suppressed = bucket[2]
+            bucket[2] = 0
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks on the calling thread. Only the message is
+    merged there; output formatting and I/O happen on the listener thread.
+    When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments now: by the time the listener formats the record
+        # they may have changed, or be ORM instances whose session is closed
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging():
+    """Install the queue handler on the root logger and start the listener thread"""
+    global _listener
+
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    # Trace ids live in context variables, so they must be captured before the hand-off
+    handler.addFilter(TraceContextFilter())
+    for prefix, ratio in settings.LOG_SAMPLING.items():
+        handler.addFilter(SamplingFilter(prefix, ratio))
+    for prefix, per_second in settings.LOG_RATE_LIMITS.items():
+        handler.addFilter(RateLimitFilter(prefix, per_second))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Stop the listener thread, flushing records still in the queue"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
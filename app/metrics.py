@@ -0,0 +1,68 @@
+"""
+Prometheus metrics, exposed at /metrics
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+K8S_REQUESTS = Counter(
+    "kubekloud_k8s_requests_total",
+    "Kubernetes API calls by target cluster, verb and outcome",
+    ["target", "verb", "outcome"],
+)
+K8S_RETRIES = Counter(
+    "kubekloud_k8s_retries_total",
+    "Kubernetes API call attempts that were retried",
+    ["target", "verb"],
+)
+K8S_LATENCY = Histogram(
+    "kubekloud_k8s_request_duration_seconds",
+    "Latency of individual Kubernetes API call attempts",
+    ["target", "verb"],
+)
+K8S_CIRCUIT_STATE = Gauge(
+    "kubekloud_k8s_circuit_state",
+    "Kubernetes API circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ["target"],
+)
+K8S_CIRCUIT_REJECTIONS = Counter(
+    "kubekloud_k8s_circuit_rejections_total",
+    "Kubernetes API calls rejected because the circuit was open",
+    ["target"],
+)
+K8S_COALESCED_READS = Counter(
+    "kubekloud_k8s_coalesced_reads_total",
+    "Kubernetes reads answered by another caller's in-flight or batched call",
+    ["target"],
+)
+DB_REPLICA_LAG = Gauge(
+    "kubekloud_db_replica_lag_seconds",
+    "Replay lag of each read replica, -1 while its lag check fails",
+    ["replica"],
+)
+ADMISSION_QUEUED = Gauge(
+    "kubekloud_admission_queued",
+    "Expensive operations waiting for an admission slot",
+)
+ADMISSION_WAIT = Histogram(
+    "kubekloud_admission_wait_seconds",
+    "Time expensive operations waited for an admission slot",
+    ["operation"],
+)
+ADMISSION_SHED = Counter(
+    "kubekloud_admission_shed_total",
+    "Expensive operations answered with 429 instead of being queued",
+    ["operation"],
+)
+SCHEDULED_RUNS = Counter(
+    "kubekloud_scheduled_runs_total",
+    "Scheduled suspends and resumes of clusters by outcome",
+    ["action", "status"],
+)
+SCHEDULE_LAG = Histogram(
+    "kubekloud_schedule_lag_seconds",
+    "Delay between a schedule falling due and its clusters starting",
+)
+METRICS_POLL_ERRORS = Counter(
+    "kubekloud_metrics_poll_errors_total",
+    "Failed polls of the metrics.k8s.io API for a namespace",
+    ["target"],
+)
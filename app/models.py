@@ -1,9 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, Index, JSON, Enum as SQLEnum
+from sqlalchemy.orm import mapped_column, relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import enum
 
+from app.tokens import hash_token, token_prefix
+
 Base = declarative_base()
 
 
@@ -20,12 +22,29 @@ class InstanceStatus(enum.Enum):
     FAILED = "failed"
 
 
+class OperationKind(enum.Enum):
+    CREATE_INSTANCE = "create_instance"
+    DELETE_INSTANCE = "delete_instance"
+    START_INSTANCE = "start_instance"
+    STOP_INSTANCE = "stop_instance"
+    DELETE_NAMESPACE = "delete_namespace"
+
+
+class OperationStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
 class User(Base):
     __tablename__ = "users"
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
-    token = Column(String, unique=True, index=True, nullable=False)
+    # Keyed digest of the API token (app/tokens.py); the column keeps its original name
+    token_hash = Column("token", String, unique=True, index=True, nullable=False)
+    token_prefix = Column(String, index=True, nullable=True)  # Lookup prefix of token_hash
     quota_cpu = Column(Float, nullable=False)  # Total CPU cores allowed
     quota_memory = Column(Float, nullable=False)  # Total memory in GB allowed
     used_cpu = Column(Float, default=0.0)
@@ -33,6 +52,12 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     clusters = relationship("Cluster", back_populates="owner", cascade="all, delete-orphan")
+    schedules = relationship("Schedule", back_populates="owner", cascade="all, delete-orphan")
+    
+    def set_token(self, token: str):
+        """Store the keyed digest of token, never the token itself"""
+        self.token_hash = hash_token(token)
+        self.token_prefix = token_prefix(self.token_hash)
 
 
 class Cluster(Base):
@@ -45,11 +70,15 @@ class Cluster(Base):
     cpu_per_instance = Column(Float, nullable=False)
     memory_per_instance = Column(Float, nullable=False)  # in GB
     instance_count = Column(Integer, nullable=False)
+    next_instance_index = Column(Integer, default=0)  # Suffix for the next instance name, never reused
+    k8s_target = Column(String, nullable=True)  # Target Kubernetes cluster, None for the default target
+    statefulset = Column(String, nullable=True)  # StatefulSet backing a container cluster, None for bare pods
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     owner = relationship("User", back_populates="clusters")
     instances = relationship("Instance", back_populates="cluster", cascade="all, delete-orphan")
+    schedules = relationship("Schedule", back_populates="cluster", cascade="all, delete-orphan")
 
 
 class Instance(Base):
@@ -58,10 +87,186 @@ class Instance(Base):
     id = Column(Integer, primary_key=True, index=True)
     cluster_id = Column(Integer, ForeignKey("clusters.id"), nullable=False)
     instance_name = Column(String, unique=True, index=True, nullable=False)
-    status = Column(SQLEnum(InstanceStatus), default=InstanceStatus.PENDING)
+    # Active history keeps the previous status at hand for the fleet counters (app/fleet.py)
+    status = mapped_column(SQLEnum(InstanceStatus), default=InstanceStatus.PENDING, active_history=True)
     k8s_resource_name = Column(String)  # Name of the k8s resource (pod/vm)
+    k8s_namespace = Column(String, nullable=True)  # Set when the resource lives outside the cluster namespace
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     cluster = relationship("Cluster", back_populates="instances")
+    
+    @property
+    def resource_name(self) -> str:
+        """Name of the Kubernetes object backing this instance"""
+        return self.k8s_resource_name or self.instance_name
+    
+    @property
+    def resource_namespace(self) -> str:
+        """Namespace of the Kubernetes object backing this instance"""
+        return self.k8s_namespace or self.cluster.namespace
+
+
+
+class Operation(Base):
+    """
+    A queued Kubernetes mutation, drained by the workers in app/work_queue.py.
+    Rows carry everything needed to run the call, so they outlive the
+    instances and clusters they were created for.
+    """
+    __tablename__ = "operations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(SQLEnum(OperationKind), nullable=False)
+    status = Column(SQLEnum(OperationStatus), default=OperationStatus.QUEUED, nullable=False)
+    instance_id = Column(Integer, nullable=True)  # Not a foreign key: the instance may be deleted first
+    cluster_id = Column(Integer, nullable=True)
+    instance_name = Column(String, nullable=True)
+    instance_type = Column(SQLEnum(InstanceType), nullable=True)
+    k8s_target = Column(String, nullable=True)
+    namespace = Column(String, nullable=False)
+    cpu = Column(Float, nullable=True)
+    memory = Column(Float, nullable=True)
+    target_status = Column(SQLEnum(InstanceStatus), nullable=True)  # Instance status on success
+    previous_status = Column(SQLEnum(InstanceStatus), nullable=True)  # Instance status restored on failure
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Not claimable before this
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_operations_claim", "status", "available_at"),
+    )
+
+
+class UsageEvent(Base):
+    """
+    Append-only record of an instance status change, written by the flush
+    listener in app/usage.py. Owner and size are copied so the history
+    survives the deletion of the instance and its cluster.
+    """
+    __tablename__ = "usage_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    instance_id = Column(Integer, nullable=False)  # Not a foreign key: the instance may be deleted
+    cluster_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, nullable=True)
+    cpu = Column(Float, nullable=True)
+    memory = Column(Float, nullable=True)
+    status = Column(String, nullable=False)  # InstanceStatus value, or "deleted"
+    occurred_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class UsageRollup(Base):
+    """Instance-hours of one owner in one hour or day"""
+    __tablename__ = "usage_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String, nullable=False)  # "hour" or "day"
+    period_start = Column(DateTime, nullable=False)
+    owner_id = Column(Integer, nullable=False)
+    instance_hours = Column(Float, nullable=False)
+    cpu_hours = Column(Float, nullable=False)
+    memory_gb_hours = Column(Float, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_usage_rollups_owner_period", "granularity", "owner_id", "period_start", unique=True),
+    )
+
+
+class UsageRunning(Base):
+    """Instances that were running when the rollups last stopped"""
+    __tablename__ = "usage_running"
+    
+    instance_id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, nullable=False)
+    cpu = Column(Float, nullable=False)
+    memory = Column(Float, nullable=False)
+    since = Column(DateTime, nullable=False)
+
+
+class UsageWatermark(Base):
+    """Single row: events before rolled_until are included in the rollups"""
+    __tablename__ = "usage_watermark"
+    
+    id = Column(Integer, primary_key=True)
+    rolled_until = Column(DateTime, nullable=False)
+
+
+class InstanceCounter(Base):
+    """
+    Number of instances of one owner per instance type and status, kept
+    current in the same transaction as every instance change (app/fleet.py)
+    """
+    __tablename__ = "instance_counters"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, nullable=False)
+    instance_type = Column(String, nullable=False)  # InstanceType value
+    status = Column(String, nullable=False)  # InstanceStatus value
+    count = Column(Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_instance_counters_key", "owner_id", "instance_type", "status", unique=True),
+    )
+
 
+class ImportCheckpoint(Base):
+    """Progress of an import (app/transfer.py): rows up to last_id of table_name are committed"""
+    __tablename__ = "import_checkpoints"
+    
+    export_id = Column(String, primary_key=True)
+    table_name = Column(String, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+
+class Schedule(Base):
+    """
+    Recurring suspend or resume of one cluster, or of all of an owner's
+    clusters when cluster_id is empty, run by app/schedules.py
+    """
+    __tablename__ = "schedules"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    cluster_id = Column(Integer, ForeignKey("clusters.id"), nullable=True, index=True)
+    action = Column(String, nullable=False)  # "suspend" or "resume"
+    time_of_day = Column(String, nullable=False)  # HH:MM in timezone
+    days = Column(String, nullable=False)  # Comma-separated weekdays, e.g. "mon,tue,wed,thu,fri"
+    timezone = Column(String, nullable=False, default="UTC")
+    enabled = Column(Boolean, nullable=False, default=True)
+    next_run_at = Column(DateTime, nullable=False)  # UTC
+    last_run_at = Column(DateTime, nullable=True)
+    last_status = Column(String, nullable=True)  # Outcome of the last run: succeeded, partial or failed
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    owner = relationship("User", back_populates="schedules")
+    cluster = relationship("Cluster", back_populates="schedules")
+    
+    __table_args__ = (
+        Index("ix_schedules_due", "enabled", "next_run_at"),
+    )
+
+
+class ScheduleRun(Base):
+    """Outcome of one scheduled suspend or resume of one cluster"""
+    __tablename__ = "schedule_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    schedule_id = Column(Integer, nullable=False)  # Not a foreign key: runs outlive their schedule
+    cluster_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)
+    status = Column(String, nullable=False)  # succeeded, partial, failed or skipped
+    detail = Column(JSON, nullable=True)  # Instance counts, or the error
+    started_at = Column(DateTime, nullable=False, index=True)
+    finished_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_schedule_runs_schedule", "schedule_id", "started_at"),
+    )
@@ -0,0 +1,141 @@
+"""
+Pool of pre-created namespaces per target Kubernetes cluster.
+
+Creating a namespace (and running it through admission webhooks) is a large
+share of cluster creation latency. With NAMESPACE_POOL_SIZE > 0, a background
+thread keeps that many namespaces labelled cmp-pool=available in each target.
+create_cluster claims one by relabelling it; the claim carries the resource
+version that was listed, so two replicas can never claim the same namespace.
+Claimed namespaces keep their generated name and are deleted with the cluster
+like any other. When the pool is empty, the namespace is created inline.
+"""
+import logging
+import threading
+import uuid
+from collections import deque
+from typing import Optional
+
+from app.config import settings
+from app.k8s_service import KubernetesRegistry, KubernetesService, k8s_registry
+
+logger = logging.getLogger(__name__)
+
+POOL_LABEL = "cmp-pool"
+CLUSTER_ANNOTATION = "cmp/cluster"
+
+
+class NamespacePool:
+    """Pre-created namespaces of one target"""
+
+    def __init__(self, service: KubernetesService, size: int, prefix: str, refill_seconds: float):
+        self.service = service
+        self.size = size
+        self.prefix = prefix
+        self.refill_seconds = refill_seconds
+        self._available = deque()  # (name, resource_version)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.service.core_api is None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"namespace-pool-{self.service.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refill()
+            except Exception as e:
+                logger.warning("Namespace pool refill on target '%s' failed: %s", self.service.name, e)
+            self._wake.wait(self.refill_seconds)
+            self._wake.clear()
+
+    def refill(self):
+        """Top the pool up to size and refresh the list of claimable namespaces"""
+        available = self.service.list_namespaces(f"{POOL_LABEL}=available")
+        missing = self.size - len(available)
+        if missing > 0:
+            for _ in range(missing):
+                self.service.create_namespace(
+                    f"{self.prefix}-{uuid.uuid4().hex[:12]}", labels={POOL_LABEL: "available"}
+                )
+            available = self.service.list_namespaces(f"{POOL_LABEL}=available")
+            logger.info("Namespace pool on target '%s' refilled to %s", self.service.name, len(available))
+        with self._lock:
+            self._available = deque(sorted(available.items()))
+
+    def claim(self, cluster_name: str) -> Optional[str]:
+        """Claim an available namespace for cluster_name, None if the pool is empty"""
+        claimed = None
+        while claimed is None:
+            with self._lock:
+                if not self._available:
+                    break
+                name, resource_version = self._available.popleft()
+            # Fails if another replica claimed it first, then try the next one
+            if self.service.update_namespace_metadata(
+                name, labels={POOL_LABEL: "claimed"},
+                annotations={CLUSTER_ANNOTATION: cluster_name},
+                resource_version=resource_version
+            ):
+                claimed = name
+        self._wake.set()
+        return claimed
+
+    def release(self, namespace: str):
+        """Return a claimed namespace that ended up unused"""
+        if self.service.update_namespace_metadata(namespace, labels={POOL_LABEL: "available"}):
+            self._wake.set()
+
+
+class NamespacePools:
+    """Namespace pools for every target"""
+
+    def __init__(self, registry: KubernetesRegistry):
+        self.pools = {
+            service.name: NamespacePool(
+                service,
+                size=settings.NAMESPACE_POOL_SIZE,
+                prefix=settings.NAMESPACE_POOL_PREFIX,
+                refill_seconds=settings.NAMESPACE_POOL_REFILL_SECONDS,
+            )
+            for service in registry.services()
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return settings.NAMESPACE_POOL_SIZE > 0
+
+    def start(self):
+        if self.enabled:
+            for pool in self.pools.values():
+                pool.start()
+
+    def stop(self):
+        for pool in self.pools.values():
+            pool.stop()
+
+    def claim(self, target: str, cluster_name: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return self.pools[target].claim(cluster_name)
+
+    def release(self, target: str, namespace: str):
+        self.pools[target].release(namespace)
+
+
+# Singleton instance
+namespace_pools = NamespacePools(k8s_registry)
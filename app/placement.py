@@ -0,0 +1,84 @@
+"""
+Placement of new clusters onto target Kubernetes clusters.
+
+The scheduler picks the target with the most free CPU among those that can
+fit the whole cluster, falling back to the target with the most free CPU when
+none can. Free capacity comes from the watch-maintained view in
+app/capacity.py; until a target's watches have synced it is read by listing
+nodes and pods and cached for K8S_CAPACITY_TTL_SECONDS.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from app.capacity import capacity_monitor
+from app.config import settings
+from app.k8s_service import KubernetesRegistry, k8s_registry
+
+logger = logging.getLogger(__name__)
+
+
+class PlacementScheduler:
+    """Chooses a target for a new cluster based on free capacity"""
+
+    def __init__(self, registry: KubernetesRegistry, ttl: float):
+        self.registry = registry
+        self.ttl = ttl
+        self._capacity: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def free_capacity(self, target: str) -> Optional[Dict[str, float]]:
+        """Free capacity of a target, None if it could not be read"""
+        headroom = capacity_monitor.headroom(target)
+        if headroom is not None:
+            return headroom
+
+        with self._lock:
+            cached = self._capacity.get(target)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl:
+            return cached[0]
+
+        try:
+            capacity = self.registry.get(target).get_free_capacity()
+        except Exception as e:
+            logger.warning("Could not read free capacity of target '%s': %s", target, e)
+            capacity = None
+        with self._lock:
+            self._capacity[target] = (capacity, time.monotonic())
+        return capacity
+
+    def reserve(self, target: str, cpu: float, memory: float):
+        """Deduct a placement from the cached capacity until the next refresh"""
+        with self._lock:
+            cached = self._capacity.get(target)
+            if cached is not None and cached[0] is not None:
+                capacity = {"cpu": cached[0]["cpu"] - cpu, "memory": cached[0]["memory"] - memory}
+                self._capacity[target] = (capacity, cached[1])
+
+    def choose_target(self, cpu_needed: float, memory_needed: float) -> str:
+        """Return the name of the target a new cluster should be created on"""
+        names = self.registry.names()
+        if len(names) == 1:
+            return names[0]
+
+        candidates = []
+        for name in names:
+            capacity = self.free_capacity(name)
+            if capacity is not None:
+                candidates.append((name, capacity))
+        if not candidates:
+            logger.warning("No target reported free capacity, using default target")
+            return self.registry.default
+
+        fitting = [
+            (name, capacity) for name, capacity in candidates
+            if capacity["cpu"] >= cpu_needed and capacity["memory"] >= memory_needed
+        ]
+        name, _ = max(fitting or candidates, key=lambda item: item[1]["cpu"])
+        self.reserve(name, cpu_needed, memory_needed)
+        return name
+
+
+# Singleton instance
+placement_scheduler = PlacementScheduler(k8s_registry, settings.K8S_CAPACITY_TTL_SECONDS)
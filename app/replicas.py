@@ -0,0 +1,154 @@
+"""
+Read-replica routing for read-only routes.
+
+With DATABASE_REPLICA_URLS set, routes that only read take their session from
+get_read_db instead of get_db. A background thread measures each replica's
+replay lag; replicas lagging more than DATABASE_REPLICA_MAX_LAG_SECONDS, or
+failing the check, get no reads until they catch up. Without a usable replica,
+reads go to the primary.
+
+Read-your-writes: every mutating request marks its bearer token in the shared
+cache for as long as a replica may still lag behind that write, and reads made
+with a marked token go to the primary. Use the redis cache backend so the mark
+is seen by every API replica.
+"""
+import itertools
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.cache import cache
+from app.config import settings
+from app.database import SessionLocal
+from app.metrics import DB_REPLICA_LAG
+from app.tokens import bearer_token, hash_token
+
+logger = logging.getLogger(__name__)
+
+# Replay lag in seconds; 0 when the replica has replayed everything it received
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def recent_write_key(token: str) -> str:
+    return "db:recent-write:" + hash_token(token)
+
+
+class Replica:
+    """One read replica with its engine, session factory and last measured lag"""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine: Engine = create_engine(url)
+        self.sessions = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.lag: Optional[float] = None  # None until measured, or when the check failed
+
+    def measure_lag(self) -> float:
+        with self.engine.connect() as conn:
+            if self.engine.dialect.name != "postgresql":
+                # Lag is only measured on PostgreSQL; other replicas only need to answer
+                conn.execute(text("SELECT 1"))
+                return 0.0
+            return float(conn.execute(POSTGRES_LAG_QUERY).scalar() or 0.0)
+
+
+class ReplicaRouter:
+    """Chooses the session for read-only routes and tracks replica lag"""
+
+    def __init__(self, urls: List[str], max_lag: float, check_interval: float):
+        self.replicas = [Replica(f"replica-{i}", url) for i, url in enumerate(urls)]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = itertools.count()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    @property
+    def write_mark_seconds(self) -> float:
+        """How long a write may be missing from a replica that is still in use"""
+        return self.max_lag + self.check_interval
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.check()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-lag", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+    def check(self):
+        for replica in self.replicas:
+            try:
+                replica.lag = replica.measure_lag()
+            except Exception as e:
+                if replica.lag is not None:
+                    logger.warning("Read replica %s failed its lag check: %s", replica.name, e)
+                replica.lag = None
+            DB_REPLICA_LAG.labels(replica=replica.name).set(-1 if replica.lag is None else replica.lag)
+
+    def healthy(self) -> List[Replica]:
+        return [replica for replica in self.replicas if replica.lag is not None and replica.lag <= self.max_lag]
+
+    def status(self) -> Dict[str, Optional[float]]:
+        return {replica.name: replica.lag for replica in self.replicas}
+
+    def mark_write(self, request: Request):
+        """Send this caller's reads to the primary until replicas have its write"""
+        token = bearer_token(request)
+        if self.enabled and token is not None:
+            cache.set(recent_write_key(token), 1, ttl=self.write_mark_seconds)
+
+    def session(self, request: Request) -> Session:
+        """A replica session for this read, or a primary session"""
+        token = bearer_token(request)
+        if token is not None and cache.get(recent_write_key(token)) is not None:
+            return SessionLocal()
+        healthy = self.healthy()
+        if not healthy:
+            return SessionLocal()
+        replica = healthy[next(self._next) % len(healthy)]
+        db = replica.sessions()
+        db.info["replica"] = replica.name
+        return db
+
+
+def is_replica_session(db: Session) -> bool:
+    return "replica" in db.info
+
+
+def get_read_db(request: Request):
+    """Dependency to get a session for a read-only route"""
+    db = replica_router.session(request) if replica_router.enabled else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Singleton instance
+replica_router = ReplicaRouter(
+    settings.DATABASE_REPLICA_URLS,
+    max_lag=settings.DATABASE_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DATABASE_REPLICA_CHECK_SECONDS,
+)
@@ -0,0 +1,171 @@
+"""
+Resilient Kubernetes API calls: per-call deadlines, jittered exponential
+retries for transient failures, and a circuit breaker that fails fast while
+the API server is unhealthy.
+
+Failures surface as ApiException subclasses, so KubernetesService methods
+keep handling every error in their existing ``except ApiException`` blocks.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Callable
+
+from kubernetes.client.rest import ApiException
+from urllib3.exceptions import HTTPError as TransportError
+
+from app.config import settings
+from app.metrics import (
+    K8S_CIRCUIT_REJECTIONS, K8S_CIRCUIT_STATE, K8S_LATENCY, K8S_REQUESTS, K8S_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+# Verbs that can be repeated safely; patches set absolute values. Creates are
+# not retried: a create whose response was lost may have succeeded, and a
+# blind repeat would only be safe where every caller treats 409 as success.
+IDEMPOTENT_VERBS = frozenset({"get", "list", "delete", "patch"})
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(ApiException):
+    """Raised without calling the API server while the circuit is open"""
+
+    def __init__(self):
+        super().__init__(status=503, reason="Kubernetes API circuit open")
+
+
+class KubernetesUnavailable(ApiException):
+    """The API server could not be reached or did not answer before the deadline"""
+
+    def __init__(self, reason: str):
+        super().__init__(status=504, reason=reason)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    After failure_threshold transient failures in a row the circuit opens and
+    calls are rejected for reset_timeout seconds; then a single trial call is
+    let through (half-open) and its outcome closes or reopens the circuit.
+    """
+
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, target: str = "default"):
+        self.target = target
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        K8S_CIRCUIT_STATE.labels(target).set(self.state)
+
+    def _set_state(self, state: int):
+        if state != self.state:
+            logger.warning("Kubernetes API circuit for target '%s' %s", self.target,
+                           {self.CLOSED: "closed", self.HALF_OPEN: "half-open", self.OPEN: "opened"}[state])
+        self.state = state
+        K8S_CIRCUIT_STATE.labels(self.target).set(state)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, ApiException):
+        return error.status in RETRYABLE_STATUSES
+    return isinstance(error, TransportError)
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff"""
+    ceiling = min(settings.K8S_RETRY_MAX_BACKOFF_SECONDS,
+                  settings.K8S_RETRY_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+class ResilientCaller:
+    """Wraps Kubernetes client calls with a deadline, retries and a circuit breaker"""
+
+    def __init__(self, target: str = "default", breaker: CircuitBreaker = None):
+        self.target = target
+        self.breaker = breaker or CircuitBreaker(
+            settings.K8S_BREAKER_FAILURE_THRESHOLD,
+            settings.K8S_BREAKER_RESET_SECONDS,
+            target,
+        )
+
+    def call(self, verb: str, func: Callable, **kwargs):
+        """
+        Call func(**kwargs) with a request timeout. Transient failures of
+        idempotent verbs are retried until K8S_RETRY_MAX_ATTEMPTS or the overall
+        K8S_CALL_DEADLINE_SECONDS is reached. The circuit breaker admits and
+        counts the call once, whatever the number of attempts.
+        """
+        if not self.breaker.allow():
+            K8S_CIRCUIT_REJECTIONS.labels(self.target).inc()
+            K8S_REQUESTS.labels(self.target, verb, "rejected").inc()
+            raise CircuitOpenError()
+
+        deadline = time.monotonic() + settings.K8S_CALL_DEADLINE_SECONDS
+        max_attempts = settings.K8S_RETRY_MAX_ATTEMPTS if verb in IDEMPOTENT_VERBS else 1
+        attempt = 0
+
+        while True:
+            remaining = deadline - time.monotonic()
+            timeout = max(0.1, min(settings.K8S_REQUEST_TIMEOUT_SECONDS, remaining))
+            start = time.monotonic()
+            try:
+                result = func(_request_timeout=timeout, **kwargs)
+            except Exception as e:
+                K8S_LATENCY.labels(self.target, verb).observe(time.monotonic() - start)
+                if not _is_transient(e):
+                    # The API server answered; a 4xx says nothing about its health
+                    self.breaker.record_success()
+                    K8S_REQUESTS.labels(self.target, verb, "error").inc()
+                    raise
+                attempt += 1
+                delay = _backoff(attempt)
+                if attempt >= max_attempts or time.monotonic() + delay >= deadline:
+                    self.breaker.record_failure()
+                    K8S_REQUESTS.labels(self.target, verb, "error").inc()
+                    if isinstance(e, ApiException):
+                        raise
+                    raise KubernetesUnavailable(str(e)) from e
+                K8S_RETRIES.labels(self.target, verb).inc()
+                logger.warning("Transient Kubernetes error on %s to '%s' (attempt %s), retrying in %.2fs: %s",
+                               verb, self.target, attempt, delay, e)
+                time.sleep(delay)
+                continue
+
+            K8S_LATENCY.labels(self.target, verb).observe(time.monotonic() - start)
+            self.breaker.record_success()
+            K8S_REQUESTS.labels(self.target, verb, "success").inc()
+            return result
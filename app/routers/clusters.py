@@ -1,13 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
-from app.models import User, Cluster, Instance, InstanceStatus
+from app.models import User, Cluster, Instance, InstanceStatus, InstanceType, OperationKind
 from app.schemas import (
-    ClusterCreate, ClusterResponse, ClusterDetail, MessageResponse
+    ClusterCreate, ClusterBulkCreate, ClusterBulkResponse, ClusterBulkResult, ClusterScale,
+    ClusterResponse, ClusterDetail, ClusterLiveUsage, InstanceLiveUsage, MessageResponse
 )
-from app.auth import get_current_user, check_quota, update_quota
-from app.k8s_service import k8s_service
+from app.auth import get_current_user, get_current_user_read, reserve_quota, update_quota
+from app.replicas import get_read_db, is_replica_session
+from app.k8s_service import k8s_registry
+from app.placement import placement_scheduler
+from app.capacity import InsufficientCapacity, capacity_monitor
+from app.namespace_pool import namespace_pools
+from app.vm_pool import vm_pools
+from app.usage import DELETED, record_events
+from app.fleet import count_removed
+from app.cache import cache, cluster_key, instance_status_key
+from app.live_usage import live_usage, usage_sample
+from app.config import settings
+from app.work_queue import enqueue_operation
+from app.suspension import resume_cluster_instances, suspend_cluster_instances
+from app.serialization import FastJSONResponse, FieldSelection, cluster_serializer, instance_serializer
+from app.tracing import bind_context
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,8 +33,42 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/clusters", tags=["clusters"])
 
 
+def _capacity_conflict(error: InsufficientCapacity, count: int, cpu: float, memory: float) -> HTTPException:
+    """409 telling the caller how much room the target has left"""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "message": f"Not enough free capacity on target '{error.target}' for "
+                       f"{count} instances of {cpu} CPU, {memory}GB memory",
+            "target": error.target,
+            "requested": {"instances": count, "cpu_per_instance": cpu, "memory_per_instance": memory},
+            "available": error.headroom,
+        }
+    )
+
+
+def _field_selection(fields: Optional[str], nested=None) -> Optional[FieldSelection]:
+    """Parsed fields= parameter, None to return every field; 400 for unknown fields"""
+    if fields is None:
+        return None
+    try:
+        return FieldSelection(fields, cluster_serializer, nested)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _statefulset_name(cluster_data: ClusterCreate):
+    """
+    StatefulSet backing a new container cluster, None for bare pods.
+    Its pods <cluster>-instance-<ordinal> carry the instance names.
+    """
+    if cluster_data.instance_type == InstanceType.CONTAINER and settings.CONTAINER_STATEFULSET_ENABLED:
+        return f"{cluster_data.name}-instance"
+    return None
+
+
 @router.post("/", response_model=ClusterResponse, status_code=status.HTTP_201_CREATED)
-async def create_cluster(
+def create_cluster(
     cluster_data: ClusterCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -39,38 +91,135 @@ async def create_cluster(
     total_cpu = cluster_data.cpu_per_instance * cluster_data.instance_count
     total_memory = cluster_data.memory_per_instance * cluster_data.instance_count
     
-    # Check quota
-    if not check_quota(current_user, total_cpu, total_memory):
+    # Reserve quota atomically, so concurrent requests cannot both pass a check
+    if not reserve_quota(db, current_user, total_cpu, total_memory):
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Insufficient quota. Requested: {total_cpu} CPU, {total_memory}GB memory. "
                    f"Available: {current_user.quota_cpu - current_user.used_cpu} CPU, "
                    f"{current_user.quota_memory - current_user.used_memory}GB memory"
         )
+    db.commit()
     
-    # Create namespace in Kubernetes
-    if not k8s_service.create_namespace(namespace):
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to create Kubernetes namespace '{namespace}'"
+    admitted = False
+    pooled_namespace = None
+    try:
+        # Place the cluster on a target Kubernetes cluster and make sure it fits there
+        target = placement_scheduler.choose_target(total_cpu, total_memory)
+        try:
+            admitted = capacity_monitor.admit(target, namespace, cluster_data.instance_count,
+                                              cluster_data.cpu_per_instance, cluster_data.memory_per_instance)
+        except InsufficientCapacity as e:
+            raise _capacity_conflict(e, cluster_data.instance_count,
+                                     cluster_data.cpu_per_instance, cluster_data.memory_per_instance)
+        k8s = k8s_registry.get(target)
+        
+        # Take a pre-created namespace from the pool, or create one in Kubernetes
+        pooled_namespace = namespace_pools.claim(target, cluster_data.name)
+        if pooled_namespace is not None:
+            capacity_monitor.move_reservation(target, namespace, pooled_namespace)
+            namespace = pooled_namespace
+        elif not k8s.create_namespace(namespace):
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to create Kubernetes namespace '{namespace}' on target '{target}'"
+            )
+        
+        # Create cluster in database
+        cluster = Cluster(
+            name=cluster_data.name,
+            namespace=namespace,
+            instance_type=cluster_data.instance_type,
+            cpu_per_instance=cluster_data.cpu_per_instance,
+            memory_per_instance=cluster_data.memory_per_instance,
+            instance_count=cluster_data.instance_count,
+            next_instance_index=cluster_data.instance_count,
+            k8s_target=target,
+            statefulset=_statefulset_name(cluster_data),
+            owner_id=current_user.id
         )
-    
-    # Create cluster in database
-    cluster = Cluster(
-        name=cluster_data.name,
-        namespace=namespace,
-        instance_type=cluster_data.instance_type,
-        cpu_per_instance=cluster_data.cpu_per_instance,
-        memory_per_instance=cluster_data.memory_per_instance,
-        instance_count=cluster_data.instance_count,
-        owner_id=current_user.id
-    )
-    db.add(cluster)
-    db.commit()
+        db.add(cluster)
+        db.commit()
+    except Exception:
+        # Nothing was created, give the reserved quota and capacity back
+        db.rollback()
+        if admitted:
+            capacity_monitor.release(target, namespace, cluster_data.instance_count,
+                                     cluster_data.cpu_per_instance, cluster_data.memory_per_instance)
+        if pooled_namespace is not None:
+            namespace_pools.release(target, pooled_namespace)
+        update_quota(db, current_user, -total_cpu, -total_memory)
+        raise
     db.refresh(cluster)
     
+    if cluster.statefulset:
+        # One API call creates every instance, there is nothing to queue
+        instances = [
+            Instance(
+                cluster_id=cluster.id,
+                instance_name=f"{cluster_data.name}-instance-{i}",
+                status=InstanceStatus.PENDING,
+                k8s_resource_name=f"{cluster_data.name}-instance-{i}"
+            )
+            for i in range(cluster_data.instance_count)
+        ]
+        db.add_all(instances)
+        db.commit()
+        success = k8s.create_statefulset(
+            cluster.statefulset,
+            replicas=cluster_data.instance_count,
+            cpu=cluster_data.cpu_per_instance,
+            memory=cluster_data.memory_per_instance,
+            namespace=cluster.namespace
+        )
+        for instance in instances:
+            instance.status = InstanceStatus.RUNNING if success else InstanceStatus.FAILED
+        if not success:
+            logger.error("Failed to create StatefulSet %s", cluster.statefulset)
+            if admitted:
+                capacity_monitor.release(target, cluster.namespace, len(instances),
+                                         cluster_data.cpu_per_instance, cluster_data.memory_per_instance)
+        db.commit()
+        
+        logger.info("Cluster '%s' created as StatefulSet %s with %s instances",
+                    cluster_data.name, cluster.statefulset, len(instances))
+        return cluster
+    
+    if settings.WORK_QUEUE_ENABLED:
+        # Queue the instance creations, workers mark them RUNNING or FAILED
+        instances = [
+            Instance(
+                cluster_id=cluster.id,
+                instance_name=f"{cluster_data.name}-instance-{i}",
+                status=InstanceStatus.PENDING,
+                k8s_resource_name=f"{cluster_data.name}-instance-{i}"
+            )
+            for i in range(cluster_data.instance_count)
+        ]
+        db.add_all(instances)
+        db.flush()
+        pooled = 0
+        for instance in instances:
+            # Instances backed by a warm pooled VM are running already
+            if vm_pools.claim(cluster, instance):
+                pooled += 1
+            else:
+                enqueue_operation(db, OperationKind.CREATE_INSTANCE, cluster, instance,
+                                  target_status=InstanceStatus.RUNNING)
+        db.commit()
+        if admitted and pooled:
+            # Pooled VMs start in the pool namespace, their room stays reserved there
+            capacity_monitor.transfer(target, cluster.namespace, settings.VM_POOL_NAMESPACE, pooled,
+                                      cluster_data.cpu_per_instance, cluster_data.memory_per_instance)
+        
+        logger.info("Cluster '%s' created with %s instances queued", cluster_data.name, len(instances))
+        return cluster
+    
     # Create instances
     created_instances = []
+    pooled_count = 0
+    unused = 0
     for i in range(cluster_data.instance_count):
         instance_name = f"{cluster_data.name}-instance-{i}"
         
@@ -85,8 +234,9 @@ async def create_cluster(
         db.commit()
         db.refresh(instance)
         
-        # Create K8s resource
-        success = k8s_service.create_instance(
+        # Start a warm pooled VM if one fits, otherwise create the K8s resource
+        pooled = vm_pools.claim(cluster, instance)
+        success = pooled or k8s.create_instance(
             instance_name=instance_name,
             cpu=cluster_data.cpu_per_instance,
             memory=cluster_data.memory_per_instance,
@@ -99,38 +249,400 @@ async def create_cluster(
             created_instances.append(instance)
         else:
             instance.status = InstanceStatus.FAILED
-            logger.error(f"Failed to create instance {instance_name}")
+            logger.error("Failed to create instance %s", instance_name)
+        if pooled:
+            pooled_count += 1
+        elif not success:
+            unused += 1
         
         db.commit()
     
-    # Update user quota
-    update_quota(db, current_user, total_cpu, total_memory)
+    if admitted and pooled_count:
+        # Pooled VMs start in the pool namespace, their room stays reserved there
+        capacity_monitor.transfer(target, cluster.namespace, settings.VM_POOL_NAMESPACE, pooled_count,
+                                  cluster_data.cpu_per_instance, cluster_data.memory_per_instance)
+    if admitted and unused:
+        # Nothing will appear in the namespace for failed instances
+        capacity_monitor.release(target, cluster.namespace, unused,
+                                 cluster_data.cpu_per_instance, cluster_data.memory_per_instance)
     
-    logger.info(f"Cluster '{cluster_data.name}' created with {len(created_instances)} instances")
+    logger.info("Cluster '%s' created with %s instances", cluster_data.name, len(created_instances))
     
     return cluster
 
 
-@router.get("/", response_model=List[ClusterResponse])
-async def list_clusters(
+@router.post("/bulk", response_model=ClusterBulkResponse)
+def create_clusters_bulk(
+    batch: ClusterBulkCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    List all clusters owned by the current user
+    Create several clusters in one request.
+    Names and quota are validated for the whole batch up front and quota is
+    reserved atomically; namespaces and instances are then provisioned
+    concurrently and the outcome is reported per cluster.
+    """
+    names = [cluster_data.name for cluster_data in batch.clusters]
+    duplicates = sorted(name for name, count in Counter(names).items() if count > 1)
+    if duplicates:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Duplicate cluster names in batch: {', '.join(duplicates)}"
+        )
+    existing = sorted(name for (name,) in db.query(Cluster.name).filter(Cluster.name.in_(names)))
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Clusters already exist: {', '.join(existing)}"
+        )
+
+    demand = {
+        cluster_data.name: (cluster_data.cpu_per_instance * cluster_data.instance_count,
+                            cluster_data.memory_per_instance * cluster_data.instance_count)
+        for cluster_data in batch.clusters
+    }
+    total_cpu = sum(cpu for cpu, _ in demand.values())
+    total_memory = sum(memory for _, memory in demand.values())
+    # Reserve quota for the whole batch atomically; rejected and failed clusters give theirs back
+    if not reserve_quota(db, current_user, total_cpu, total_memory):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Insufficient quota. Requested: {total_cpu} CPU, {total_memory}GB memory. "
+                   f"Available: {current_user.quota_cpu - current_user.used_cpu} CPU, "
+                   f"{current_user.quota_memory - current_user.used_memory}GB memory"
+        )
+    db.commit()
+
+    results = {}
+    admitted = []
+    capacity_reserved = set()
+
+    def release_capacity(cluster_data, target, namespace, count=None):
+        if cluster_data.name in capacity_reserved:
+            capacity_monitor.release(target, namespace or f"{cluster_data.name}-ns",
+                                     cluster_data.instance_count if count is None else count,
+                                     cluster_data.cpu_per_instance, cluster_data.memory_per_instance)
+
+    def transfer_capacity(cluster_data, target, namespace, count):
+        if cluster_data.name in capacity_reserved:
+            capacity_monitor.transfer(target, namespace or f"{cluster_data.name}-ns", settings.VM_POOL_NAMESPACE,
+                                      count, cluster_data.cpu_per_instance, cluster_data.memory_per_instance)
+
+    def release_admitted():
+        for cluster_data, target, namespace in admitted:
+            release_capacity(cluster_data, target, namespace)
+            if namespace is not None:
+                namespace_pools.release(target, namespace)
+
+    # Clusters, instances and pooled VM claims are written in one transaction
+    clusters = []
+    instance_names = {}
+    responses = {}
+    try:
+        # Place and admit each cluster; those that do not fit are rejected individually
+        for cluster_data in batch.clusters:
+            cpu, memory = demand[cluster_data.name]
+            target = placement_scheduler.choose_target(cpu, memory)
+            try:
+                reserved = capacity_monitor.admit(target, f"{cluster_data.name}-ns", cluster_data.instance_count,
+                                                  cluster_data.cpu_per_instance, cluster_data.memory_per_instance)
+            except InsufficientCapacity as e:
+                results[cluster_data.name] = ClusterBulkResult(
+                    name=cluster_data.name, status="rejected",
+                    error=f"Not enough free capacity on target '{target}'", available=e.headroom
+                )
+                continue
+            if reserved:
+                capacity_reserved.add(cluster_data.name)
+            namespace = namespace_pools.claim(target, cluster_data.name)
+            if namespace is not None:
+                capacity_monitor.move_reservation(target, f"{cluster_data.name}-ns", namespace)
+            admitted.append((cluster_data, target, namespace))
+
+        if admitted:
+            clusters = [
+                Cluster(
+                    name=cluster_data.name,
+                    namespace=namespace or f"{cluster_data.name}-ns",
+                    instance_type=cluster_data.instance_type,
+                    cpu_per_instance=cluster_data.cpu_per_instance,
+                    memory_per_instance=cluster_data.memory_per_instance,
+                    instance_count=cluster_data.instance_count,
+                    next_instance_index=cluster_data.instance_count,
+                    k8s_target=target,
+                    statefulset=_statefulset_name(cluster_data),
+                    owner_id=current_user.id
+                )
+                for cluster_data, target, namespace in admitted
+            ]
+            db.add_all(clusters)
+            db.flush()
+            for cluster in clusters:
+                instance_names[cluster.id] = [f"{cluster.name}-instance-{i}" for i in range(cluster.instance_count)]
+                responses[cluster.id] = ClusterResponse.model_validate(cluster)
+            new_instances = [
+                Instance(
+                    cluster_id=cluster_id,
+                    instance_name=instance_name,
+                    status=InstanceStatus.PENDING,
+                    k8s_resource_name=instance_name
+                )
+                for cluster_id, group in instance_names.items() for instance_name in group
+            ]
+            db.add_all(new_instances)
+            # Warm pooled VMs back what they can, only the rest is created below
+            by_id = {cluster.id: cluster for cluster in clusters}
+            for instance in new_instances:
+                if vm_pools.claim(by_id[instance.cluster_id], instance):
+                    instance_names[instance.cluster_id].remove(instance.instance_name)
+            # Plain copies for the provisioning threads, which must not touch the session
+            specs = [
+                (cluster.id, cluster.namespace, namespace is not None, cluster.k8s_target, cluster.statefulset,
+                 cluster.instance_type, cluster.cpu_per_instance, cluster.memory_per_instance)
+                for cluster, (_, _, namespace) in zip(clusters, admitted)
+            ]
+            db.commit()
+    except Exception as e:
+        # Nothing was provisioned, give the capacity, namespaces and the batch's quota back
+        db.rollback()
+        release_admitted()
+        update_quota(db, current_user, -total_cpu, -total_memory)
+        if isinstance(e, IntegrityError):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A cluster in the batch was created concurrently, retry the batch"
+            )
+        raise
+
+    def provision(cluster_id, namespace, pooled, target, statefulset, instance_type, cpu, memory):
+        k8s = k8s_registry.get(target)
+        if not pooled and not k8s.create_namespace(namespace):
+            return False, {}
+        if statefulset:
+            created = k8s.create_statefulset(statefulset, len(instance_names[cluster_id]), cpu, memory, namespace)
+            return True, {instance_name: created for instance_name in instance_names[cluster_id]}
+        if settings.WORK_QUEUE_ENABLED:
+            return True, {}
+        return True, k8s.create_instances(
+            instance_names=instance_names[cluster_id],
+            cpu=cpu,
+            memory=memory,
+            instance_type=instance_type,
+            namespace=namespace
+        )
+
+    # Clusters are provisioned concurrently, each creating its instances concurrently
+    outcomes = {}
+    if clusters:
+        with ThreadPoolExecutor(max_workers=min(len(clusters), settings.K8S_MAX_CONCURRENCY),
+                                thread_name_prefix="bulk-create") as executor:
+            futures = {spec[0]: executor.submit(bind_context(provision), *spec) for spec in specs}
+            outcomes = {cluster_id: future.result() for cluster_id, future in futures.items()}
+
+    # Reload the committed rows with one query each and record the outcomes
+    provisioned = [cluster_id for cluster_id, (namespace_created, _) in outcomes.items() if namespace_created]
+    failed = [cluster_id for cluster_id, (namespace_created, _) in outcomes.items() if not namespace_created]
+    clusters = {cluster.id: cluster for cluster in db.query(Cluster).filter(Cluster.id.in_(provisioned))}
+    instances = db.query(Instance).filter(Instance.cluster_id.in_(provisioned)).all() if provisioned else []
+    failed_counts = Counter()
+    pooled_counts = Counter()
+    for instance in instances:
+        if instance.k8s_namespace is not None:
+            pooled_counts[instance.cluster_id] += 1
+            continue  # Started from the VM pool
+        if settings.WORK_QUEUE_ENABLED and not clusters[instance.cluster_id].statefulset:
+            enqueue_operation(db, OperationKind.CREATE_INSTANCE, clusters[instance.cluster_id], instance,
+                              target_status=InstanceStatus.RUNNING)
+        elif outcomes[instance.cluster_id][1].get(instance.instance_name):
+            instance.status = InstanceStatus.RUNNING
+        else:
+            instance.status = InstanceStatus.FAILED
+            failed_counts[instance.cluster_id] += 1
+            logger.error("Failed to create instance %s", instance.instance_name)
+    for cluster_id in provisioned:
+        response = responses[cluster_id]
+        queued = settings.WORK_QUEUE_ENABLED and not clusters[cluster_id].statefulset
+        results[response.name] = ClusterBulkResult(
+            name=response.name, status="created", cluster=response,
+            instances_created=0 if queued else response.instance_count - failed_counts[cluster_id],
+            instances_failed=failed_counts[cluster_id]
+        )
+
+    admitted_by_name = {cluster_data.name: (cluster_data, target, namespace)
+                        for cluster_data, target, namespace in admitted}
+    for cluster_id in provisioned:
+        # Pooled VMs start in the pool namespace, nothing will appear for failed instances
+        if pooled_counts[cluster_id]:
+            transfer_capacity(*admitted_by_name[responses[cluster_id].name], count=pooled_counts[cluster_id])
+        if failed_counts[cluster_id]:
+            release_capacity(*admitted_by_name[responses[cluster_id].name], count=failed_counts[cluster_id])
+
+    # Rejected clusters were never created, failed ones are removed below
+    refunded = [name for name, result in results.items() if result.status == "rejected"]
+    if failed:
+        # Nothing but pooled VMs was provisioned for these, give the names back
+        failed_instances = db.query(Instance).filter(Instance.cluster_id.in_(failed)).all()
+        for instance in failed_instances:
+            if instance.k8s_namespace is None:
+                continue
+            k8s_registry.for_cluster(instance.cluster).delete_instance(
+                instance_name=instance.resource_name,
+                instance_type=InstanceType.VM,
+                namespace=instance.resource_namespace
+            )
+        record_events(db, failed_instances, DELETED)
+        count_removed(db, failed_instances)
+        db.query(Instance).filter(Instance.cluster_id.in_(failed)).delete(synchronize_session=False)
+        db.query(Cluster).filter(Cluster.id.in_(failed)).delete(synchronize_session=False)
+        for cluster_id in failed:
+            response = responses[cluster_id]
+            release_capacity(*admitted_by_name[response.name])
+            refunded.append(response.name)
+            results[response.name] = ClusterBulkResult(
+                name=response.name, status="failed",
+                error=f"Failed to create Kubernetes namespace '{response.namespace}'"
+            )
+    db.commit()
+    if refunded:
+        update_quota(db, current_user, -sum(demand[name][0] for name in refunded),
+                     -sum(demand[name][1] for name in refunded))
+
+    ordered = [results[name] for name in names]
+    counts = Counter(result.status for result in ordered)
+    logger.info("Bulk create of %s clusters: %s created, %s failed, %s rejected",
+                len(names), counts["created"], counts["failed"], counts["rejected"])
+    return ClusterBulkResponse(
+        results=ordered,
+        created=counts["created"],
+        failed=counts["failed"],
+        rejected=counts["rejected"]
+    )
+
+
+@router.get("/", response_model=List[ClusterResponse])
+async def list_clusters(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name"),
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """
+    List all clusters owned by the current user.
+    With fields=, only the named columns are read and returned.
     """
-    clusters = db.query(Cluster).filter(Cluster.owner_id == current_user.id).all()
-    return clusters
+    selection = _field_selection(fields)
+    serializer = selection.serializer if selection else cluster_serializer
+    rows = db.query(*serializer.columns).filter(Cluster.owner_id == current_user.id).all()
+    return FastJSONResponse(serializer.many(rows))
 
 
 @router.get("/{cluster_id}", response_model=ClusterDetail)
 async def get_cluster(
     cluster_id: int,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return, e.g. id,name,instances.id,instances.status"
+    ),
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get detailed information about a specific cluster.
+    With fields=, only the named columns are read and returned; instances are
+    only read when "instances" or one of their fields is named.
+    """
+    selection = _field_selection(fields, {"instances": instance_serializer})
+    cached = cache.get(cluster_key(cluster_id))
+    if cached is not None and cached["owner_id"] == current_user.id:
+        return FastJSONResponse(selection.project(cached) if selection else cached)
+    
+    if selection is None:
+        serializer, instances = cluster_serializer, instance_serializer
+    else:
+        serializer, instances = selection.serializer, selection.nested.get("instances")
+    # The id stands in when no cluster field is selected, to tell whether the cluster exists
+    row = db.query(*(serializer.columns or [Cluster.id])).filter(
+        Cluster.id == cluster_id,
+        Cluster.owner_id == current_user.id
+    ).first()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Cluster with id {cluster_id} not found"
+        )
+    
+    detail = serializer.one(row)
+    if instances is not None:
+        instance_rows = db.query(*instances.columns).filter(
+            Instance.cluster_id == cluster_id
+        ).order_by(Instance.id).all()
+        detail["instances"] = instances.many(instance_rows)
+    if selection is None:
+        # A replica may be behind an invalidation, so its reads are cached only as long as it may lag
+        cache.set(cluster_key(cluster_id), detail,
+                  ttl=settings.DATABASE_REPLICA_MAX_LAG_SECONDS if is_replica_session(db) else None)
+    return FastJSONResponse(detail)
+
+
+@router.get("/{cluster_id}/usage", response_model=ClusterLiveUsage)
+async def get_cluster_usage(
+    cluster_id: int,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Actual CPU and memory usage of a cluster's instances next to their requests,
+    from the latest metrics samples (never queries the metrics server inline)
+    """
+    cluster = db.query(
+        Cluster.k8s_target, Cluster.namespace, Cluster.cpu_per_instance, Cluster.memory_per_instance
+    ).filter(
+        Cluster.id == cluster_id,
+        Cluster.owner_id == current_user.id
+    ).first()
+    
+    if not cluster:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Cluster with id {cluster_id} not found"
+        )
+    
+    instances = []
+    for instance_id, instance_name, resource_name, namespace in db.query(
+        Instance.id, Instance.instance_name, Instance.k8s_resource_name, Instance.k8s_namespace
+    ).filter(Instance.cluster_id == cluster_id).order_by(Instance.id):
+        instances.append(InstanceLiveUsage(
+            instance_id=instance_id,
+            instance_name=instance_name,
+            cpu_requested=cluster.cpu_per_instance,
+            memory_requested=cluster.memory_per_instance,
+            current=usage_sample(live_usage.latest(
+                cluster.k8s_target, namespace or cluster.namespace, resource_name or instance_name
+            ))
+        ))
+    sampled = [instance.current for instance in instances if instance.current is not None]
+    return ClusterLiveUsage(
+        cluster_id=cluster_id,
+        cpu_requested=cluster.cpu_per_instance * len(instances),
+        memory_requested=cluster.memory_per_instance * len(instances),
+        cpu_used=sum(sample.cpu for sample in sampled),
+        memory_used=sum(sample.memory for sample in sampled),
+        sampled_instances=len(sampled),
+        instances=instances
+    )
+
+
+@router.patch("/{cluster_id}", response_model=MessageResponse)
+def scale_cluster(
+    cluster_id: int,
+    scale_data: ClusterScale,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Get detailed information about a specific cluster
+    Scale a cluster out or in to the requested instance count.
+    Only the difference is created or deleted, and only its quota is reserved or released.
     """
     cluster = db.query(Cluster).filter(
         Cluster.id == cluster_id,
@@ -143,11 +655,234 @@ async def get_cluster(
             detail=f"Cluster with id {cluster_id} not found"
         )
     
-    return cluster
+    delta = scale_data.instance_count - cluster.instance_count
+    if delta == 0:
+        return MessageResponse(
+            message=f"Cluster '{cluster.name}' already has {cluster.instance_count} instances",
+            detail={"cluster_id": cluster_id, "instance_count": cluster.instance_count}
+        )
+    
+    if cluster.statefulset and db.query(Instance.id).filter(
+        Instance.cluster_id == cluster_id, Instance.status == InstanceStatus.SUSPENDED
+    ).first():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Cluster '{cluster.name}' is suspended, resume it before scaling"
+        )
+    
+    if delta > 0:
+        delta_cpu = cluster.cpu_per_instance * delta
+        delta_memory = cluster.memory_per_instance * delta
+        if not reserve_quota(db, current_user, delta_cpu, delta_memory):
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Insufficient quota. Requested: {delta_cpu} CPU, {delta_memory}GB memory. "
+                       f"Available: {current_user.quota_cpu - current_user.used_cpu} CPU, "
+                       f"{current_user.quota_memory - current_user.used_memory}GB memory"
+            )
+        db.commit()
+        
+        target = cluster.k8s_target or k8s_registry.default
+        admitted = False
+        try:
+            try:
+                admitted = capacity_monitor.admit(target, cluster.namespace, delta,
+                                                  cluster.cpu_per_instance, cluster.memory_per_instance)
+            except InsufficientCapacity as e:
+                raise _capacity_conflict(e, delta, cluster.cpu_per_instance, cluster.memory_per_instance)
+            
+            # Names continue from a per-cluster counter, so existing instances are never scanned
+            start_index = cluster.next_instance_index
+            if start_index is None or cluster.statefulset:
+                # StatefulSet ordinals are contiguous and the instance names must match them
+                start_index = cluster.instance_count
+            new_instances = [
+                Instance(
+                    cluster_id=cluster.id,
+                    instance_name=f"{cluster.name}-instance-{i}",
+                    status=InstanceStatus.PENDING,
+                    k8s_resource_name=f"{cluster.name}-instance-{i}"
+                )
+                for i in range(start_index, start_index + delta)
+            ]
+            db.add_all(new_instances)
+            cluster.next_instance_index = start_index + delta
+            cluster.instance_count += delta
+            # Warm pooled VMs back what they can, only the rest is created
+            to_create = [instance for instance in new_instances if not vm_pools.claim(cluster, instance)]
+            
+            queued = settings.WORK_QUEUE_ENABLED and not cluster.statefulset
+            if queued:
+                db.flush()
+                for instance in to_create:
+                    enqueue_operation(db, OperationKind.CREATE_INSTANCE, cluster, instance,
+                                      target_status=InstanceStatus.RUNNING)
+            db.commit()
+        except Exception:
+            # No instance was added, give the reserved quota and capacity back
+            db.rollback()
+            if admitted:
+                capacity_monitor.release(target, cluster.namespace, delta,
+                                         cluster.cpu_per_instance, cluster.memory_per_instance)
+            update_quota(db, current_user, -delta_cpu, -delta_memory)
+            raise
+        
+        if queued:
+            cache.delete(cluster_key(cluster_id))
+            if admitted and len(to_create) < delta:
+                # Pooled VMs start in the pool namespace, their room stays reserved there
+                capacity_monitor.transfer(target, cluster.namespace, settings.VM_POOL_NAMESPACE,
+                                          delta - len(to_create), cluster.cpu_per_instance,
+                                          cluster.memory_per_instance)
+            
+            logger.info("Cluster '%s' scaled out by %s instances (queued)", cluster.name, delta)
+            
+            return MessageResponse(
+                message=f"Cluster '{cluster.name}' scaling to {cluster.instance_count} instances",
+                detail={
+                    "cluster_id": cluster_id,
+                    "instance_count": cluster.instance_count,
+                    "queued": len(to_create),
+                    "cpu_reserved": delta_cpu,
+                    "memory_reserved": delta_memory
+                }
+            )
+        
+        if cluster.statefulset:
+            scaled = k8s_registry.for_cluster(cluster).scale_statefulset(
+                cluster.statefulset, cluster.instance_count, cluster.namespace
+            )
+            results = {instance.instance_name: scaled for instance in to_create}
+        else:
+            results = k8s_registry.for_cluster(cluster).create_instances(
+                instance_names=[instance.instance_name for instance in to_create],
+                cpu=cluster.cpu_per_instance,
+                memory=cluster.memory_per_instance,
+                instance_type=cluster.instance_type,
+                namespace=cluster.namespace
+            )
+        failed_count = 0
+        for instance in to_create:
+            if results[instance.instance_name]:
+                instance.status = InstanceStatus.RUNNING
+            else:
+                instance.status = InstanceStatus.FAILED
+                failed_count += 1
+                logger.error("Failed to create instance %s", instance.instance_name)
+        db.commit()
+        if admitted and len(to_create) < delta:
+            # Pooled VMs start in the pool namespace, their room stays reserved there
+            capacity_monitor.transfer(target, cluster.namespace, settings.VM_POOL_NAMESPACE,
+                                      delta - len(to_create), cluster.cpu_per_instance,
+                                      cluster.memory_per_instance)
+        if admitted and failed_count:
+            # Nothing will appear in the namespace for failed instances
+            capacity_monitor.release(target, cluster.namespace, failed_count,
+                                     cluster.cpu_per_instance, cluster.memory_per_instance)
+        cache.delete(cluster_key(cluster_id))
+        
+        logger.info("Cluster '%s' scaled out by %s instances (%s failed)",
+                    cluster.name, delta, failed_count)
+        
+        return MessageResponse(
+            message=f"Cluster '{cluster.name}' scaled to {cluster.instance_count} instances",
+            detail={
+                "cluster_id": cluster_id,
+                "instance_count": cluster.instance_count,
+                "created": delta - failed_count,
+                "failed": failed_count,
+                "cpu_reserved": delta_cpu,
+                "memory_reserved": delta_memory
+            }
+        )
+    
+    # Scale in: remove the newest instances, read through the primary key index
+    victims = db.query(Instance).filter(
+        Instance.cluster_id == cluster_id
+    ).order_by(Instance.id.desc()).limit(-delta).all()
+    
+    if settings.WORK_QUEUE_ENABLED and not cluster.statefulset:
+        # Quota and rows are released now, the Kubernetes deletes are retried until they succeed
+        for instance in victims:
+            enqueue_operation(db, OperationKind.DELETE_INSTANCE, cluster, instance)
+            db.delete(instance)
+        results = {instance.instance_name: True for instance in victims}
+    else:
+        if cluster.statefulset:
+            # The controller removes the highest ordinals, which are the newest instances
+            scaled = k8s_registry.for_cluster(cluster).scale_statefulset(
+                cluster.statefulset, cluster.instance_count + delta, cluster.namespace
+            )
+            results = {instance.instance_name: scaled for instance in victims}
+        else:
+            # Pooled VMs live outside the cluster namespace, delete per namespace
+            by_namespace = defaultdict(list)
+            for instance in victims:
+                by_namespace[instance.resource_namespace].append(instance)
+            results = {}
+            for namespace, group in by_namespace.items():
+                deleted = k8s_registry.for_cluster(cluster).delete_instances(
+                    instance_names=[instance.resource_name for instance in group],
+                    instance_type=cluster.instance_type,
+                    namespace=namespace
+                )
+                results.update({instance.instance_name: deleted[instance.resource_name] for instance in group})
+        for instance in victims:
+            if results[instance.instance_name]:
+                db.delete(instance)
+            else:
+                logger.error("Failed to delete instance %s", instance.instance_name)
+    removed = [instance for instance in victims if results[instance.instance_name]]
+    
+    released_cpu = cluster.cpu_per_instance * len(removed)
+    released_memory = cluster.memory_per_instance * len(removed)
+    cluster.instance_count -= len(removed)
+    db.commit()
+    cache.delete(cluster_key(cluster_id), *(instance_status_key(instance.id) for instance in removed))
+    
+    update_quota(db, current_user, -released_cpu, -released_memory)
+    
+    logger.info("Cluster '%s' scaled in by %s instances (%s failed)",
+                cluster.name, len(removed), len(victims) - len(removed))
+    
+    return MessageResponse(
+        message=f"Cluster '{cluster.name}' scaled to {cluster.instance_count} instances",
+        detail={
+            "cluster_id": cluster_id,
+            "instance_count": cluster.instance_count,
+            "deleted": len(removed),
+            "failed": len(victims) - len(removed),
+            "cpu_released": released_cpu,
+            "memory_released": released_memory
+        }
+    )
+
+
+def _delete_pooled_vms(cluster: Cluster, pooled: List[Instance]):
+    """
+    Delete a cluster's pooled VMs one by one. Nothing else removes them from the
+    shared pool namespace, so a failure stops the cluster deletion and the
+    caller retries; VMs that are already gone count as deleted.
+    """
+    by_namespace = defaultdict(list)
+    for instance in pooled:
+        by_namespace[instance.resource_namespace].append(instance.resource_name)
+    failed = []
+    for namespace, names in by_namespace.items():
+        deleted = k8s_registry.for_cluster(cluster).delete_instances(
+            instance_names=names, instance_type=InstanceType.VM, namespace=namespace
+        )
+        failed.extend(name for name in names if not deleted[name])
+    if failed:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to delete pooled VMs {', '.join(failed)} of cluster '{cluster.name}', retry the delete"
+        )
 
 
 @router.delete("/{cluster_id}", response_model=MessageResponse)
-async def delete_cluster(
+def delete_cluster(
     cluster_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -166,17 +901,30 @@ async def delete_cluster(
             detail=f"Cluster with id {cluster_id} not found"
         )
     
-    # Delete all instances from K8s (optional, as namespace deletion will clean them up)
     instances = db.query(Instance).filter(Instance.cluster_id == cluster_id).all()
-    for instance in instances:
-        k8s_service.delete_instance(
-            instance_name=instance.instance_name,
-            instance_type=cluster.instance_type,
-            namespace=cluster.namespace
-        )
-    
-    # Delete the namespace (this will delete all resources in it)
-    k8s_service.delete_namespace(cluster.namespace)
+    # Pooled VMs live in the shared VM pool namespace, which the namespace deletion leaves alone
+    pooled = [instance for instance in instances if instance.k8s_namespace is not None]
+    members = [instance for instance in instances if instance.k8s_namespace is None]
+    if settings.WORK_QUEUE_ENABLED:
+        for instance in pooled:
+            enqueue_operation(db, OperationKind.DELETE_INSTANCE, cluster, instance)
+        enqueue_operation(db, OperationKind.DELETE_NAMESPACE, cluster)
+    else:
+        _delete_pooled_vms(cluster, pooled)
+        if cluster.statefulset:
+            # One call removes every instance, the namespace deletion the rest
+            k8s_registry.for_cluster(cluster).delete_statefulset(cluster.statefulset, cluster.namespace)
+        else:
+            # Delete all instances from K8s (optional, as namespace deletion will clean them up)
+            for instance in members:
+                k8s_registry.for_cluster(cluster).delete_instance(
+                    instance_name=instance.resource_name,
+                    instance_type=cluster.instance_type,
+                    namespace=cluster.namespace
+                )
+        
+        # Delete the namespace (this will delete all resources in it)
+        k8s_registry.for_cluster(cluster).delete_namespace(cluster.namespace)
     
     # Calculate resources to release
     total_cpu = cluster.cpu_per_instance * cluster.instance_count
@@ -185,11 +933,12 @@ async def delete_cluster(
     # Delete cluster (cascade will delete instances)
     db.delete(cluster)
     db.commit()
+    cache.delete(cluster_key(cluster_id), *(instance_status_key(instance.id) for instance in instances))
     
     # Update user quota (negative values to release resources)
     update_quota(db, current_user, -total_cpu, -total_memory)
     
-    logger.info(f"Cluster '{cluster.name}' (id: {cluster_id}) and namespace '{cluster.namespace}' deleted")
+    logger.info("Cluster '%s' (id: %s) and namespace '%s' deleted", cluster.name, cluster_id, cluster.namespace)
     
     return MessageResponse(
         message=f"Cluster '{cluster.name}' deleted successfully",
@@ -203,7 +952,7 @@ async def delete_cluster(
 
 
 @router.post("/{cluster_id}/suspend", response_model=MessageResponse)
-async def suspend_cluster(
+def suspend_cluster(
     cluster_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -222,51 +971,14 @@ async def suspend_cluster(
             detail=f"Cluster with id {cluster_id} not found"
         )
     
-    # Get all instances in the cluster
-    instances = db.query(Instance).filter(Instance.cluster_id == cluster_id).all()
-    
-    suspended_count = 0
-    failed_count = 0
-    skipped_count = 0
-    
-    for instance in instances:
-        # Only suspend running instances
-        if instance.status == InstanceStatus.RUNNING:
-            success = k8s_service.stop_instance(
-                instance_name=instance.instance_name,
-                instance_type=cluster.instance_type,
-                namespace=cluster.namespace
-            )
-            
-            if success:
-                instance.status = InstanceStatus.SUSPENDED
-                suspended_count += 1
-            else:
-                failed_count += 1
-                logger.error(f"Failed to suspend instance {instance.instance_name}")
-        else:
-            skipped_count += 1
-            logger.info(f"Skipped instance {instance.instance_name} with status {instance.status.value}")
-    
-    db.commit()
-    
-    logger.info(f"Cluster '{cluster.name}' suspend operation completed: "
-                f"{suspended_count} suspended, {failed_count} failed, {skipped_count} skipped")
-    
     return MessageResponse(
         message=f"Cluster '{cluster.name}' suspend operation completed",
-        detail={
-            "cluster_id": cluster_id,
-            "total_instances": len(instances),
-            "suspended": suspended_count,
-            "failed": failed_count,
-            "skipped": skipped_count
-        }
+        detail=suspend_cluster_instances(db, cluster)
     )
 
 
 @router.post("/{cluster_id}/resume", response_model=MessageResponse)
-async def resume_cluster(
+def resume_cluster(
     cluster_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -285,45 +997,7 @@ async def resume_cluster(
             detail=f"Cluster with id {cluster_id} not found"
         )
     
-    # Get all instances in the cluster
-    instances = db.query(Instance).filter(Instance.cluster_id == cluster_id).all()
-    
-    resumed_count = 0
-    failed_count = 0
-    skipped_count = 0
-    
-    for instance in instances:
-        # Only resume suspended instances
-        if instance.status == InstanceStatus.SUSPENDED:
-            success = k8s_service.start_instance(
-                instance_name=instance.instance_name,
-                instance_type=cluster.instance_type,
-                namespace=cluster.namespace
-            )
-            
-            if success:
-                instance.status = InstanceStatus.RUNNING
-                resumed_count += 1
-            else:
-                failed_count += 1
-                logger.error(f"Failed to resume instance {instance.instance_name}")
-        else:
-            skipped_count += 1
-            logger.info(f"Skipped instance {instance.instance_name} with status {instance.status.value}")
-    
-    db.commit()
-    
-    logger.info(f"Cluster '{cluster.name}' resume operation completed: "
-                f"{resumed_count} resumed, {failed_count} failed, {skipped_count} skipped")
-    
     return MessageResponse(
         message=f"Cluster '{cluster.name}' resume operation completed",
-        detail={
-            "cluster_id": cluster_id,
-            "total_instances": len(instances),
-            "resumed": resumed_count,
-            "failed": failed_count,
-            "skipped": skipped_count
-        }
+        detail=resume_cluster_instances(db, cluster)
     )
-
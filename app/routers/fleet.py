@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Dict
+from app.auth import require_admin
+from app.database import engine
+from app.fleet import fleet_summary
+from app.models import User
+from app.replicas import get_read_db
+from app.schemas import FleetCounts, FleetSummary, FleetUserSummary, ImportReport
+from app.transfer import Importer, InvalidExport, export_lines
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/fleet", tags=["fleet"])
+
+
+def _counts(by_type: Dict[str, Dict[str, int]]) -> dict:
+    by_status: Dict[str, int] = {}
+    for statuses in by_type.values():
+        for status_value, count in statuses.items():
+            by_status[status_value] = by_status.get(status_value, 0) + count
+    return {"instances": sum(by_status.values()), "by_status": by_status, "by_type": by_type}
+
+
+@router.get("/summary", response_model=FleetSummary)
+async def get_fleet_summary(
+    db: Session = Depends(get_read_db)
+):
+    """
+    Instance counts per type and status, fleet-wide and per user, read from
+    the counters in app/fleet.py (admin operation - in production, add admin auth)
+    """
+    summary = fleet_summary(db)
+    usernames = dict(db.query(User.id, User.username).filter(User.id.in_(summary["owners"].keys())).all())
+    return FleetSummary(
+        totals=FleetCounts(**_counts(summary["totals"])),
+        users=[
+            FleetUserSummary(user_id=owner_id, username=usernames.get(owner_id), **_counts(by_type))
+            for owner_id, by_type in sorted(summary["owners"].items())
+        ]
+    )
+
+
+@router.get("/export", dependencies=[Depends(require_admin)])
+def export_fleet():
+    """
+    Stream all users, clusters and instances as NDJSON (admin operation, requires ADMIN_TOKEN)
+    """
+    return StreamingResponse(
+        export_lines(engine),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="kubekloud-export.ndjson"'}
+    )
+
+
+@router.post("/import", response_model=ImportReport, dependencies=[Depends(require_admin)])
+async def import_fleet(request: Request):
+    """
+    Import an NDJSON export into an empty database, resuming an interrupted
+    import of the same export (admin operation, requires ADMIN_TOKEN)
+    """
+    importer = Importer(engine)
+    pending = b""
+    try:
+        async for chunk in request.stream():
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            if lines:
+                await run_in_threadpool(importer.feed, lines)
+        await run_in_threadpool(importer.feed, [pending])
+        return await run_in_threadpool(importer.finish)
+    except InvalidExport as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except IntegrityError as e:
+        logger.warning("Import %s conflicts with existing rows: %s", importer.export_id, e.orig)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "Imported rows conflict with existing data; import into an empty database",
+                "export_id": importer.export_id,
+                "inserted": importer.inserted,
+            }
+        )
@@ -1,25 +1,57 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models import User, Instance, Cluster, InstanceStatus
-from app.schemas import InstanceOperation, InstanceResponse, MessageResponse
-from app.auth import get_current_user
-from app.k8s_service import k8s_service
+from app.models import User, Instance, Cluster, InstanceStatus, OperationKind
+from app.schemas import InstanceOperation, InstanceResponse, InstanceLiveUsage, MessageResponse
+from app.auth import get_current_user, get_current_user_read
+from app.replicas import get_read_db
+from app.live_usage import live_usage, usage_sample
+from app.k8s_service import k8s_registry
+from app.cache import cache, cluster_key, instance_status_key
+from app.config import settings
+from app.work_queue import enqueue_operation
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/instances", tags=["instances"])
 
+# operation -> (required status, queued operation kind, status on success)
+QUEUED_OPERATIONS = {
+    "start": (InstanceStatus.STOPPED, OperationKind.START_INSTANCE, InstanceStatus.RUNNING),
+    "stop": (InstanceStatus.RUNNING, OperationKind.STOP_INSTANCE, InstanceStatus.STOPPED),
+    "suspend": (InstanceStatus.RUNNING, OperationKind.STOP_INSTANCE, InstanceStatus.SUSPENDED),
+    "resume": (InstanceStatus.SUSPENDED, OperationKind.START_INSTANCE, InstanceStatus.RUNNING),
+}
+
+
+def _statefulset_status(db: Session, cluster: Cluster, instance: Instance):
+    """
+    Status of an instance backed by a StatefulSet pod. One pod listing covers
+    the whole cluster, so the statuses of its sibling instances are cached too.
+    None while the pod does not exist, e.g. when the cluster is suspended.
+    """
+    statuses = k8s_registry.for_cluster(cluster).get_statefulset_statuses(cluster.statefulset, cluster.namespace)
+    if statuses is None:
+        return None
+    for sibling_id, sibling_name in db.query(Instance.id, Instance.k8s_resource_name).filter(
+        Instance.cluster_id == cluster.id
+    ):
+        if sibling_name in statuses:
+            cache.set(instance_status_key(sibling_id), statuses[sibling_name].value,
+                      ttl=settings.CACHE_STATUS_TTL_SECONDS)
+    return statuses.get(instance.resource_name)
+
 
 @router.get("/{instance_id}", response_model=InstanceResponse)
-async def get_instance(
+def get_instance(
     instance_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Get information about a specific instance
+    Get information about a specific instance.
+    A plain def runs in the threadpool, so concurrent status reads can be coalesced.
     """
     instance = db.query(Instance).join(Cluster).filter(
         Instance.id == instance_id,
@@ -32,23 +64,70 @@ async def get_instance(
             detail=f"Instance with id {instance_id} not found"
         )
     
-    # Update status from K8s
-    cluster = db.query(Cluster).filter(Cluster.id == instance.cluster_id).first()
-    k8s_status = k8s_service.get_instance_status(
-        instance_name=instance.instance_name,
-        instance_type=cluster.instance_type,
-        namespace=cluster.namespace
-    )
-    if k8s_status:
+    # Update status from K8s, reusing a recent read if one is cached
+    cached_status = cache.get(instance_status_key(instance_id))
+    if cached_status is not None:
+        k8s_status = InstanceStatus(cached_status)
+    else:
+        cluster = db.query(Cluster).filter(Cluster.id == instance.cluster_id).first()
+        if cluster.statefulset:
+            k8s_status = _statefulset_status(db, cluster, instance)
+        else:
+            k8s_status = k8s_registry.for_cluster(cluster).get_instance_status(
+                instance_name=instance.resource_name,
+                instance_type=cluster.instance_type,
+                namespace=instance.resource_namespace
+            )
+            if k8s_status:
+                cache.set(instance_status_key(instance_id), k8s_status.value,
+                          ttl=settings.CACHE_STATUS_TTL_SECONDS)
+    if k8s_status and k8s_status != instance.status:
         instance.status = k8s_status
         db.commit()
         db.refresh(instance)
+        cache.delete(cluster_key(instance.cluster_id))
     
     return instance
 
 
+@router.get("/{instance_id}/usage", response_model=InstanceLiveUsage)
+async def get_instance_usage(
+    instance_id: int,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Actual CPU and memory usage of an instance: the latest metrics sample and
+    the recent history kept in memory (never queries the metrics server inline)
+    """
+    row = db.query(
+        Instance.instance_name, Instance.k8s_resource_name, Instance.k8s_namespace,
+        Cluster.k8s_target, Cluster.namespace, Cluster.cpu_per_instance, Cluster.memory_per_instance
+    ).join(Cluster).filter(
+        Instance.id == instance_id,
+        Cluster.owner_id == current_user.id
+    ).first()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Instance with id {instance_id} not found"
+        )
+    
+    samples = live_usage.samples(row.k8s_target, row.k8s_namespace or row.namespace,
+                                 row.k8s_resource_name or row.instance_name)
+    return InstanceLiveUsage(
+        instance_id=instance_id,
+        instance_name=row.instance_name,
+        cpu_requested=row.cpu_per_instance,
+        memory_requested=row.memory_per_instance,
+        current=usage_sample(samples[-1] if samples else None),
+        samples=[usage_sample(sample) for sample in samples]
+    )
+
+
 @router.post("/{instance_id}/operate", response_model=MessageResponse)
-async def operate_instance(
+def operate_instance(
     instance_id: int,
     operation: InstanceOperation,
     current_user: User = Depends(get_current_user),
@@ -71,16 +150,49 @@ async def operate_instance(
     
     cluster = db.query(Cluster).filter(Cluster.id == instance.cluster_id).first()
     
+    if cluster.statefulset:
+        # Deleting a single pod only makes the controller recreate it
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Instances of cluster '{cluster.name}' are backed by a StatefulSet, "
+                   f"suspend or resume the cluster instead"
+        )
+    
+    if settings.WORK_QUEUE_ENABLED:
+        required_status, kind, target_status = QUEUED_OPERATIONS[operation.operation]
+        if instance.status != required_status:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot {operation.operation} instance in status '{instance.status.value}'"
+            )
+        previous_status = instance.status
+        queued = enqueue_operation(db, kind, cluster, instance, target_status=target_status)
+        db.commit()
+        cache.delete(cluster_key(cluster.id), instance_status_key(instance_id))
+        
+        logger.info("Instance %s operation '%s' queued", instance.instance_name, operation.operation)
+        
+        return MessageResponse(
+            message=f"Instance operation '{operation.operation}' queued",
+            detail={
+                "instance_id": instance_id,
+                "instance_name": instance.instance_name,
+                "operation_id": queued.id,
+                "previous_status": previous_status.value,
+                "new_status": target_status.value
+            }
+        )
+    
     # Perform operation
     success = False
     new_status = instance.status
     
     if operation.operation == "start":
         if instance.status == InstanceStatus.STOPPED:
-            success = k8s_service.start_instance(
-                instance_name=instance.instance_name,
+            success = k8s_registry.for_cluster(cluster).start_instance(
+                instance_name=instance.resource_name,
                 instance_type=cluster.instance_type,
-                namespace=cluster.namespace
+                namespace=instance.resource_namespace
             )
             if success:
                 new_status = InstanceStatus.RUNNING
@@ -92,10 +204,10 @@ async def operate_instance(
     
     elif operation.operation == "stop":
         if instance.status == InstanceStatus.RUNNING:
-            success = k8s_service.stop_instance(
-                instance_name=instance.instance_name,
+            success = k8s_registry.for_cluster(cluster).stop_instance(
+                instance_name=instance.resource_name,
                 instance_type=cluster.instance_type,
-                namespace=cluster.namespace
+                namespace=instance.resource_namespace
             )
             if success:
                 new_status = InstanceStatus.STOPPED
@@ -108,10 +220,10 @@ async def operate_instance(
     elif operation.operation == "suspend":
         if instance.status == InstanceStatus.RUNNING:
             # For suspend, we stop the instance but mark it as suspended
-            success = k8s_service.stop_instance(
-                instance_name=instance.instance_name,
+            success = k8s_registry.for_cluster(cluster).stop_instance(
+                instance_name=instance.resource_name,
                 instance_type=cluster.instance_type,
-                namespace=cluster.namespace
+                namespace=instance.resource_namespace
             )
             if success:
                 new_status = InstanceStatus.SUSPENDED
@@ -123,10 +235,10 @@ async def operate_instance(
     
     elif operation.operation == "resume":
         if instance.status == InstanceStatus.SUSPENDED:
-            success = k8s_service.start_instance(
-                instance_name=instance.instance_name,
+            success = k8s_registry.for_cluster(cluster).start_instance(
+                instance_name=instance.resource_name,
                 instance_type=cluster.instance_type,
-                namespace=cluster.namespace
+                namespace=instance.resource_namespace
             )
             if success:
                 new_status = InstanceStatus.RUNNING
@@ -145,8 +257,9 @@ async def operate_instance(
     # Update instance status
     instance.status = new_status
     db.commit()
+    cache.delete(cluster_key(cluster.id), instance_status_key(instance_id))
     
-    logger.info(f"Instance {instance.instance_name} operation '{operation.operation}' completed")
+    logger.info("Instance %s operation '%s' completed", instance.instance_name, operation.operation)
     
     return MessageResponse(
         message=f"Instance operation '{operation.operation}' completed successfully",
@@ -0,0 +1,177 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List
+from app.database import get_db
+from app.models import User, Cluster, Schedule, ScheduleRun
+from app.schemas import (
+    ScheduleCreate, ScheduleUpdate, ScheduleResponse, ScheduleRunResponse, MessageResponse
+)
+from app.auth import get_current_user, get_current_user_read
+from app.replicas import get_read_db
+from app.schedules import reschedule, weekdays, zone
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/schedules", tags=["schedules"])
+
+
+def _response(schedule: Schedule) -> ScheduleResponse:
+    return ScheduleResponse(
+        id=schedule.id,
+        action=schedule.action,
+        cluster_id=schedule.cluster_id,
+        time_of_day=schedule.time_of_day,
+        days=schedule.days.split(","),
+        timezone=schedule.timezone,
+        enabled=schedule.enabled,
+        next_run_at=schedule.next_run_at,
+        last_run_at=schedule.last_run_at,
+        last_status=schedule.last_status,
+        created_at=schedule.created_at
+    )
+
+
+def _check_timezone(name: str):
+    try:
+        zone(name)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _own_schedule(db: Session, schedule_id: int, user: User) -> Schedule:
+    schedule = db.query(Schedule).filter(
+        Schedule.id == schedule_id,
+        Schedule.owner_id == user.id
+    ).first()
+
+    if not schedule:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Schedule with id {schedule_id} not found"
+        )
+    return schedule
+
+
+@router.post("/", response_model=ScheduleResponse, status_code=status.HTTP_201_CREATED)
+async def create_schedule(
+    schedule_data: ScheduleCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Suspend or resume a cluster, or all of the current user's clusters, at a
+    time of day on the given weekdays
+    """
+    _check_timezone(schedule_data.timezone)
+    if schedule_data.cluster_id is not None and not db.query(Cluster.id).filter(
+        Cluster.id == schedule_data.cluster_id,
+        Cluster.owner_id == current_user.id
+    ).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Cluster with id {schedule_data.cluster_id} not found"
+        )
+
+    schedule = Schedule(
+        owner_id=current_user.id,
+        cluster_id=schedule_data.cluster_id,
+        action=schedule_data.action,
+        time_of_day=schedule_data.time_of_day,
+        days=weekdays(schedule_data.days),
+        timezone=schedule_data.timezone,
+        enabled=schedule_data.enabled
+    )
+    schedule.next_run_at = reschedule(schedule)
+    db.add(schedule)
+    db.commit()
+    db.refresh(schedule)
+
+    logger.info("Schedule %s created: %s %s at %s %s on %s", schedule.id, schedule.action,
+                f"cluster {schedule.cluster_id}" if schedule.cluster_id else "all clusters",
+                schedule.time_of_day, schedule.timezone, schedule.days)
+
+    return _response(schedule)
+
+
+@router.get("/", response_model=List[ScheduleResponse])
+async def list_schedules(
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """
+    List all schedules of the current user
+    """
+    schedules = db.query(Schedule).filter(Schedule.owner_id == current_user.id).order_by(Schedule.id).all()
+    return [_response(schedule) for schedule in schedules]
+
+
+@router.get("/{schedule_id}", response_model=ScheduleResponse)
+async def get_schedule(
+    schedule_id: int,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get a schedule, including when it runs next and how its last run went
+    """
+    return _response(_own_schedule(db, schedule_id, current_user))
+
+
+@router.patch("/{schedule_id}", response_model=ScheduleResponse)
+async def update_schedule(
+    schedule_id: int,
+    schedule_data: ScheduleUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Change when a schedule runs, or enable or disable it
+    """
+    schedule = _own_schedule(db, schedule_id, current_user)
+    if schedule_data.timezone is not None:
+        _check_timezone(schedule_data.timezone)
+        schedule.timezone = schedule_data.timezone
+    if schedule_data.time_of_day is not None:
+        schedule.time_of_day = schedule_data.time_of_day
+    if schedule_data.days is not None:
+        schedule.days = weekdays(schedule_data.days)
+    if schedule_data.enabled is not None:
+        schedule.enabled = schedule_data.enabled
+    schedule.next_run_at = reschedule(schedule)
+    db.commit()
+    db.refresh(schedule)
+
+    return _response(schedule)
+
+
+@router.delete("/{schedule_id}", response_model=MessageResponse)
+async def delete_schedule(
+    schedule_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Delete a schedule. Its recorded runs are kept until they expire.
+    """
+    schedule = _own_schedule(db, schedule_id, current_user)
+    db.delete(schedule)
+    db.commit()
+
+    return MessageResponse(message=f"Schedule {schedule_id} deleted successfully")
+
+
+@router.get("/{schedule_id}/runs", response_model=List[ScheduleRunResponse])
+async def list_schedule_runs(
+    schedule_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Outcome per cluster of a schedule's most recent runs, newest first
+    """
+    _own_schedule(db, schedule_id, current_user)
+    return db.query(ScheduleRun).filter(
+        ScheduleRun.schedule_id == schedule_id
+    ).order_by(ScheduleRun.started_at.desc(), ScheduleRun.id.desc()).limit(limit).all()
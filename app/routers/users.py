@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
-from app.models import User
-from app.schemas import UserCreate, UserResponse, QuotaResponse
-from app.auth import get_current_user
+from app.models import User, UsageRollup, UsageWatermark
+from app.schemas import UserCreate, UserResponse, QuotaResponse, UsagePeriod, UsageReport
+from app.auth import find_user_by_token, get_current_user, get_current_user_read
+from app.replicas import get_read_db
+from app.tokens import hash_token
+from app.serialization import FastJSONResponse, user_serializer
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -26,7 +30,7 @@ async def create_user(
         )
     
     # Check if token already exists
-    existing_token = db.query(User).filter(User.token == user_data.token).first()
+    existing_token = find_user_by_token(db, hash_token(user_data.token))
     if existing_token:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -36,12 +40,12 @@ async def create_user(
     # Create user
     user = User(
         username=user_data.username,
-        token=user_data.token,
         quota_cpu=user_data.quota_cpu,
         quota_memory=user_data.quota_memory,
         used_cpu=0.0,
         used_memory=0.0
     )
+    user.set_token(user_data.token)
     db.add(user)
     db.commit()
     db.refresh(user)
@@ -51,7 +55,7 @@ async def create_user(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_read)
 ):
     """
     Get information about the currently authenticated user
@@ -61,7 +65,7 @@ async def get_current_user_info(
 
 @router.get("/me/quota", response_model=QuotaResponse)
 async def get_user_quota(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_read)
 ):
     """
     Get quota information for the current user
@@ -76,13 +80,53 @@ async def get_user_quota(
     )
 
 
+@router.get("/me/usage", response_model=UsageReport)
+async def get_user_usage(
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user_read),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Instance-hours of the current user per hour or day, read from the rollups.
+    Defaults to the last 30 days.
+    """
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    rows = db.query(UsageRollup).filter(
+        UsageRollup.granularity == granularity,
+        UsageRollup.owner_id == current_user.id,
+        UsageRollup.period_start >= start,
+        UsageRollup.period_start < end
+    ).order_by(UsageRollup.period_start).all()
+    watermark = db.get(UsageWatermark, 1)
+    periods = [
+        UsagePeriod(
+            period_start=row.period_start, instance_hours=row.instance_hours,
+            cpu_hours=row.cpu_hours, memory_gb_hours=row.memory_gb_hours
+        )
+        for row in rows
+    ]
+    return UsageReport(
+        granularity=granularity,
+        start=start,
+        end=end,
+        rolled_until=watermark.rolled_until if watermark else None,
+        periods=periods,
+        instance_hours=sum(period.instance_hours for period in periods),
+        cpu_hours=sum(period.cpu_hours for period in periods),
+        memory_gb_hours=sum(period.memory_gb_hours for period in periods)
+    )
+
+
 @router.get("/", response_model=List[UserResponse])
 async def list_users(
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     List all users (admin operation - in production, add admin auth)
     """
-    users = db.query(User).all()
-    return users
+    rows = db.query(*user_serializer.columns).all()
+    return FastJSONResponse(user_serializer.many(rows))
 
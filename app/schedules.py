@@ -0,0 +1,270 @@
+"""
+Scheduled suspend and resume of clusters.
+
+A schedule suspends or resumes one cluster, or all of an owner's clusters,
+at a time of day on chosen weekdays in a timezone. Each schedule stores its
+next occurrence in next_run_at (UTC), indexed together with enabled, so a
+tick reads only the due rows in time order instead of evaluating every
+schedule. A due schedule is claimed by moving next_run_at to its following
+occurrence with a guarded update (rows locked with SKIP LOCKED on
+PostgreSQL), so several replicas can run the scheduler and each occurrence
+runs once. Occurrences missed while no scheduler was running are run once,
+late, not replayed.
+
+The clusters of the claimed schedules are then suspended or resumed by a
+pool of SCHEDULER_CONCURRENCY threads at no more than SCHEDULER_RATE
+clusters per second, and the outcome for each cluster is recorded in
+schedule_runs. Different clusters run in parallel, but the schedules due for
+one cluster run one after another in next_run_at order, so e.g. a suspend
+and a resume claimed together never race on the same cluster. A cluster whose run is interrupted by a shutdown waits for
+the schedule's next occurrence.
+"""
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.metrics import SCHEDULE_LAG, SCHEDULED_RUNS
+from app.models import Cluster, Schedule, ScheduleRun
+from app.suspension import resume_cluster_instances, suspend_cluster_instances
+from app.tracing import start_span
+from app.work_queue import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+ACTIONS = {
+    "suspend": (suspend_cluster_instances, "suspended"),
+    "resume": (resume_cluster_instances, "resumed"),
+}
+
+
+def zone(name: str):
+    """tzinfo for an IANA timezone name, raising ValueError for unknown names"""
+    if name == "UTC":
+        return timezone.utc  # Needs no tz database
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone '{name}'") from None
+
+
+def next_run_at(time_of_day: str, days: str, timezone_name: str, after: datetime) -> datetime:
+    """First occurrence strictly after `after`, both naive UTC"""
+    tz = zone(timezone_name)
+    hour, minute = (int(part) for part in time_of_day.split(":"))
+    allowed = {WEEKDAYS.index(day) for day in days.split(",")}
+    local_date = after.replace(tzinfo=timezone.utc).astimezone(tz).date()
+    for offset in range(8):
+        day = local_date + timedelta(days=offset)
+        if day.weekday() not in allowed:
+            continue
+        occurrence = datetime.combine(day, time(hour, minute), tzinfo=tz).astimezone(timezone.utc)
+        occurrence = occurrence.replace(tzinfo=None)
+        if occurrence > after:
+            return occurrence
+    raise ValueError("A schedule needs at least one weekday")
+
+
+def _outcome(detail: dict, done_key: str) -> str:
+    done = detail[done_key] + detail["queued"]
+    if detail["failed"]:
+        return "partial" if done else "failed"
+    return "succeeded"
+
+
+def _summary(statuses: List[str]) -> str:
+    """Outcome of a schedule's run from the outcomes of its clusters"""
+    if any(status in ("failed", "partial") for status in statuses):
+        return "failed" if all(status == "failed" for status in statuses) else "partial"
+    return "succeeded"
+
+
+class _Due(NamedTuple):
+    schedule_id: int
+    action: str
+    due_at: datetime
+    cluster_ids: List[int]
+
+
+class ScheduleRunner:
+    """Background thread that runs due schedules in rate-limited batches"""
+
+    def __init__(self, interval: float = None, batch_size: int = None,
+                 concurrency: int = None, rate: float = None):
+        self.interval = interval if interval is not None else settings.SCHEDULER_INTERVAL_SECONDS
+        self.batch_size = batch_size if batch_size is not None else settings.SCHEDULER_BATCH_SIZE
+        self.concurrency = concurrency if concurrency is not None else settings.SCHEDULER_CONCURRENCY
+        self.limiter = RateLimiter(rate if rate is not None else settings.SCHEDULER_RATE)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="schedule-runner", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+                self.prune()
+            except Exception:
+                logger.exception("Schedule runner failed")
+            self._stop.wait(self.interval)
+
+    def run_due(self, now: datetime = None) -> int:
+        """Run every due schedule, returning how many were run"""
+        ran = 0
+        while not self._stop.is_set():
+            claimed = self.claim(now or datetime.utcnow())
+            if claimed:
+                self._execute(claimed)
+                ran += len(claimed)
+            if len(claimed) < self.batch_size:
+                break
+        return ran
+
+    def claim(self, now: datetime) -> List[_Due]:
+        """Claim up to batch_size due schedules and move them to their next occurrence"""
+        db = SessionLocal()
+        try:
+            due = db.query(Schedule).filter(
+                Schedule.enabled == True,  # noqa: E712  Equality keeps ix_schedules_due usable
+                Schedule.next_run_at <= now
+            ).order_by(
+                Schedule.next_run_at, Schedule.id
+            ).limit(self.batch_size).with_for_update(skip_locked=True).all()
+
+            claimed = []
+            for schedule in due:
+                runnable = True
+                try:
+                    changes = {Schedule.next_run_at: reschedule(schedule, now), Schedule.last_run_at: now}
+                except ValueError as e:
+                    # E.g. the timezone vanished from the tz database
+                    logger.error("Disabling schedule %s: %s", schedule.id, e)
+                    changes = {Schedule.enabled: False, Schedule.last_status: "failed"}
+                    runnable = False
+                # The guarded update keeps claims exclusive on databases without SKIP LOCKED
+                updated = db.query(Schedule).filter(
+                    Schedule.id == schedule.id, Schedule.next_run_at == schedule.next_run_at
+                ).update(changes, synchronize_session=False)
+                if not updated or not runnable:
+                    continue
+                if schedule.cluster_id is not None:
+                    cluster_ids = [schedule.cluster_id]
+                else:
+                    cluster_ids = [cluster_id for (cluster_id,) in db.query(Cluster.id).filter(
+                        Cluster.owner_id == schedule.owner_id
+                    ).order_by(Cluster.id)]
+                claimed.append(_Due(schedule.id, schedule.action, schedule.next_run_at, cluster_ids))
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _execute(self, claimed: List[_Due]):
+        """
+        Run the clusters of claimed schedules and record each schedule's outcome.
+        Clusters run concurrently, the schedules of one cluster in due order.
+        """
+        by_cluster: Dict[int, List[_Due]] = defaultdict(list)
+        for due in sorted(claimed, key=lambda due: (due.due_at, due.schedule_id)):
+            for cluster_id in due.cluster_ids:
+                by_cluster[cluster_id].append(due)
+
+        outcomes: Dict[int, List[str]] = {due.schedule_id: [] for due in claimed}
+        with ThreadPoolExecutor(max_workers=max(self.concurrency, 1), thread_name_prefix="schedule") as executor:
+            futures = [
+                executor.submit(self._run_in_order, cluster_id, dues) for cluster_id, dues in by_cluster.items()
+            ]
+            for future in futures:
+                for schedule_id, status in future.result():
+                    if status:
+                        outcomes[schedule_id].append(status)
+
+        db = SessionLocal()
+        try:
+            for schedule_id, statuses in outcomes.items():
+                db.query(Schedule).filter(Schedule.id == schedule_id).update(
+                    {Schedule.last_status: _summary(statuses)}, synchronize_session=False
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    def _run_in_order(self, cluster_id: int, dues: List[_Due]) -> List[Tuple[int, Optional[str]]]:
+        """Run one cluster's due schedules one after another"""
+        return [(due.schedule_id, self.run_cluster(due, cluster_id)) for due in dues]
+
+    def run_cluster(self, due: _Due, cluster_id: int) -> Optional[str]:
+        """Suspend or resume one cluster and record the run; None when shutting down first"""
+        if not self.limiter.acquire(self._stop):
+            return None
+        started_at = datetime.utcnow()
+        SCHEDULE_LAG.observe(max(0.0, (started_at - due.due_at).total_seconds()))
+        operation, done_key = ACTIONS[due.action]
+        db = SessionLocal()
+        try:
+            with start_span("schedule.run", {
+                "schedule.id": due.schedule_id,
+                "schedule.action": due.action,
+                "cluster.id": cluster_id,
+            }):
+                try:
+                    cluster = db.get(Cluster, cluster_id)
+                    if cluster is None:
+                        status, detail = "skipped", {"error": "Cluster no longer exists"}
+                    else:
+                        detail = operation(db, cluster)
+                        status = _outcome(detail, done_key)
+                except Exception as e:
+                    db.rollback()
+                    logger.exception("Scheduled %s of cluster %s failed", due.action, cluster_id)
+                    status, detail = "failed", {"error": str(e)}
+            db.add(ScheduleRun(
+                schedule_id=due.schedule_id, cluster_id=cluster_id, action=due.action, status=status,
+                detail=detail, started_at=started_at, finished_at=datetime.utcnow()
+            ))
+            db.commit()
+        finally:
+            db.close()
+        SCHEDULED_RUNS.labels(action=due.action, status=status).inc()
+        return status
+
+    def prune(self, now: datetime = None) -> int:
+        """Delete recorded runs past the retention period"""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=settings.SCHEDULER_RUN_RETENTION_DAYS)
+        db = SessionLocal()
+        try:
+            deleted = db.query(ScheduleRun).filter(ScheduleRun.started_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+def reschedule(schedule: Schedule, after: datetime = None) -> datetime:
+    """Next occurrence of a schedule after `after` (default now)"""
+    return next_run_at(schedule.time_of_day, schedule.days, schedule.timezone, after or datetime.utcnow())
+
+
+def weekdays(days: List[str]) -> str:
+    """Stored form of a list of weekday names, in week order"""
+    return ",".join(day for day in WEEKDAYS if day in days)
+
+
+# Singleton instance
+schedule_runner = ScheduleRunner()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 from app.models import InstanceType, InstanceStatus
 
@@ -34,6 +34,14 @@ class ClusterCreate(BaseModel):
     instance_count: int = Field(gt=0, description="Number of instances")
 
 
+class ClusterBulkCreate(BaseModel):
+    clusters: List[ClusterCreate] = Field(..., min_length=1, max_length=100)
+
+
+class ClusterScale(BaseModel):
+    instance_count: int = Field(gt=0, description="Desired number of instances")
+
+
 class ClusterResponse(BaseModel):
     id: int
     name: str
@@ -53,6 +61,48 @@ class ClusterDetail(ClusterResponse):
     instances: List["InstanceResponse"] = []
 
 
+class UsageSample(BaseModel):
+    sampled_at: datetime
+    cpu: float  # Cores in use
+    memory: float  # GB in use
+
+
+class InstanceLiveUsage(BaseModel):
+    instance_id: int
+    instance_name: str
+    cpu_requested: float
+    memory_requested: float
+    current: Optional[UsageSample] = None  # None until the instance has been sampled
+    samples: List[UsageSample] = []  # Recent samples, oldest first; only on the instance route
+
+
+class ClusterLiveUsage(BaseModel):
+    cluster_id: int
+    cpu_requested: float
+    memory_requested: float
+    cpu_used: float  # Sum of the sampled instances' current usage
+    memory_used: float
+    sampled_instances: int
+    instances: List[InstanceLiveUsage]
+
+
+class ClusterBulkResult(BaseModel):
+    name: str
+    status: str  # created, failed or rejected
+    cluster: Optional[ClusterResponse] = None
+    instances_created: int = 0
+    instances_failed: int = 0
+    error: Optional[str] = None
+    available: Optional[dict] = None  # Target headroom when rejected for capacity
+
+
+class ClusterBulkResponse(BaseModel):
+    results: List[ClusterBulkResult]
+    created: int
+    failed: int
+    rejected: int
+
+
 # Instance Schemas
 class InstanceResponse(BaseModel):
     id: int
@@ -67,6 +117,9 @@ class InstanceResponse(BaseModel):
         from_attributes = True
 
 
+ClusterDetail.model_rebuild()
+
+
 class InstanceOperation(BaseModel):
     operation: str = Field(..., pattern="^(start|stop|suspend|resume)$")
 
@@ -85,3 +138,93 @@ class QuotaResponse(BaseModel):
     available_cpu: float
     available_memory: float
 
+
+
+class UsagePeriod(BaseModel):
+    period_start: datetime
+    instance_hours: float
+    cpu_hours: float
+    memory_gb_hours: float
+
+
+class UsageReport(BaseModel):
+    granularity: str
+    start: datetime
+    end: datetime
+    rolled_until: Optional[datetime]  # Usage after this is not rolled up yet
+    periods: List[UsagePeriod]
+    instance_hours: float
+    cpu_hours: float
+    memory_gb_hours: float
+
+
+class FleetCounts(BaseModel):
+    instances: int
+    by_status: Dict[str, int]
+    by_type: Dict[str, Dict[str, int]]  # instance type -> status -> count
+
+
+class FleetUserSummary(FleetCounts):
+    user_id: int
+    username: Optional[str]
+
+
+class FleetSummary(BaseModel):
+    totals: FleetCounts
+    users: List[FleetUserSummary]
+
+
+class ImportReport(BaseModel):
+    export_id: str
+    inserted: Dict[str, int]  # Table -> rows inserted by this run
+    skipped: int  # Rows committed by an earlier run of the same import
+    resumed_from: Optional[dict] = None
+
+
+# Schedule Schemas
+Weekday = Literal["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+TIME_OF_DAY_PATTERN = "^([01][0-9]|2[0-3]):[0-5][0-9]$"
+
+
+class ScheduleCreate(BaseModel):
+    action: str = Field(..., pattern="^(suspend|resume)$")
+    cluster_id: Optional[int] = Field(None, description="Cluster to act on, all of the user's clusters if omitted")
+    time_of_day: str = Field(..., pattern=TIME_OF_DAY_PATTERN, description="HH:MM in timezone")
+    days: List[Weekday] = Field(default=["mon", "tue", "wed", "thu", "fri", "sat", "sun"], min_length=1)
+    timezone: str = Field(default="UTC", description="IANA timezone name, e.g. Europe/Berlin")
+    enabled: bool = True
+
+
+class ScheduleUpdate(BaseModel):
+    time_of_day: Optional[str] = Field(None, pattern=TIME_OF_DAY_PATTERN)
+    days: Optional[List[Weekday]] = Field(None, min_length=1)
+    timezone: Optional[str] = None
+    enabled: Optional[bool] = None
+
+
+class ScheduleResponse(BaseModel):
+    id: int
+    action: str
+    cluster_id: Optional[int]
+    time_of_day: str
+    days: List[str]
+    timezone: str
+    enabled: bool
+    next_run_at: datetime
+    last_run_at: Optional[datetime]
+    last_status: Optional[str]
+    created_at: datetime
+
+
+class ScheduleRunResponse(BaseModel):
+    id: int
+    schedule_id: int
+    cluster_id: int
+    action: str
+    status: str
+    detail: Optional[dict]
+    started_at: datetime
+    finished_at: datetime
+    
+    class Config:
+        from_attributes = True
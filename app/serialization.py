@@ -0,0 +1,118 @@
+"""
+Fast response serialization.
+
+List and detail routes select only the columns their response schema needs
+and render plain dicts with orjson, skipping ORM object construction and
+pydantic validation. Column lists are computed once from the schemas at
+import time, so the JSON shape always matches the documented response_model.
+
+Routes that accept a fields= query parameter (sparse fieldsets) select only
+the requested columns, through serializers derived per field combination.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import DateTime, Enum as SQLEnum
+
+from app.models import Cluster, Instance, User
+from app.schemas import ClusterResponse, InstanceResponse, UserResponse
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson-rendered response for routes that return prepared dicts"""
+
+
+def schema_columns(model, schema: Type[BaseModel]) -> List:
+    """Model columns matching the scalar fields of schema, in schema order"""
+    columns = []
+    for name in schema.model_fields:
+        column = getattr(model, name, None)
+        if column is not None and hasattr(column, "property") and hasattr(column.property, "columns"):
+            columns.append(column)
+    return columns
+
+
+def _converter(column) -> Optional[Callable]:
+    """
+    Per-column conversion to JSON primitives, matching pydantic's JSON output.
+    Values stay JSON-native so they can also be stored in the shared cache.
+    """
+    column_type = column.property.columns[0].type
+    if isinstance(column_type, SQLEnum):
+        return lambda value: value.value if value is not None else None
+    if isinstance(column_type, DateTime):
+        return lambda value: value.isoformat() if value is not None else None
+    return None
+
+
+class RowSerializer:
+    """Precomputed keys and converters for turning column tuples into dicts"""
+
+    def __init__(self, columns: List):
+        self.columns = columns
+        self.keys = [column.key for column in columns]
+        self.converters = [
+            (index, converter)
+            for index, converter in enumerate(_converter(column) for column in columns)
+            if converter is not None
+        ]
+        self._subsets: Dict[Tuple[str, ...], "RowSerializer"] = {}
+
+    def subset(self, keys: Sequence[str]) -> "RowSerializer":
+        """Serializer for some of the columns, in this serializer's order"""
+        selected = tuple(key for key in self.keys if key in keys)
+        if selected == tuple(self.keys):
+            return self
+        serializer = self._subsets.get(selected)
+        if serializer is None:
+            serializer = RowSerializer([column for column in self.columns if column.key in selected])
+            self._subsets[selected] = serializer
+        return serializer
+
+    def one(self, row: Sequence) -> Dict:
+        values = list(row)
+        for index, converter in self.converters:
+            values[index] = converter(values[index])
+        return dict(zip(self.keys, values))
+
+    def many(self, rows: Iterable[Sequence]) -> List[Dict]:
+        return [self.one(row) for row in rows]
+
+
+class FieldSelection:
+    """
+    A parsed fields= value such as "id,name,instances.id,instances.status".
+    Naming a nested collection alone ("instances") selects all of its fields;
+    a collection that is not named is left out of the response entirely.
+    """
+
+    def __init__(self, fields: str, serializer: RowSerializer, nested: Dict[str, RowSerializer] = None):
+        nested = nested or {}
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        allowed = list(serializer.keys)
+        for collection, nested_serializer in nested.items():
+            allowed += [collection] + [f"{collection}.{key}" for key in nested_serializer.keys]
+        unknown = [name for name in names if name not in allowed]
+        if unknown or not names:
+            raise ValueError(f"Unknown fields: {', '.join(unknown) or '(none)'}. Allowed: {', '.join(allowed)}")
+        self.serializer = serializer.subset(names)
+        self.nested: Dict[str, RowSerializer] = {}
+        for collection, nested_serializer in nested.items():
+            keys = [name.split(".", 1)[1] for name in names if name.startswith(f"{collection}.")]
+            if collection in names or keys:
+                self.nested[collection] = nested_serializer.subset(keys) if keys else nested_serializer
+
+    def project(self, document: Dict) -> Dict:
+        """Apply the selection to a fully serialized document, e.g. a cached one"""
+        projected = {key: document[key] for key in self.serializer.keys}
+        for collection, serializer in self.nested.items():
+            projected[collection] = [
+                {key: item[key] for key in serializer.keys} for item in document.get(collection, [])
+            ]
+        return projected
+
+
+cluster_serializer = RowSerializer(schema_columns(Cluster, ClusterResponse))
+instance_serializer = RowSerializer(schema_columns(Instance, InstanceResponse))
+user_serializer = RowSerializer(schema_columns(User, UserResponse))
@@ -0,0 +1,149 @@
+"""
+Suspend and resume every instance of a cluster.
+
+Shared by the cluster routes and the schedule runner (app/schedules.py).
+Both functions commit, invalidate the cached cluster and return the counts
+reported to the caller.
+"""
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.cache import cache, cluster_key
+from app.config import settings
+from app.k8s_service import k8s_registry
+from app.models import Cluster, Instance, InstanceStatus, OperationKind
+from app.work_queue import enqueue_operation
+
+logger = logging.getLogger(__name__)
+
+
+def suspend_cluster_instances(db: Session, cluster: Cluster) -> dict:
+    """Suspend the running instances of a cluster"""
+    instances = db.query(Instance).filter(Instance.cluster_id == cluster.id).all()
+
+    suspended_count = 0
+    failed_count = 0
+    skipped_count = 0
+    queued_count = 0
+
+    # Pooled VMs run in the shared VM pool namespace and are always stopped one by one
+    individual = [instance for instance in instances if instance.k8s_namespace is not None]
+    if cluster.statefulset:
+        # Scaling to zero stops every pod with one call, resume scales back up
+        members = [instance for instance in instances if instance.k8s_namespace is None]
+        running = [instance for instance in members if instance.status == InstanceStatus.RUNNING]
+        if running and k8s_registry.for_cluster(cluster).scale_statefulset(
+            cluster.statefulset, 0, cluster.namespace
+        ):
+            for instance in running:
+                instance.status = InstanceStatus.SUSPENDED
+            suspended_count = len(running)
+        elif running:
+            failed_count = len(running)
+            logger.error("Failed to suspend StatefulSet %s", cluster.statefulset)
+        skipped_count = len(members) - len(running)
+    else:
+        individual = instances
+    for instance in individual:
+        # Only suspend running instances
+        if instance.status == InstanceStatus.RUNNING and settings.WORK_QUEUE_ENABLED:
+            enqueue_operation(db, OperationKind.STOP_INSTANCE, cluster, instance,
+                              target_status=InstanceStatus.SUSPENDED)
+            queued_count += 1
+        elif instance.status == InstanceStatus.RUNNING:
+            success = k8s_registry.for_cluster(cluster).stop_instance(
+                instance_name=instance.resource_name,
+                instance_type=cluster.instance_type,
+                namespace=instance.resource_namespace
+            )
+
+            if success:
+                instance.status = InstanceStatus.SUSPENDED
+                suspended_count += 1
+            else:
+                failed_count += 1
+                logger.error("Failed to suspend instance %s", instance.instance_name)
+        else:
+            skipped_count += 1
+            logger.debug("Skipped instance %s with status %s", instance.instance_name, instance.status.value)
+
+    db.commit()
+    cache.delete(cluster_key(cluster.id))
+
+    logger.info("Cluster '%s' suspend operation completed: %s suspended, %s queued, %s failed, %s skipped",
+                cluster.name, suspended_count, queued_count, failed_count, skipped_count)
+
+    return {
+        "cluster_id": cluster.id,
+        "total_instances": len(instances),
+        "suspended": suspended_count,
+        "queued": queued_count,
+        "failed": failed_count,
+        "skipped": skipped_count
+    }
+
+
+def resume_cluster_instances(db: Session, cluster: Cluster) -> dict:
+    """Resume the suspended instances of a cluster"""
+    instances = db.query(Instance).filter(Instance.cluster_id == cluster.id).all()
+
+    resumed_count = 0
+    failed_count = 0
+    skipped_count = 0
+    queued_count = 0
+
+    # Pooled VMs run in the shared VM pool namespace and are always started one by one
+    individual = [instance for instance in instances if instance.k8s_namespace is not None]
+    if cluster.statefulset:
+        members = [instance for instance in instances if instance.k8s_namespace is None]
+        suspended = [instance for instance in members if instance.status == InstanceStatus.SUSPENDED]
+        if suspended and k8s_registry.for_cluster(cluster).scale_statefulset(
+            cluster.statefulset, cluster.instance_count - len(individual), cluster.namespace
+        ):
+            for instance in suspended:
+                instance.status = InstanceStatus.RUNNING
+            resumed_count = len(suspended)
+        elif suspended:
+            failed_count = len(suspended)
+            logger.error("Failed to resume StatefulSet %s", cluster.statefulset)
+        skipped_count = len(members) - len(suspended)
+    else:
+        individual = instances
+    for instance in individual:
+        # Only resume suspended instances
+        if instance.status == InstanceStatus.SUSPENDED and settings.WORK_QUEUE_ENABLED:
+            enqueue_operation(db, OperationKind.START_INSTANCE, cluster, instance,
+                              target_status=InstanceStatus.RUNNING)
+            queued_count += 1
+        elif instance.status == InstanceStatus.SUSPENDED:
+            success = k8s_registry.for_cluster(cluster).start_instance(
+                instance_name=instance.resource_name,
+                instance_type=cluster.instance_type,
+                namespace=instance.resource_namespace
+            )
+
+            if success:
+                instance.status = InstanceStatus.RUNNING
+                resumed_count += 1
+            else:
+                failed_count += 1
+                logger.error("Failed to resume instance %s", instance.instance_name)
+        else:
+            skipped_count += 1
+            logger.debug("Skipped instance %s with status %s", instance.instance_name, instance.status.value)
+
+    db.commit()
+    cache.delete(cluster_key(cluster.id))
+
+    logger.info("Cluster '%s' resume operation completed: %s resumed, %s queued, %s failed, %s skipped",
+                cluster.name, resumed_count, queued_count, failed_count, skipped_count)
+
+    return {
+        "cluster_id": cluster.id,
+        "total_instances": len(instances),
+        "resumed": resumed_count,
+        "queued": queued_count,
+        "failed": failed_count,
+        "skipped": skipped_count
+    }
@@ -0,0 +1,41 @@
+"""
+API token hashing.
+
+Tokens are random bearer secrets, not passwords, so a slow password hash adds
+latency without adding security. Tokens are stored as an HMAC-SHA256 keyed
+with TOKEN_HASH_KEY: a leaked database alone cannot be used to check
+guesses. The first TOKEN_PREFIX_LENGTH hex characters of the digest go into an
+indexed column for lookup, and candidates are compared on the full digest in
+constant time.
+"""
+import hashlib
+import hmac
+from typing import Optional
+
+from starlette.requests import Request
+
+from app.config import settings
+
+TOKEN_PREFIX_LENGTH = 12
+
+_key = settings.TOKEN_HASH_KEY.encode()
+
+
+def hash_token(token: str) -> str:
+    """Keyed hex digest stored in place of the token"""
+    return hmac.new(_key, token.encode(), hashlib.sha256).hexdigest()
+
+
+def token_prefix(token_hash: str) -> str:
+    """Indexed lookup prefix of a token digest"""
+    return token_hash[:TOKEN_PREFIX_LENGTH]
+
+
+def digests_match(stored: str, presented: str) -> bool:
+    return hmac.compare_digest(stored, presented)
+
+
+def bearer_token(request: Request) -> Optional[str]:
+    """Token of a request's Authorization header, for code that runs before authentication"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
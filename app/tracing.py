@@ -0,0 +1,286 @@
+"""
+Distributed tracing built on OpenTelemetry.
+
+Tracing is optional: when the opentelemetry packages are not installed or
+TRACING_ENABLED is false, every helper in this module degrades to a no-op.
+"""
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+from contextlib import contextmanager
+from enum import Enum
+from typing import Callable, List, Optional
+
+from app.config import settings
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import propagate, trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import (
+        BatchSpanProcessor,
+        ConsoleSpanExporter,
+        SimpleSpanProcessor,
+        SpanExporter,
+        SpanExportResult,
+    )
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+    OTEL_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on installed extras
+    OTEL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+_memory_exporter = None
+
+
+if OTEL_AVAILABLE:
+    class FileSpanExporter(SpanExporter):
+        """Append finished spans to a file, one JSON document per line"""
+
+        def __init__(self, path: str):
+            self.path = path
+            self._lock = threading.Lock()
+
+        def export(self, spans) -> "SpanExportResult":
+            lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+            with self._lock:
+                with open(self.path, "a", encoding="utf-8") as handle:
+                    handle.write(lines)
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self) -> None:
+            pass
+
+
+def _build_exporter(name: str):
+    """Create the span exporter selected by TRACING_EXPORTER"""
+    global _memory_exporter
+
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "file":
+        return FileSpanExporter(settings.TRACING_FILE_PATH)
+    if name == "memory":
+        _memory_exporter = InMemorySpanExporter()
+        return _memory_exporter
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning(
+                "TRACING_EXPORTER=otlp needs opentelemetry-exporter-otlp-proto-grpc, "
+                "writing spans to %s instead", settings.TRACING_FILE_PATH
+            )
+            return FileSpanExporter(settings.TRACING_FILE_PATH)
+        return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+    raise ValueError(f"Unknown tracing exporter '{name}'")
+
+
+def setup_tracing() -> bool:
+    """
+    Configure the global tracer provider.
+    Returns True if tracing is active after the call.
+    """
+    global _tracer
+
+    if _tracer is not None:
+        return True
+    if not settings.TRACING_ENABLED:
+        return False
+    if not OTEL_AVAILABLE:
+        logger.warning("TRACING_ENABLED is set but opentelemetry is not installed, tracing disabled")
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME})
+    )
+    exporter = _build_exporter(settings.TRACING_EXPORTER)
+    # Local exporters are cheap and should be visible immediately, network exporters are batched
+    if isinstance(exporter, (InMemorySpanExporter, FileSpanExporter)):
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+    else:
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("kubekloud-api")
+
+    logger.info("Tracing enabled with %s", type(exporter).__name__)
+    return True
+
+
+def shutdown_tracing():
+    """Flush and shut down the tracer provider"""
+    global _tracer
+
+    if _tracer is None:
+        return
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+    _tracer = None
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+def get_finished_spans() -> List:
+    """Return spans captured by the in-memory exporter (local testing only)"""
+    if _memory_exporter is None:
+        return []
+    return list(_memory_exporter.get_finished_spans())
+
+
+def _attribute_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    return None
+
+
+@contextmanager
+def start_span(name: str, attributes: Optional[dict] = None, kind=None):
+    """Start a span as the current span; yields None when tracing is disabled"""
+    if _tracer is None:
+        yield None
+        return
+
+    with _tracer.start_as_current_span(name, kind=kind or SpanKind.INTERNAL) as span:
+        for key, value in (attributes or {}).items():
+            value = _attribute_value(value)
+            if value is not None:
+                span.set_attribute(key, value)
+        yield span
+
+
+def traced(func: Callable = None, *, name: Optional[str] = None):
+    """
+    Decorator wrapping a function call in a span.
+    Simple keyword and positional arguments (strings, numbers, enums) are recorded
+    as span attributes, so spans carry the namespace and instance involved.
+    """
+    if func is None:
+        return functools.partial(traced, name=name)
+
+    span_name = name or func.__qualname__
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _tracer is None:
+            return func(*args, **kwargs)
+
+        attributes = {}
+        try:
+            bound = signature.bind_partial(*args, **kwargs)
+            for key, value in bound.arguments.items():
+                if key != "self":
+                    attributes[f"arg.{key}"] = value
+        except TypeError:
+            pass
+
+        with start_span(span_name, attributes) as span:
+            result = func(*args, **kwargs)
+            if isinstance(result, bool):
+                span.set_attribute("result.success", result)
+                if not result:
+                    span.set_status(Status(StatusCode.ERROR))
+            return result
+
+    return wrapper
+
+
+def bind_context(func: Callable) -> Callable:
+    """
+    Bind the caller's context (including the active span) to func.
+    Use when handing work to a thread pool or a background task so its spans
+    are parented to the request that scheduled it.
+    """
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return ctx.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def extract_context(headers):
+    """Extract a remote parent context from incoming HTTP headers"""
+    if _tracer is None:
+        return None
+    return propagate.extract(headers)
+
+
+@contextmanager
+def server_span(name: str, headers, attributes: Optional[dict] = None):
+    """Start a SERVER span continuing any trace propagated in headers"""
+    if _tracer is None:
+        yield None
+        return
+
+    token = otel_context.attach(propagate.extract(headers))
+    try:
+        with start_span(name, attributes, kind=SpanKind.SERVER) as span:
+            yield span
+    finally:
+        otel_context.detach(token)
+
+
+def instrument_engine(engine):
+    """Emit a client span for every SQL statement executed on engine"""
+    if _tracer is None:
+        return
+
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.split(None, 1)[0].upper() if statement else "SQL"
+        span = _tracer.start_span(
+            f"db.{operation.lower()}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": engine.dialect.name,
+                "db.statement": statement[:1000],
+            },
+        )
+        context._otel_span = span
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_otel_span", None)
+        if span is not None:
+            span.end()
+            context._otel_span = None
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        context = exception_context.execution_context
+        span = getattr(context, "_otel_span", None) if context is not None else None
+        if span is not None:
+            span.record_exception(exception_context.original_exception)
+            span.set_status(Status(StatusCode.ERROR))
+            span.end()
+            context._otel_span = None
+
+
+class TraceContextFilter(logging.Filter):
+    """Add trace_id and span_id to every log record for log/trace correlation"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace_id = span_id = "-"
+        if _tracer is not None:
+            span_context = trace.get_current_span().get_span_context()
+            if span_context.is_valid:
+                trace_id = format(span_context.trace_id, "032x")
+                span_id = format(span_context.span_id, "016x")
+        record.trace_id = trace_id
+        record.span_id = span_id
+        return True
@@ -0,0 +1,211 @@
+"""
+Streaming NDJSON export and import of users, clusters and instances.
+
+An export is one JSON object per line: a header naming the export, every row
+of EXPORT_TABLES in that order, each table ordered by id, and a trailer with
+the row counts. Rows are read
+through a server-side cursor (stream_results) and written as they arrive, so
+memory stays constant however large the installation is. On PostgreSQL the
+export runs in one REPEATABLE READ transaction and sees a consistent snapshot.
+
+Import inserts rows in batches of TRANSFER_BATCH_SIZE with one executemany
+per batch, keeping the exported ids. Each batch commits together with a
+checkpoint row keyed by the export id, so an interrupted import of the same
+export resumes after the last committed batch; a stream without the trailer
+keeps its progress and is reported as truncated. Import into an empty database:
+rows whose ids or names already exist fail the batch. Tokens are exported as
+stored digests, so the target needs the same TOKEN_HASH_KEY.
+
+The ORM flush listeners do not see these inserts. Fleet counters are rebuilt
+when an import completes, and usage metering starts with the imported
+instances from then on.
+"""
+import logging
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+from sqlalchemy import DateTime, Enum as SQLEnum, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.fleet import rebuild_counters
+from app.models import Base, ImportCheckpoint
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMAT = "kubekloud-export"
+EXPORT_VERSION = 1
+# Parents before children, so foreign keys hold while importing
+EXPORT_TABLES = ("users", "clusters", "instances")
+
+
+class InvalidExport(ValueError):
+    """The import stream is not a valid export"""
+
+
+def export_lines(engine: Engine, batch_size: int = None) -> Iterator[bytes]:
+    """Yield the export as NDJSON lines"""
+    batch_size = batch_size or settings.TRANSFER_BATCH_SIZE
+    yield orjson.dumps({
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "export_id": uuid.uuid4().hex,
+        "exported_at": datetime.utcnow(),
+        "tables": list(EXPORT_TABLES),
+    }) + b"\n"
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn = conn.execution_options(isolation_level="REPEATABLE READ")
+        conn = conn.execution_options(stream_results=True, yield_per=batch_size)
+        rows = {}
+        for name in EXPORT_TABLES:
+            table = Base.metadata.tables[name]
+            rows[name] = 0
+            result = conn.execute(select(table).order_by(table.c.id))
+            keys = [str(key) for key in result.keys()]  # orjson only accepts exact str keys
+            for row in result:
+                # orjson writes enums as their value and datetimes as ISO 8601
+                yield orjson.dumps({"table": name, "row": dict(zip(keys, row))}) + b"\n"
+                rows[name] += 1
+    yield orjson.dumps({"end": True, "rows": rows}) + b"\n"
+
+
+def reset_sequences(db: Session, tables: Iterable[str]):
+    """Move PostgreSQL id sequences past rows inserted with explicit ids"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for name in tables:
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {name}), 0) + 1, false)"
+        ))
+
+
+def _decoders(table) -> Dict[str, Callable]:
+    decoders = {}
+    for column in table.columns:
+        if isinstance(column.type, SQLEnum) and column.type.enum_class is not None:
+            decoders[column.name] = column.type.enum_class
+        elif isinstance(column.type, DateTime):
+            decoders[column.name] = datetime.fromisoformat
+    return decoders
+
+
+class Importer:
+    """Batched, resumable import of an export stream, fed line by line"""
+
+    def __init__(self, engine: Engine, batch_size: int = None):
+        self.engine = engine
+        self.batch_size = batch_size or settings.TRANSFER_BATCH_SIZE
+        self.export_id: Optional[str] = None
+        self.resumed_from: Optional[dict] = None
+        self.inserted: Dict[str, int] = {name: 0 for name in EXPORT_TABLES}
+        self.skipped = 0
+        self._columns = {name: set(Base.metadata.tables[name].columns.keys()) for name in EXPORT_TABLES}
+        self._decoders = {name: _decoders(Base.metadata.tables[name]) for name in EXPORT_TABLES}
+        self._checkpoint_table: Optional[int] = None  # Index into EXPORT_TABLES
+        self._checkpoint_id = 0
+        self._table: Optional[str] = None
+        self._batch: List[dict] = []
+        self._completed = False
+        self._ended = False
+
+    def feed(self, lines: Iterable[bytes]):
+        for line in lines:
+            if line.strip():
+                self._record(line)
+
+    def _record(self, line: bytes):
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            raise InvalidExport(f"Invalid JSON line: {e}") from None
+        if self.export_id is None:
+            self._start(record)
+            return
+        if record.get("end"):
+            self._ended = True
+            return
+        name = record.get("table")
+        if name not in self.inserted or not isinstance(record.get("row"), dict):
+            raise InvalidExport(f"Unexpected record for table {name!r}")
+        if not isinstance(record["row"].get("id"), int):
+            raise InvalidExport(f"Row of table {name!r} without an id")
+        row = record["row"]
+        if self._done_before(name, row.get("id")):
+            self.skipped += 1
+            return
+        if name != self._table:
+            self._write()
+            self._table = name
+        for column, decode in self._decoders[name].items():
+            if row.get(column) is not None:
+                row[column] = decode(row[column])
+        self._batch.append({key: value for key, value in row.items() if key in self._columns[name]})
+        if len(self._batch) >= self.batch_size:
+            self._write()
+
+    def _start(self, header: dict):
+        if header.get("format") != EXPORT_FORMAT or not header.get("export_id"):
+            raise InvalidExport("The first line is not an export header")
+        if header.get("version") != EXPORT_VERSION:
+            raise InvalidExport(f"Unsupported export version {header.get('version')}")
+        self.export_id = header["export_id"]
+        with Session(self.engine) as db:
+            checkpoint = db.get(ImportCheckpoint, self.export_id)
+            if checkpoint is not None:
+                self._completed = checkpoint.completed_at is not None
+                self._checkpoint_table = EXPORT_TABLES.index(checkpoint.table_name)
+                self._checkpoint_id = checkpoint.last_id
+                self.resumed_from = {"table": checkpoint.table_name, "id": checkpoint.last_id}
+                logger.info("Resuming import %s after %s id %s", self.export_id, checkpoint.table_name, checkpoint.last_id)
+
+    def _done_before(self, name: str, row_id) -> bool:
+        """Whether a row was committed by an earlier run of this import"""
+        if self._completed:
+            return True
+        if self._checkpoint_table is None:
+            return False
+        index = EXPORT_TABLES.index(name)
+        return index < self._checkpoint_table or (index == self._checkpoint_table and row_id <= self._checkpoint_id)
+
+    def _write(self):
+        if not self._batch:
+            return
+        table = Base.metadata.tables[self._table]
+        last_id = self._batch[-1]["id"]
+        with Session(self.engine) as db:
+            db.execute(insert(table), self._batch)
+            checkpoint = db.get(ImportCheckpoint, self.export_id) or ImportCheckpoint(export_id=self.export_id)
+            checkpoint.table_name = self._table
+            checkpoint.last_id = last_id
+            checkpoint.updated_at = datetime.utcnow()
+            db.add(checkpoint)
+            db.commit()
+        self.inserted[self._table] += len(self._batch)
+        self._batch = []
+
+    def finish(self) -> dict:
+        """Write the last batch and bring derived state up to date"""
+        if self.export_id is None:
+            raise InvalidExport("The stream is empty")
+        self._write()
+        if not self._ended:
+            raise InvalidExport("The export stream ended early; import it again to resume")
+        with Session(self.engine) as db:
+            # Rows kept their ids, so move the id sequences past them
+            reset_sequences(db, EXPORT_TABLES)
+            checkpoint = db.get(ImportCheckpoint, self.export_id)
+            if checkpoint is not None and checkpoint.completed_at is None:
+                checkpoint.completed_at = datetime.utcnow()
+            db.commit()
+            rebuild_counters(db)
+        return {
+            "export_id": self.export_id,
+            "inserted": self.inserted,
+            "skipped": self.skipped,
+            "resumed_from": self.resumed_from,
+        }
@@ -0,0 +1,252 @@
+"""
+Usage metering of instance runtime.
+
+Every flush that creates, deletes or changes the status of an instance
+appends a row to usage_events, whichever code path made the change (routers,
+queue workers, status syncs). Raw events are never read by billing queries:
+a background aggregator folds each completed hour into per-owner hourly
+rollups, and each completed day's hourly rollups into a daily rollup.
+
+Progress is kept in usage_watermark. The instances that were running at the
+watermark are kept in usage_running, so a pass only reads the events of the
+hour it rolls up. The watermark only moves with a guarded update, so several
+replicas can run the aggregator and each hour is rolled up exactly once.
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import event, exists, func, insert, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import (
+    Cluster, Instance, InstanceStatus, UsageEvent, UsageRollup, UsageRunning, UsageWatermark
+)
+
+logger = logging.getLogger(__name__)
+
+DELETED = "deleted"
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+
+def floor_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _event_rows(session: Session, changes) -> list:
+    """usage_events rows for (instance, status value) pairs"""
+    now = datetime.utcnow()
+    sizes: Dict[int, tuple] = {}
+    for instance, _ in changes:
+        cluster = inspect(instance).attrs.cluster.loaded_value
+        if cluster is not NO_VALUE and cluster is not None:
+            sizes[instance.cluster_id] = (cluster.owner_id, cluster.cpu_per_instance, cluster.memory_per_instance)
+    missing = {instance.cluster_id for instance, _ in changes} - sizes.keys()
+    if missing:
+        for row in session.connection().execute(
+            select(Cluster.id, Cluster.owner_id, Cluster.cpu_per_instance, Cluster.memory_per_instance)
+            .where(Cluster.id.in_(missing))
+        ):
+            sizes[row[0]] = tuple(row[1:])
+    rows = []
+    for instance, status in changes:
+        owner_id, cpu, memory = sizes.get(instance.cluster_id, (None, None, None))
+        rows.append({
+            "instance_id": instance.id, "cluster_id": instance.cluster_id, "owner_id": owner_id,
+            "cpu": cpu, "memory": memory, "status": status, "occurred_at": now,
+        })
+    return rows
+
+
+def record_events(session: Session, instances, status: str):
+    """
+    Record events for instances removed with a bulk statement, which the
+    flush listener does not see. Call before the rows are deleted.
+    """
+    rows = _event_rows(session, [(instance, status) for instance in instances])
+    if rows:
+        session.execute(insert(UsageEvent), rows)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _record_transitions(session: Session, flush_context):
+    changes = []
+    for instance in session.new:
+        if isinstance(instance, Instance):
+            status = inspect(instance).dict.get("status") or InstanceStatus.PENDING
+            changes.append((instance, status.value))
+    for instance in session.dirty:
+        if isinstance(instance, Instance) and inspect(instance).attrs.status.history.has_changes():
+            changes.append((instance, instance.status.value))
+    for instance in session.deleted:
+        if isinstance(instance, Instance):
+            changes.append((instance, DELETED))
+    if changes:
+        session.connection().execute(insert(UsageEvent), _event_rows(session, changes))
+
+
+class UsageAggregator:
+    """Background thread that rolls completed hours and days up"""
+
+    def __init__(self, interval: float = None, delay: float = None, max_hours: int = None):
+        self.interval = interval if interval is not None else settings.USAGE_ROLLUP_INTERVAL_SECONDS
+        self.delay = timedelta(seconds=delay if delay is not None else settings.USAGE_ROLLUP_DELAY_SECONDS)
+        self.max_hours = max_hours if max_hours is not None else settings.USAGE_ROLLUP_MAX_HOURS
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="usage-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.roll_up()
+            except Exception:
+                logger.exception("Usage rollup failed")
+            self._stop.wait(self.interval)
+
+    def roll_up(self, now: datetime = None) -> int:
+        """Roll up completed hours, returning how many windows were processed"""
+        ready_until = floor_hour((now or datetime.utcnow()) - self.delay)
+        db = SessionLocal()
+        try:
+            self._ensure_watermark(db, ready_until)
+            windows = 0
+            while windows < self.max_hours and not self._stop.is_set():
+                if not self._roll_up_next(db, ready_until):
+                    break
+                windows += 1
+            return windows
+        finally:
+            db.close()
+
+    def _ensure_watermark(self, db: Session, start: datetime):
+        if db.get(UsageWatermark, 1) is not None:
+            return
+        # Instances that ran before metering existed are charged from now on
+        db.add(UsageWatermark(id=1, rolled_until=start))
+        running = db.query(Instance.id, Cluster.owner_id, Cluster.cpu_per_instance, Cluster.memory_per_instance).join(
+            Cluster, Instance.cluster_id == Cluster.id
+        ).filter(
+            Instance.status == InstanceStatus.RUNNING,
+            ~exists().where(UsageEvent.instance_id == Instance.id)
+        )
+        db.add_all(
+            UsageRunning(instance_id=instance_id, owner_id=owner_id, cpu=cpu, memory=memory, since=start)
+            for instance_id, owner_id, cpu, memory in running
+        )
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # Another replica initialised it first
+
+    def _roll_up_next(self, db: Session, ready_until: datetime) -> bool:
+        start = db.get(UsageWatermark, 1).rolled_until
+        if start >= ready_until:
+            return False
+        # Skip hours without any usage, but stop at midnight to close the day
+        end = min(start + HOUR, ready_until)
+        if not db.query(UsageRunning).first():
+            next_event = db.query(func.min(UsageEvent.occurred_at)).filter(
+                UsageEvent.occurred_at >= start
+            ).scalar()
+            midnight = start.replace(hour=0) + DAY
+            end = min(max(floor_hour(next_event), end) if next_event else ready_until, midnight, ready_until)
+
+        # Claim the window first; the row lock serialises replicas on PostgreSQL
+        claimed = db.query(UsageWatermark).filter(
+            UsageWatermark.id == 1, UsageWatermark.rolled_until == start
+        ).update({UsageWatermark.rolled_until: end}, synchronize_session=False)
+        if not claimed:
+            db.rollback()
+            return True
+
+        self._roll_up_window(db, start, end)
+        if end.hour == 0:
+            self._roll_up_day(db, end - DAY)
+        db.commit()
+        db.expire_all()
+        return True
+
+    def _roll_up_window(self, db: Session, start: datetime, end: datetime):
+        totals = defaultdict(lambda: [0.0, 0.0, 0.0])
+
+        def charge(running: UsageRunning, until: datetime):
+            hours = (until - max(running.since, start)).total_seconds() / 3600
+            if hours > 0:
+                total = totals[running.owner_id]
+                total[0] += hours
+                total[1] += running.cpu * hours
+                total[2] += running.memory * hours
+
+        running = {row.instance_id: row for row in db.query(UsageRunning)}
+        events = db.query(UsageEvent).filter(
+            UsageEvent.occurred_at >= start, UsageEvent.occurred_at < end
+        ).order_by(UsageEvent.occurred_at, UsageEvent.id)
+        for usage_event in events:
+            current = running.get(usage_event.instance_id)
+            if current is not None:
+                charge(current, usage_event.occurred_at)
+            if usage_event.status == InstanceStatus.RUNNING.value and usage_event.owner_id is not None:
+                if current is None:
+                    current = UsageRunning(instance_id=usage_event.instance_id)
+                    running[usage_event.instance_id] = current
+                    db.add(current)
+                current.owner_id = usage_event.owner_id
+                current.cpu = usage_event.cpu
+                current.memory = usage_event.memory
+                current.since = usage_event.occurred_at
+            elif current is not None:
+                db.delete(current)
+                del running[usage_event.instance_id]
+        for current in running.values():
+            charge(current, end)
+
+        # A window longer than an hour only happens when nothing ran in it
+        db.add_all(
+            UsageRollup(
+                granularity="hour", period_start=start, owner_id=owner_id,
+                instance_hours=total[0], cpu_hours=total[1], memory_gb_hours=total[2]
+            )
+            for owner_id, total in totals.items()
+        )
+        db.flush()
+
+    def _roll_up_day(self, db: Session, day: datetime):
+        rows = db.query(
+            UsageRollup.owner_id,
+            func.sum(UsageRollup.instance_hours),
+            func.sum(UsageRollup.cpu_hours),
+            func.sum(UsageRollup.memory_gb_hours),
+        ).filter(
+            UsageRollup.granularity == "hour",
+            UsageRollup.period_start >= day,
+            UsageRollup.period_start < day + DAY
+        ).group_by(UsageRollup.owner_id)
+        db.add_all(
+            UsageRollup(
+                granularity="day", period_start=day, owner_id=owner_id,
+                instance_hours=instance_hours, cpu_hours=cpu_hours, memory_gb_hours=memory_gb_hours
+            )
+            for owner_id, instance_hours, cpu_hours, memory_gb_hours in rows.all()
+        )
+
+
+# Singleton instance
+usage_aggregator = UsageAggregator()
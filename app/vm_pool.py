@@ -0,0 +1,178 @@
+"""
+Warm standby pool of stopped KubeVirt VirtualMachines.
+
+VM_POOL_SHAPES maps a "<cpu>x<memory>" shape to the number of stopped VMs to
+keep per target, e.g. {"2x4": 5}. They live in VM_POOL_NAMESPACE, labelled
+cmp-vm-pool=available. When a VM cluster of a pooled shape gets new
+instances, each instance claims a VM by relabelling it and patching
+running: true (guarded by the listed resource version), instead of creating
+and booting a fresh object. The instance then records the VM's name and
+namespace in k8s_resource_name / k8s_namespace. A background thread per
+target tops the pool up again.
+"""
+import logging
+import threading
+import uuid
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.k8s_service import KubernetesRegistry, KubernetesService, k8s_registry
+from app.models import Cluster, Instance, InstanceStatus, InstanceType
+
+logger = logging.getLogger(__name__)
+
+POOL_LABEL = "cmp-vm-pool"
+SHAPE_LABEL = "cmp-vm-shape"
+INSTANCE_ANNOTATION = "cmp/instance"
+
+
+def shape_key(cpu: float, memory: float) -> str:
+    return f"{cpu:g}x{memory:g}"
+
+
+def parse_shape(shape: str) -> Tuple[float, float]:
+    cpu, memory = shape.split("x")
+    return float(cpu), float(memory)
+
+
+class VMPool:
+    """Stopped VMs of one target, grouped by shape"""
+
+    def __init__(self, service: KubernetesService, shapes: Dict[str, int], namespace: str,
+                 refill_seconds: float):
+        self.service = service
+        # Normalise keys so "2.0x4" and "2x4" are the same shape
+        self.shapes = {shape_key(*parse_shape(shape)): size for shape, size in shapes.items()}
+        self.namespace = namespace
+        self.refill_seconds = refill_seconds
+        self._available: Dict[str, deque] = {shape: deque() for shape in self.shapes}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.service.custom_api is None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"vm-pool-{self.service.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refill()
+            except Exception as e:
+                logger.warning("VM pool refill on target '%s' failed: %s", self.service.name, e)
+            self._wake.wait(self.refill_seconds)
+            self._wake.clear()
+
+    def _list_available(self) -> Dict[str, list]:
+        by_shape = {shape: [] for shape in self.shapes}
+        vms = self.service.list_vms(self.namespace, f"{POOL_LABEL}=available")
+        for name, vm in sorted(vms.items()):
+            shape = vm["labels"].get(SHAPE_LABEL)
+            if shape in by_shape:
+                by_shape[shape].append((name, vm["resource_version"]))
+        return by_shape
+
+    def refill(self):
+        """Create missing VMs for every shape and refresh the claimable list"""
+        self.service.create_namespace(self.namespace)
+        available = self._list_available()
+        created = 0
+        for shape, size in self.shapes.items():
+            cpu, memory = parse_shape(shape)
+            for _ in range(size - len(available[shape])):
+                if self.service.create_stopped_vm(
+                    f"cmp-vm-{uuid.uuid4().hex[:12]}", cpu, memory, self.namespace,
+                    labels={POOL_LABEL: "available", SHAPE_LABEL: shape}
+                ):
+                    created += 1
+        if created:
+            available = self._list_available()
+            logger.info("VM pool on target '%s' refilled with %s VMs", self.service.name, created)
+        with self._lock:
+            self._available = {shape: deque(vms) for shape, vms in available.items()}
+
+    def claim(self, cpu: float, memory: float, instance_name: str) -> Optional[str]:
+        """Start a pooled VM of the given shape for instance_name, None if there is none"""
+        shape = shape_key(cpu, memory)
+        if shape not in self.shapes:
+            return None
+        claimed = None
+        while claimed is None:
+            with self._lock:
+                if not self._available[shape]:
+                    break
+                name, resource_version = self._available[shape].popleft()
+            # Fails if another replica claimed it first, then try the next one
+            if self.service.claim_vm(
+                name, self.namespace,
+                labels={POOL_LABEL: "claimed", "app": instance_name},
+                annotations={INSTANCE_ANNOTATION: instance_name},
+                resource_version=resource_version
+            ):
+                claimed = name
+        self._wake.set()
+        return claimed
+
+
+class VMPools:
+    """VM pools for every target"""
+
+    def __init__(self, registry: KubernetesRegistry):
+        self.registry = registry
+        self.pools = {
+            service.name: VMPool(
+                service,
+                shapes=settings.VM_POOL_SHAPES,
+                namespace=settings.VM_POOL_NAMESPACE,
+                refill_seconds=settings.VM_POOL_REFILL_SECONDS,
+            )
+            for service in registry.services()
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.VM_POOL_SHAPES)
+
+    def start(self):
+        if self.enabled:
+            for pool in self.pools.values():
+                pool.start()
+
+    def stop(self):
+        for pool in self.pools.values():
+            pool.stop()
+
+    def claim(self, cluster: Cluster, instance: Instance) -> bool:
+        """
+        Back a new VM instance with a pooled VM if one of its shape is available.
+        On success the instance points at the started VM and is RUNNING.
+        """
+        if not self.enabled or cluster.instance_type != InstanceType.VM:
+            return False
+        pool = self.pools[cluster.k8s_target or self.registry.default]
+        vm_name = pool.claim(cluster.cpu_per_instance, cluster.memory_per_instance, instance.instance_name)
+        if vm_name is None:
+            return False
+        instance.k8s_resource_name = vm_name
+        instance.k8s_namespace = pool.namespace
+        instance.status = InstanceStatus.RUNNING
+        logger.info("Instance %s uses pooled VM %s", instance.instance_name, vm_name)
+        return True
+
+
+# Singleton instance
+vm_pools = VMPools(k8s_registry)
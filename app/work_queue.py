@@ -0,0 +1,302 @@
+"""
+Durable queue of Kubernetes operations backed by the operations table.
+
+Routers enqueue operations in the same transaction that changes instance
+state. Workers claim batches with a time-limited lease (using
+SELECT ... FOR UPDATE SKIP LOCKED on PostgreSQL), execute them at a
+controlled rate, and retry failures with exponential backoff. An operation
+whose lease expires, e.g. because its worker died, becomes claimable again.
+A worker renews the lease right before the Kubernetes call and records the
+outcome only while it still holds the lease, so a worker that lost an
+operation to another one neither repeats the call nor overwrites the result.
+"""
+import logging
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.cache import cache, cluster_key, instance_status_key
+from app.config import settings
+from app.database import SessionLocal
+from app.k8s_service import k8s_registry
+from app.models import (
+    Cluster, Instance, InstanceStatus, Operation, OperationKind, OperationStatus
+)
+from app.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_operation(db: Session, kind: OperationKind, cluster: Cluster,
+                      instance: Optional[Instance] = None,
+                      target_status: Optional[InstanceStatus] = None) -> Operation:
+    """
+    Add an operation to the session without committing.
+    The instance is marked PENDING until a worker applies target_status, and
+    its current status is restored if the operation ultimately fails. Its
+    cached status is dropped, so reads do not keep serving the old one.
+    """
+    operation = Operation(
+        kind=kind,
+        status=OperationStatus.QUEUED,
+        cluster_id=cluster.id,
+        k8s_target=cluster.k8s_target,
+        namespace=cluster.namespace,
+        instance_type=cluster.instance_type,
+        cpu=cluster.cpu_per_instance,
+        memory=cluster.memory_per_instance,
+        target_status=target_status,
+        attempts=0,
+        max_attempts=settings.WORK_QUEUE_MAX_ATTEMPTS,
+        available_at=datetime.utcnow(),
+    )
+    if instance is not None:
+        operation.instance_id = instance.id
+        operation.instance_name = instance.resource_name
+        operation.namespace = instance.resource_namespace
+        operation.previous_status = instance.status
+        if target_status is not None:
+            instance.status = InstanceStatus.PENDING
+        cache.delete(instance_status_key(instance.id))
+    db.add(operation)
+    return operation
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(Operation.status == OperationStatus.QUEUED, Operation.available_at <= now),
+        and_(Operation.status == OperationStatus.RUNNING, Operation.lease_expires_at <= now),
+    )
+
+
+def claim_operations(db: Session, worker_id: str, limit: int) -> List[Operation]:
+    """Lease up to limit due operations to worker_id"""
+    now = datetime.utcnow()
+    candidates = db.query(Operation.id).filter(
+        _claimable(now)
+    ).order_by(
+        Operation.available_at, Operation.id
+    ).limit(limit).with_for_update(skip_locked=True).all()
+
+    lease_expires_at = now + timedelta(seconds=settings.WORK_QUEUE_LEASE_SECONDS)
+    claimed = []
+    for (operation_id,) in candidates:
+        # The guarded update keeps claims exclusive on databases without SKIP LOCKED
+        updated = db.query(Operation).filter(
+            Operation.id == operation_id, _claimable(now)
+        ).update({
+            Operation.status: OperationStatus.RUNNING,
+            Operation.lease_owner: worker_id,
+            Operation.lease_expires_at: lease_expires_at,
+            Operation.attempts: Operation.attempts + 1,
+        }, synchronize_session=False)
+        if updated:
+            claimed.append(operation_id)
+    db.commit()
+
+    if not claimed:
+        return []
+    return db.query(Operation).filter(Operation.id.in_(claimed)).order_by(Operation.id).all()
+
+
+def run_operation(operation: Operation) -> bool:
+    """Issue the Kubernetes call for an operation"""
+    k8s = k8s_registry.get(operation.k8s_target)
+    if operation.kind == OperationKind.CREATE_INSTANCE:
+        return k8s.create_instance(
+            instance_name=operation.instance_name,
+            cpu=operation.cpu,
+            memory=operation.memory,
+            instance_type=operation.instance_type,
+            namespace=operation.namespace
+        )
+    if operation.kind == OperationKind.DELETE_INSTANCE:
+        return k8s.delete_instance(
+            instance_name=operation.instance_name,
+            instance_type=operation.instance_type,
+            namespace=operation.namespace
+        )
+    if operation.kind == OperationKind.START_INSTANCE:
+        return k8s.start_instance(
+            instance_name=operation.instance_name,
+            instance_type=operation.instance_type,
+            namespace=operation.namespace
+        )
+    if operation.kind == OperationKind.STOP_INSTANCE:
+        return k8s.stop_instance(
+            instance_name=operation.instance_name,
+            instance_type=operation.instance_type,
+            namespace=operation.namespace
+        )
+    if operation.kind == OperationKind.DELETE_NAMESPACE:
+        return k8s.delete_namespace(operation.namespace)
+    raise ValueError(f"Unknown operation kind '{operation.kind}'")
+
+
+def renew_lease(db: Session, operation: Operation, worker_id: str) -> bool:
+    """Extend the lease before running an operation; False if another worker has claimed it since"""
+    lease_expires_at = datetime.utcnow() + timedelta(seconds=settings.WORK_QUEUE_LEASE_SECONDS)
+    updated = db.query(Operation).filter(
+        Operation.id == operation.id,
+        Operation.status == OperationStatus.RUNNING,
+        Operation.lease_owner == worker_id
+    ).update({Operation.lease_expires_at: lease_expires_at}, synchronize_session=False)
+    db.commit()
+    return bool(updated)
+
+
+def complete_operation(db: Session, operation: Operation, worker_id: str, success: bool,
+                       error: Optional[str] = None) -> bool:
+    """
+    Record the outcome of an attempt and update the instance it targets.
+    Returns False, recording nothing, when worker_id no longer holds the lease.
+    """
+    changes = {Operation.lease_owner: None, Operation.lease_expires_at: None}
+    instance_status = None
+
+    if success:
+        status = OperationStatus.SUCCEEDED
+        changes[Operation.last_error] = None
+        instance_status = operation.target_status
+    elif operation.attempts < operation.max_attempts:
+        backoff = settings.WORK_QUEUE_RETRY_BASE_SECONDS * (2 ** (operation.attempts - 1))
+        status = OperationStatus.QUEUED
+        changes[Operation.available_at] = datetime.utcnow() + timedelta(seconds=backoff)
+        changes[Operation.last_error] = error
+    else:
+        status = OperationStatus.FAILED
+        changes[Operation.last_error] = error
+        if operation.target_status is not None:
+            if operation.kind == OperationKind.CREATE_INSTANCE:
+                instance_status = InstanceStatus.FAILED
+            else:
+                instance_status = operation.previous_status
+    changes[Operation.status] = status
+
+    # Guarded on the lease, so a worker whose lease expired cannot overwrite a newer outcome
+    updated = db.query(Operation).filter(
+        Operation.id == operation.id,
+        Operation.lease_owner == worker_id
+    ).update(changes, synchronize_session=False)
+    if not updated:
+        db.rollback()
+        logger.warning("Dropping the outcome of operation %s (%s %s), its lease was taken over",
+                       operation.id, operation.kind.value, operation.instance_name)
+        return False
+
+    instance = db.get(Instance, operation.instance_id) if operation.instance_id else None
+    if instance is not None and instance_status is not None:
+        instance.status = instance_status
+    if status == OperationStatus.QUEUED:
+        logger.warning("Operation %s (%s %s) failed, retrying in %ss",
+                       operation.id, operation.kind.value, operation.instance_name, backoff)
+    elif status == OperationStatus.FAILED:
+        logger.error("Operation %s (%s %s) failed after %s attempts",
+                     operation.id, operation.kind.value, operation.instance_name, operation.attempts)
+    # Plain values, the operation's attributes expire at commit
+    cluster_id = instance.cluster_id if instance is not None else None
+    instance_id = instance.id if instance is not None else None
+
+    db.commit()
+    if cluster_id is not None and status != OperationStatus.QUEUED:
+        cache.delete(cluster_key(cluster_id), instance_status_key(instance_id))
+    return True
+
+
+class RateLimiter:
+    """Token bucket shared by the threads of one process"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = 1.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop: threading.Event):
+        while not stop.is_set():
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(max(self.rate, 1.0), self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = (1.0 - self._tokens) / self.rate
+            stop.wait(wait)
+        return False
+
+
+class WorkerPool:
+    """Threads that drain the operation queue"""
+
+    def __init__(self, size: int = None, rate: float = None):
+        self.size = size if size is not None else settings.WORK_QUEUE_WORKERS
+        self.limiter = RateLimiter(rate if rate is not None else settings.WORK_QUEUE_RATE)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._prefix = f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+
+    def start(self):
+        self._stop.clear()
+        for i in range(self.size):
+            thread = threading.Thread(
+                target=self._run, args=(f"{self._prefix}-{i}",),
+                name=f"queue-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Started %s queue workers at %s operations/s", self.size, self.limiter.rate)
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self, worker_id: str):
+        while not self._stop.is_set():
+            try:
+                processed = self.process_batch(worker_id)
+            except Exception:
+                logger.exception("Queue worker %s failed to process a batch", worker_id)
+                processed = 0
+            if not processed:
+                self._stop.wait(settings.WORK_QUEUE_POLL_SECONDS)
+
+    def process_batch(self, worker_id: str) -> int:
+        """Claim and execute one batch, returning the number of operations handled"""
+        db = SessionLocal()
+        try:
+            operations = claim_operations(db, worker_id, settings.WORK_QUEUE_BATCH_SIZE)
+            for operation in operations:
+                if not self.limiter.acquire(self._stop):
+                    # Shutting down: leave the rest for another worker once the lease expires
+                    break
+                if not renew_lease(db, operation, worker_id):
+                    # The lease ran out while waiting for the limiter and another worker took over
+                    continue
+                with start_span("queue.operation", {
+                    "operation.id": operation.id,
+                    "operation.kind": operation.kind,
+                    "operation.attempt": operation.attempts,
+                }):
+                    try:
+                        success, error = run_operation(operation), None
+                    except Exception as e:
+                        success, error = False, str(e)
+                    if not success and error is None:
+                        error = "Kubernetes API call failed"
+                    complete_operation(db, operation, worker_id, success, error)
+            return len(operations)
+        finally:
+            db.close()
+
+
+# Singleton instance
+worker_pool = WorkerPool()
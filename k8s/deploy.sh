@@ -81,6 +81,11 @@ echo ""
 echo -e "${YELLOW}Waiting for PostgreSQL to be ready...${NC}"
 kubectl wait --for=condition=ready pod -l app=postgres -n $NAMESPACE --timeout=120s
 
+echo ""
+echo -e "${YELLOW}Deploying Redis cache...${NC}"
+kubectl apply -f redis-deployment.yaml
+kubectl apply -f redis-service.yaml
+
 echo ""
 echo -e "${YELLOW}Step 5: Deploying API...${NC}"
 kubectl apply -f api-deployment.yaml
@@ -1,19 +1,37 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import logging
-import sys
-from app.database import init_db
-from app.routers import clusters, instances, users
+from app.database import init_db, engine
+from app.cache import cache
+from app.compression import CompressionMiddleware
+from app.config import DEFAULT_TOKEN_HASH_KEY, settings
+from app.serialization import FastJSONResponse
+from app.work_queue import worker_pool
+from app.capacity import capacity_monitor
+from app.namespace_pool import namespace_pools
+from app.vm_pool import vm_pools
+from app.usage import usage_aggregator
+from app.fleet import backfill_counters
+from app.schedules import schedule_runner
+from app.live_usage import live_usage
+from app.replicas import replica_router
+from app.admission import AdmissionMiddleware, admission
+from app.health import readiness
+from app.routers import clusters, fleet, instances, schedules, users
+from app.logging_config import configure_logging, shutdown_logging
+from app.tracing import setup_tracing, shutdown_tracing, instrument_engine, server_span
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+configure_logging()
+
+# Configure tracing before any request or query is served
+if setup_tracing():
+    instrument_engine(engine)
+    for replica in replica_router.replicas:
+        instrument_engine(replica.engine)
 
 logger = logging.getLogger(__name__)
 
@@ -23,9 +41,36 @@ app = FastAPI(
     description="API for managing VM and container clusters with multi-tenancy and quota management",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse
 )
 
+# Middleware added later wraps what was added before. From the outside in:
+# tracing, CORS, admission, compression, read-your-writes. Tracing spans the
+# admission queue wait, and 429s from admission still carry CORS headers.
+
+
+@app.middleware("http")
+async def read_your_writes_middleware(request: Request, call_next):
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        # The caller's next reads go to the primary until replicas have caught up
+        replica_router.mark_write(request)
+    return response
+
+
+# Compress large responses with brotli or gzip, as negotiated with the client
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
+# Queue expensive operations fairly per tenant, shedding load with 429
+app.add_middleware(AdmissionMiddleware, admission=admission)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,10 +81,23 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def tracing_middleware(request: Request, call_next):
+    route_name = f"{request.method} {request.url.path}"
+    with server_span(route_name, request.headers, {
+        "http.method": request.method,
+        "http.target": request.url.path,
+    }) as span:
+        response = await call_next(request)
+        if span is not None:
+            span.set_attribute("http.status_code", response.status_code)
+        return response
+
+
 # Exception handlers
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unhandled exception: {exc}", exc_info=True)
+    logger.error("Unhandled exception: %s", exc, exc_info=True)
     return JSONResponse(
         status_code=500,
         content={"message": "Internal server error", "detail": str(exc)}
@@ -50,9 +108,39 @@ async def general_exception_handler(request: Request, exc: Exception):
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting Cloud Management Platform API...")
+    if settings.TOKEN_HASH_KEY == DEFAULT_TOKEN_HASH_KEY:
+        logger.warning("TOKEN_HASH_KEY is the default value; set a secret key before storing real tokens")
     # Initialize database
     init_db()
+    backfill_counters()
     logger.info("Database initialized")
+    if settings.WORK_QUEUE_ENABLED and settings.WORK_QUEUE_WORKERS > 0:
+        worker_pool.start()
+    capacity_monitor.start()
+    namespace_pools.start()
+    vm_pools.start()
+    usage_aggregator.start()
+    if settings.SCHEDULER_ENABLED:
+        schedule_runner.start()
+    if settings.METRICS_POLL_ENABLED:
+        live_usage.start()
+    replica_router.start()
+
+
+# Shutdown event
+@app.on_event("shutdown")
+async def shutdown_event():
+    worker_pool.stop()
+    capacity_monitor.stop()
+    namespace_pools.stop()
+    vm_pools.stop()
+    usage_aggregator.stop()
+    schedule_runner.stop()
+    live_usage.stop()
+    replica_router.stop()
+    cache.close()
+    shutdown_tracing()
+    shutdown_logging()
 
 
 # Health check endpoint
@@ -65,18 +153,36 @@ async def root():
     }
 
 
+@app.get("/health/live", tags=["health"])
+async def liveness_check():
+    """Liveness: the process is serving requests. Dependencies are not checked."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["health"])
+async def readiness_check():
+    """Readiness: the database is reachable; unreachable Kubernetes APIs report degraded (results cached briefly)"""
+    report = await run_in_threadpool(readiness)
+    status_code = 503 if report["status"] == "not_ready" else 200
+    return JSONResponse(status_code=status_code, content=report)
+
+
 @app.get("/health", tags=["health"])
 async def health_check():
-    return {
-        "status": "healthy",
-        "database": "connected"
-    }
+    return await readiness_check()
+
+
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 # Include routers
 app.include_router(users.router, prefix="/api/v1")
 app.include_router(clusters.router, prefix="/api/v1")
 app.include_router(instances.router, prefix="/api/v1")
+app.include_router(fleet.router, prefix="/api/v1")
+app.include_router(schedules.router, prefix="/api/v1")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Token authentication benchmark
+Measures the per-request cost of resolving a bearer token to a user: the old
+plaintext equality lookup, the keyed digest + indexed prefix lookup used by
+get_current_user, and a slow password hash (PBKDF2) for contrast
+"""
+import argparse
+import hashlib
+import secrets
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import find_user_by_token
+from app.models import Base, User
+from app.tokens import hash_token
+
+
+def timed(label, func, tokens):
+    func(tokens[0])  # Warm up
+    start = time.perf_counter()
+    for token in tokens:
+        assert func(token) is not None
+    elapsed = (time.perf_counter() - start) / len(tokens) * 1e6
+    print(f"{label:<40} {elapsed:>9.1f} us/request")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare token lookup paths")
+    parser.add_argument("--users", type=int, default=10000, help="Users in the table")
+    parser.add_argument("--requests", type=int, default=2000, help="Lookups per path")
+    parser.add_argument("--pbkdf2-iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    tokens = [secrets.token_urlsafe(32) for _ in range(args.users)]
+
+    def seed(hashed):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as session:
+            for i, token in enumerate(tokens):
+                user = User(username=f"user-{i}", quota_cpu=1.0, quota_memory=1.0)
+                if hashed:
+                    user.set_token(token)
+                else:
+                    user.token_hash = token  # How older releases stored tokens
+                session.add(user)
+            session.commit()
+        return Session()
+
+    plain_session = seed(hashed=False)
+    session = seed(hashed=True)
+
+    sample = [secrets.choice(tokens) for _ in range(args.requests)]
+
+    def plaintext(token):
+        return plain_session.query(User).filter(User.token_hash == token).first()
+
+    def keyed_digest(token):
+        return find_user_by_token(session, hash_token(token))
+
+    salt = secrets.token_bytes(16)
+
+    def slow_hash(token):
+        # Only the hash: a salted slow hash cannot be looked up by value at all
+        return hashlib.pbkdf2_hmac("sha256", token.encode(), salt, args.pbkdf2_iterations)
+
+    timed("hash_token only (HMAC-SHA256)", hash_token, sample)
+    base = timed("plaintext equality lookup", plaintext, sample)
+    keyed = timed("HMAC + indexed prefix lookup", keyed_digest, sample)
+    print(f"{'hashing overhead':<40} {keyed - base:>9.1f} us/request")
+    timed(f"PBKDF2 ({args.pbkdf2_iterations} iterations) hash only", slow_hash, sample[:50])
+    session.close()
+    plain_session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Database scalability benchmark
+Grows a scratch database through increasing scales with seed_data.py and,
+at each scale, times every API route through the application (Kubernetes
+calls mocked) and the token lookup on its own. Prints p50/p95 per route and
+scale, and optionally writes them as CSV so regressions show up as curves.
+All tables at DATABASE_URL are dropped first: never point it at real data.
+"""
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+def parse_scales(value: str):
+    """"100:10000,1000:100000" -> [(100, 10000), (1000, 100000)]"""
+    scales = []
+    for item in value.split(","):
+        users, instances = item.split(":")
+        scales.append((int(users), int(instances)))
+    return scales
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2], ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time API routes against growing databases")
+    parser.add_argument("--scales", type=parse_scales, default=parse_scales("100:10000,1000:100000"),
+                        help="Cumulative users:instances per step, e.g. 100:10000,10000:1000000")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route and scale")
+    parser.add_argument("--clusters-per-user", type=float, default=3.0)
+    parser.add_argument("--cache", action="store_true",
+                        help="Keep the shared cache on; by default every read reaches the database")
+    parser.add_argument("--csv", help="Also write results to this CSV file")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure them before importing the app
+    if not args.cache:
+        os.environ["CACHE_TTL_SECONDS"] = "0"
+        os.environ["CACHE_LOCAL_TTL_SECONDS"] = "0"
+    # Mocked Kubernetes calls make some operations log errors that are expected here
+    os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import text
+
+    import main as api
+    from app.auth import find_user_by_token
+    from app.capacity import capacity_monitor
+    from app.database import SessionLocal, engine
+    from app.k8s_service import KubernetesService, k8s_registry
+    from app.models import Base
+    from app.tokens import hash_token
+    from seed_data import seed, seed_token
+
+    capacity_monitor.start = lambda: None
+    api.usage_aggregator.start = lambda: None
+    for service in k8s_registry.services():
+        service.core_api = mock.MagicMock()
+        service.custom_api = mock.MagicMock()
+        service.apps_api = mock.MagicMock()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    results = []
+    users = instances = 0
+
+    with TestClient(api.app) as client, \
+            mock.patch.object(KubernetesService, "get_instance_status", return_value=None):
+        for scale_users, scale_instances in args.scales:
+            start = time.perf_counter()
+            seed(engine, scale_users - users, scale_instances - instances, args.clusters_per_user, rng=rng)
+            seeded = time.perf_counter() - start
+            users, instances = scale_users, scale_instances
+
+            with engine.connect() as conn:
+                clusters = conn.execute(text(
+                    "SELECT id, owner_id FROM clusters ORDER BY random() LIMIT :n"
+                ), {"n": args.requests}).all()
+                instance_rows = conn.execute(text(
+                    "SELECT instances.id, clusters.owner_id FROM instances "
+                    "JOIN clusters ON clusters.id = instances.cluster_id ORDER BY random() LIMIT :n"
+                ), {"n": args.requests}).all()
+
+            def headers(owner_id):
+                return {"Authorization": f"Bearer {seed_token(owner_id)}"}
+
+            def owner():
+                return rng.choice(clusters)[1]
+
+            db = SessionLocal()
+            created = iter(range(args.requests))
+
+            def write_cycle():
+                """Create, scale, suspend, resume and delete one cluster; returns per-step durations"""
+                owner_id = owner()
+                steps = {}
+
+                def step(name, method, url, **kwargs):
+                    began = time.perf_counter()
+                    response = client.request(method, url, headers=headers(owner_id), **kwargs)
+                    steps[name] = time.perf_counter() - began
+                    assert response.status_code < 400, (name, response.status_code, response.text)
+                    return response
+
+                cluster_id = step("POST /clusters/", "POST", "/api/v1/clusters/", json={
+                    "name": f"bench-{scale_instances}-{next(created)}", "instance_type": "container",
+                    "cpu_per_instance": 0.5, "memory_per_instance": 1.0, "instance_count": 2,
+                }).json()["id"]
+                step("PATCH /clusters/{id}", "PATCH", f"/api/v1/clusters/{cluster_id}", json={"instance_count": 3})
+                step("POST /clusters/{id}/suspend", "POST", f"/api/v1/clusters/{cluster_id}/suspend")
+                step("POST /clusters/{id}/resume", "POST", f"/api/v1/clusters/{cluster_id}/resume")
+                step("DELETE /clusters/{id}", "DELETE", f"/api/v1/clusters/{cluster_id}")
+                return steps
+
+            reads = {
+                "auth lookup": lambda: find_user_by_token(db, hash_token(seed_token(owner()))),
+                "GET /users/me": lambda: client.get("/api/v1/users/me", headers=headers(owner())),
+                "GET /users/me/quota": lambda: client.get("/api/v1/users/me/quota", headers=headers(owner())),
+                "GET /users/me/usage": lambda: client.get("/api/v1/users/me/usage", headers=headers(owner())),
+                "GET /users/": lambda: client.get("/api/v1/users/"),
+                "GET /clusters/": lambda: client.get("/api/v1/clusters/", headers=headers(owner())),
+                "GET /clusters/{id}": lambda: (lambda c: client.get(
+                    f"/api/v1/clusters/{c[0]}", headers=headers(c[1])))(rng.choice(clusters)),
+                "GET /instances/{id}": lambda: (lambda i: client.get(
+                    f"/api/v1/instances/{i[0]}", headers=headers(i[1])))(rng.choice(instance_rows)),
+                "GET /fleet/summary": lambda: client.get("/api/v1/fleet/summary"),
+            }
+            timings = {}
+            for name, call in reads.items():
+                call()  # Warm up
+                samples = []
+                for _ in range(args.requests):
+                    began = time.perf_counter()
+                    result = call()
+                    samples.append(time.perf_counter() - began)
+                    assert getattr(result, "status_code", 200) < 400, (name, result.status_code, result.text)
+                timings[name] = samples
+            for _ in range(args.requests):
+                for name, duration in write_cycle().items():
+                    timings.setdefault(name, []).append(duration)
+            db.close()
+
+            print(f"\n{scale_users} users, {scale_instances} instances (seeded in {seeded:.1f}s)")
+            print(f"{'route':<32} {'p50 ms':>9} {'p95 ms':>9}")
+            for name, samples in timings.items():
+                p50, p95 = percentiles(samples)
+                print(f"{name:<32} {p50 * 1000:>9.2f} {p95 * 1000:>9.2f}")
+                results.append({
+                    "users": scale_users, "instances": scale_instances, "route": name,
+                    "p50_ms": round(p50 * 1000, 3), "p95_ms": round(p95 * 1000, 3),
+                    "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+                })
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as output:
+            writer = csv.DictWriter(output, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"\nWrote {len(results)} rows to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Logging overhead benchmark
+Simulates the per-instance log lines of a cluster suspend request and reports
+the logging cost per request for several handler configurations
+"""
+import argparse
+import io
+import logging
+import queue
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.logging_config import (
+    JsonFormatter, NonBlockingQueueHandler, RateLimitFilter, TEXT_FORMAT
+)
+from app.tracing import TraceContextFilter
+from logging.handlers import QueueListener
+
+
+class NullStream(io.TextIOBase):
+    def write(self, data):
+        return len(data)
+
+
+def simulate_request(logger, instances, eager, level=logging.INFO):
+    """One suspend request: a skipped-instance line per instance plus a summary"""
+    for i in range(instances):
+        if eager:
+            logger.log(level, f"Skipped instance cluster-instance-{i} with status stopped")
+        else:
+            logger.log(level, "Skipped instance %s with status %s", f"cluster-instance-{i}", "stopped")
+    logger.info("Cluster '%s' suspend operation completed: %s suspended, %s failed, %s skipped",
+                "cluster", 0, 0, instances)
+
+
+def build_logger(mode):
+    """Return (logger, cleanup) for a benchmark mode"""
+    logger = logging.getLogger(f"bench.{mode}")
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    listener = None
+
+    if mode == "sync-text":
+        handler = logging.StreamHandler(NullStream())
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logger.addHandler(handler)
+    else:
+        output = logging.StreamHandler(NullStream())
+        output.setFormatter(JsonFormatter() if mode != "queue-text" else logging.Formatter(TEXT_FORMAT))
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=100000))
+        handler.addFilter(TraceContextFilter())
+        if mode == "queue-json-ratelimited":
+            handler.addFilter(RateLimitFilter("bench", per_second=50.0))
+        logger.addHandler(handler)
+        listener = QueueListener(handler.queue, output)
+        listener.start()
+
+    def cleanup():
+        if listener is not None:
+            listener.stop()
+        logger.handlers.clear()
+
+    return logger, cleanup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure logging overhead per request")
+    parser.add_argument("--instances", type=int, default=500, help="Instances per simulated request")
+    parser.add_argument("--requests", type=int, default=50, help="Simulated requests per mode")
+    args = parser.parse_args()
+
+    modes = [
+        ("sync-text", True, logging.INFO),
+        ("queue-text", False, logging.INFO),
+        ("queue-json", False, logging.INFO),
+        ("queue-json-ratelimited", False, logging.INFO),
+        # The routers log skipped instances at DEBUG, which is below the default level
+        ("queue-json-debug-skips", False, logging.DEBUG),
+    ]
+    print(f"{args.requests} requests x {args.instances} instances")
+    # Thread CPU time is the cost paid by the request thread; wall time also
+    # includes the listener thread competing for the GIL
+    print(f"{'mode':<26} {'request thread':>16} {'per record':>12} {'wall':>12}")
+    for mode, eager, level in modes:
+        logger, cleanup = build_logger(mode)
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        for _ in range(args.requests):
+            simulate_request(logger, args.instances, eager, level)
+        cpu = time.thread_time() - start_cpu
+        cleanup()
+        wall = time.perf_counter() - start_wall
+        per_request = cpu / args.requests * 1000
+        per_record = cpu / (args.requests * (args.instances + 1)) * 1e6
+        print(f"{mode:<26} {per_request:>13.3f} ms {per_record:>9.2f} us "
+              f"{wall / args.requests * 1000:>9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark
+Compares the default FastAPI path (ORM objects validated through pydantic
+from_attributes, rendered with json) against the column-tuple + orjson fast
+path used by the list and detail routes
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Cluster, Instance, InstanceStatus, InstanceType, User
+from app.schemas import ClusterDetail, ClusterResponse
+from app.serialization import FastJSONResponse, cluster_serializer, instance_serializer
+
+
+def seed(session, clusters, instances_per_cluster):
+    user = User(username="bench", quota_cpu=1e9, quota_memory=1e9)
+    user.set_token("bench")
+    session.add(user)
+    session.flush()
+    now = datetime.utcnow()
+    session.bulk_insert_mappings(Cluster, [
+        {
+            "name": f"cluster-{i}", "namespace": f"cluster-{i}-ns",
+            "instance_type": InstanceType.CONTAINER, "cpu_per_instance": 1.0,
+            "memory_per_instance": 2.0, "instance_count": instances_per_cluster,
+            "next_instance_index": instances_per_cluster, "owner_id": user.id, "created_at": now,
+        }
+        for i in range(clusters)
+    ])
+    session.bulk_insert_mappings(Instance, [
+        {
+            "cluster_id": 1, "instance_name": f"cluster-0-instance-{i}",
+            "status": InstanceStatus.RUNNING, "k8s_resource_name": f"cluster-0-instance-{i}",
+            "created_at": now, "updated_at": now,
+        }
+        for i in range(instances_per_cluster)
+    ])
+    session.commit()
+    return user.id
+
+
+def timed(label, func, repeat):
+    func()  # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        size = len(func())
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"{label:<40} {elapsed:>9.2f} ms  {size:>10} bytes")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response serialization paths")
+    parser.add_argument("--clusters", type=int, default=5000, help="Clusters in the list view")
+    parser.add_argument("--instances", type=int, default=1000, help="Instances in the detail view")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        owner_id = seed(session, args.clusters, args.instances)
+
+    list_adapter = TypeAdapter(List[ClusterResponse])
+    detail_adapter = TypeAdapter(ClusterDetail)
+
+    def list_default():
+        with Session() as session:
+            clusters = session.query(Cluster).filter(Cluster.owner_id == owner_id).all()
+            validated = list_adapter.validate_python(clusters, from_attributes=True)
+            return json.dumps(list_adapter.dump_python(validated, mode="json")).encode()
+
+    def list_fast():
+        with Session() as session:
+            rows = session.query(*cluster_serializer.columns).filter(Cluster.owner_id == owner_id).all()
+            return FastJSONResponse(cluster_serializer.many(rows)).body
+
+    def detail_default():
+        with Session() as session:
+            cluster = session.query(Cluster).filter(Cluster.id == 1).first()
+            validated = detail_adapter.validate_python(cluster, from_attributes=True)
+            return json.dumps(detail_adapter.dump_python(validated, mode="json")).encode()
+
+    def detail_fast():
+        with Session() as session:
+            detail = cluster_serializer.one(
+                session.query(*cluster_serializer.columns).filter(Cluster.id == 1).first()
+            )
+            rows = session.query(*instance_serializer.columns).filter(
+                Instance.cluster_id == 1
+            ).order_by(Instance.id).all()
+            detail["instances"] = instance_serializer.many(rows)
+            return FastJSONResponse(detail).body
+
+    assert json.loads(list_default()) == json.loads(list_fast())
+    assert json.loads(detail_default()) == json.loads(detail_fast())
+
+    print(f"list: {args.clusters} clusters, detail: {args.instances} instances")
+    slow = timed("list_clusters (ORM + pydantic + json)", list_default, args.repeat)
+    fast = timed("list_clusters (rows + orjson)", list_fast, args.repeat)
+    print(f"{'speedup':<40} {slow / fast:>9.1f}x")
+    slow = timed("get_cluster (ORM + pydantic + json)", detail_default, args.repeat)
+    fast = timed("get_cluster (rows + orjson)", detail_fast, args.repeat)
+    print(f"{'speedup':<40} {slow / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
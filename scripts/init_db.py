@@ -26,12 +26,12 @@ def create_admin_user():
         # Create admin user
         admin_user = User(
             username="admin",
-            token="admin-token-change-me",
             quota_cpu=100.0,
             quota_memory=500.0,
             used_cpu=0.0,
             used_memory=0.0
         )
+        admin_user.set_token("admin-token-change-me")
         db.add(admin_user)
         db.commit()
         print("✓ Admin user created successfully")
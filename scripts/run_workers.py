@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Operation queue worker script
+Runs queue workers without the API, so workers can be scaled independently
+of API replicas. Pair with WORK_QUEUE_ENABLED=true and WORK_QUEUE_WORKERS=0 on the API.
+"""
+import argparse
+import signal
+import sys
+import threading
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.database import init_db
+from app.logging_config import configure_logging, shutdown_logging
+from app.work_queue import WorkerPool
+from app import usage  # noqa: F401  Records usage events for the status changes workers make
+from app import fleet  # noqa: F401  Keeps the fleet counters current for the same changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain the Kubernetes operation queue")
+    parser.add_argument("--workers", type=int, default=max(settings.WORK_QUEUE_WORKERS, 1),
+                        help="Number of worker threads")
+    parser.add_argument("--rate", type=float, default=settings.WORK_QUEUE_RATE,
+                        help="Maximum operations per second for this process")
+    args = parser.parse_args()
+
+    configure_logging()
+    init_db()
+
+    pool = WorkerPool(size=args.workers, rate=args.rate)
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+
+    pool.start()
+    stopped.wait()
+    pool.stop()
+    shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
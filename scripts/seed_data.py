@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator
+Bulk-inserts users, clusters and instances into DATABASE_URL (SQLite or
+PostgreSQL) so slowdowns at scale can be reproduced. Cluster counts per user
+and instance counts per cluster are skewed like a real fleet: most tenants are
+small, a few are very large. Rows are appended after the existing ids, and
+every user's token is seed-token-<user id>.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import func, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import engine, init_db
+from app.fleet import rebuild_counters
+from app.models import Cluster, Instance, InstanceStatus, InstanceType, User
+from app.tokens import hash_token, token_prefix
+from app.transfer import reset_sequences
+
+# (value, weight) choices
+STATUSES = [
+    (InstanceStatus.RUNNING, 80), (InstanceStatus.STOPPED, 8), (InstanceStatus.SUSPENDED, 8),
+    (InstanceStatus.PENDING, 2), (InstanceStatus.FAILED, 2),
+]
+INSTANCE_TYPES = [(InstanceType.CONTAINER, 70), (InstanceType.VM, 30)]
+SHAPES = [((0.5, 1.0), 30), ((1.0, 2.0), 40), ((2.0, 4.0), 20), ((4.0, 16.0), 10)]
+
+
+def seed_token(user_id: int) -> str:
+    return f"seed-token-{user_id}"
+
+
+def _pick(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _skewed(rng: random.Random, mean: float) -> int:
+    """At least 1, heavy-tailed around mean"""
+    return max(1, round(rng.paretovariate(1.5) * mean / 3))
+
+
+def seed(engine: Engine, users: int, instances: int, clusters_per_user: float = 3.0,
+         batch_size: int = None, rng: random.Random = None, targets=None) -> dict:
+    """Append users and about `instances` instances, returning what was inserted"""
+    rng = rng or random.Random(0)
+    batch_size = batch_size or settings.TRANSFER_BATCH_SIZE
+    targets = targets or [None]
+    per_cluster = max(1.0, instances / max(1.0, users * clusters_per_user))
+    now = datetime.utcnow()
+
+    with Session(engine) as db:
+        user_id = (db.query(func.max(User.id)).scalar() or 0) + 1
+        cluster_id = (db.query(func.max(Cluster.id)).scalar() or 0) + 1
+        instance_id = (db.query(func.max(Instance.id)).scalar() or 0) + 1
+        first_user = user_id
+        user_rows, cluster_rows, instance_rows = [], [], []
+        inserted = {"users": 0, "clusters": 0, "instances": 0}
+
+        def flush():
+            # Parents first, so foreign keys hold on every batch
+            for model, rows, name in ((User, user_rows, "users"), (Cluster, cluster_rows, "clusters"),
+                                      (Instance, instance_rows, "instances")):
+                if rows:
+                    db.execute(insert(model), rows)
+                    inserted[name] += len(rows)
+                    rows.clear()
+            db.commit()
+
+        for _ in range(users):
+            used_cpu = used_memory = 0.0
+            user_clusters = []
+            for _ in range(_skewed(rng, clusters_per_user)):
+                if inserted["instances"] + len(instance_rows) >= instances:
+                    break
+                instance_type = _pick(rng, INSTANCE_TYPES)
+                cpu, memory = _pick(rng, SHAPES)
+                count = min(_skewed(rng, per_cluster), instances - inserted["instances"] - len(instance_rows))
+                created_at = now - timedelta(minutes=rng.randrange(60 * 24 * 365))
+                name = f"seed-{cluster_id}"
+                user_clusters.append({
+                    "id": cluster_id, "name": name, "namespace": f"{name}-ns",
+                    "instance_type": instance_type, "cpu_per_instance": cpu, "memory_per_instance": memory,
+                    "instance_count": count, "next_instance_index": count,
+                    "k8s_target": rng.choice(targets), "owner_id": user_id, "created_at": created_at,
+                })
+                for index in range(count):
+                    instance_rows.append({
+                        "id": instance_id, "cluster_id": cluster_id,
+                        "instance_name": f"{name}-instance-{index}", "status": _pick(rng, STATUSES),
+                        "k8s_resource_name": f"{name}-instance-{index}",
+                        "created_at": created_at, "updated_at": created_at,
+                    })
+                    instance_id += 1
+                used_cpu += cpu * count
+                used_memory += memory * count
+                cluster_id += 1
+            token_hash = hash_token(seed_token(user_id))
+            user_rows.append({
+                "id": user_id, "username": f"seed-user-{user_id}", "token_hash": token_hash,
+                "token_prefix": token_prefix(token_hash),
+                "quota_cpu": max(100.0, used_cpu * 2), "quota_memory": max(400.0, used_memory * 2),
+                "used_cpu": used_cpu, "used_memory": used_memory, "created_at": now,
+            })
+            cluster_rows.extend(user_clusters)
+            user_id += 1
+            if len(instance_rows) >= batch_size or len(user_rows) >= batch_size:
+                flush()
+        flush()
+
+        reset_sequences(db, ("users", "clusters", "instances"))
+        db.commit()
+        rebuild_counters(db)
+    inserted["first_user_id"] = first_user
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-generate users, clusters and instances")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--instances", type=int, default=100000, help="Instances across all users")
+    parser.add_argument("--clusters-per-user", type=float, default=3.0, help="Mean clusters per user")
+    parser.add_argument("--batch-size", type=int, default=settings.TRANSFER_BATCH_SIZE)
+    parser.add_argument("--random-seed", type=int, default=0)
+    args = parser.parse_args()
+
+    init_db()
+    start = time.perf_counter()
+    inserted = seed(engine, args.users, args.instances, args.clusters_per_user,
+                    args.batch_size, random.Random(args.random_seed), list(settings.K8S_TARGETS) or None)
+    elapsed = time.perf_counter() - start
+    print(f"Inserted {inserted['users']} users, {inserted['clusters']} clusters and "
+          f"{inserted['instances']} instances in {elapsed:.1f}s")
+    print(f"Tokens: seed-token-<user id>, starting at seed-token-{inserted['first_user_id']}")
+
+
+if __name__ == "__main__":
+    main()
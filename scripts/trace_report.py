@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Trace report script
+Reads spans written by the file tracing exporter and prints each trace as a
+tree with durations, marking the critical path (the slowest child at each level)
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+
+def parse_time(value):
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def load_spans(path):
+    """Load spans grouped by trace id"""
+    traces = defaultdict(list)
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            span = json.loads(line)
+            span["duration_ms"] = (
+                parse_time(span["end_time"]) - parse_time(span["start_time"])
+            ).total_seconds() * 1000
+            traces[span["context"]["trace_id"]].append(span)
+    return traces
+
+
+def print_tree(span, children, depth, on_critical_path):
+    marker = "*" if on_critical_path else " "
+    attributes = span.get("attributes") or {}
+    detail = ", ".join(
+        f"{key}={value}" for key, value in attributes.items()
+        if key.startswith("arg.") or key == "http.status_code"
+    )
+    print(f"{marker} {'  ' * depth}{span['name']} {span['duration_ms']:.2f}ms"
+          + (f" ({detail})" if detail else ""))
+
+    kids = sorted(children.get(span["context"]["span_id"], []), key=lambda s: s["start_time"])
+    slowest = max(kids, key=lambda s: s["duration_ms"]) if kids else None
+    for child in kids:
+        print_tree(child, children, depth + 1, on_critical_path and child is slowest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize spans from the file tracing exporter")
+    parser.add_argument("path", nargs="?", default="./traces.jsonl", help="Span file to read")
+    parser.add_argument("--name", help="Only show traces whose root span name contains this text")
+    args = parser.parse_args()
+
+    try:
+        traces = load_spans(args.path)
+    except FileNotFoundError:
+        print(f"Span file '{args.path}' not found", file=sys.stderr)
+        return 1
+
+    for trace_id, spans in traces.items():
+        ids = {span["context"]["span_id"] for span in spans}
+        children = defaultdict(list)
+        roots = []
+        for span in spans:
+            parent = span.get("parent_id")
+            if parent and parent in ids:
+                children[parent].append(span)
+            else:
+                roots.append(span)
+
+        for root in roots:
+            if args.name and args.name not in root["name"]:
+                continue
+            print(f"trace {trace_id}")
+            print_tree(root, children, 0, True)
+            print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
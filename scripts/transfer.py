@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Export and import script
+Streams users, clusters and instances to or from an NDJSON file, the same
+format as GET /fleet/export and POST /fleet/import. Importing an export again
+after an interruption resumes after the last committed batch.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.database import engine, init_db
+from app.transfer import Importer, InvalidExport, export_lines
+
+
+def export(args):
+    output = open(args.file, "wb") if args.file != "-" else sys.stdout.buffer
+    try:
+        for line in export_lines(engine, args.batch_size):
+            output.write(line)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+
+def import_(args):
+    init_db()
+    importer = Importer(engine, args.batch_size)
+    source = open(args.file, "rb") if args.file != "-" else sys.stdin.buffer
+    try:
+        # Files iterate line by line, so memory stays constant
+        importer.feed(source)
+        report = importer.finish()
+    except InvalidExport as e:
+        sys.exit(f"Invalid export: {e}")
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import users, clusters and instances as NDJSON")
+    parser.add_argument("--batch-size", type=int, default=settings.TRANSFER_BATCH_SIZE,
+                        help="Rows per cursor fetch or insert batch")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write every row to a file")
+    export_parser.add_argument("file", nargs="?", default="-", help="Output file, - for stdout")
+    export_parser.set_defaults(func=export)
+    import_parser = commands.add_parser("import", help="Load an export into an empty database")
+    import_parser.add_argument("file", help="Export file, - for stdin")
+    import_parser.set_defaults(func=import_)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import Base, Cluster, Instance, InstanceStatus, InstanceType, User
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def cluster(db):
+    """A container cluster with two running instances"""
+    user = User(username="alice", quota_cpu=10, quota_memory=10)
+    user.set_token("alice-token")
+    db.add(user)
+    db.flush()
+    cluster = Cluster(
+        name="c1", namespace="c1-ns", instance_type=InstanceType.CONTAINER,
+        cpu_per_instance=1, memory_per_instance=1, instance_count=2, owner_id=user.id
+    )
+    db.add(cluster)
+    db.flush()
+    db.add_all([
+        Instance(cluster_id=cluster.id, instance_name=f"c1-instance-{i}",
+                 k8s_resource_name=f"c1-instance-{i}", status=InstanceStatus.RUNNING)
+        for i in range(2)
+    ])
+    db.commit()
+    return cluster
+
+
+@pytest.fixture
+def api(engine):
+    """Client for the API routers on the test database, without the app's background workers"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.cache import cache
+    from app.database import SessionLocal, get_db
+    from app.replicas import get_read_db
+    from app.routers import clusters, instances, users
+
+    def get_test_db():
+        # The app's session class, so its flush listeners (instance counters) run
+        db = SessionLocal(bind=engine)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    for module in (users, clusters, instances):
+        app.include_router(module.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_read_db] = get_test_db
+    cache.clear()
+    yield TestClient(app, headers={"Authorization": "Bearer alice-token"})
+    cache.clear()
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from app.admission import FairAdmission, Overloaded
+
+
+def _admission(capacity=1, tenant_capacity=1, target_wait=100.0, cost=1.0):
+    return FairAdmission(capacity, tenant_capacity=tenant_capacity, target_wait=target_wait,
+                         costs={"op": cost})
+
+
+def test_admits_immediately_below_capacity():
+    admission = _admission(capacity=2, tenant_capacity=2)
+
+    async def scenario():
+        await admission.acquire("a", "op")
+        await admission.acquire("a", "op")
+
+    asyncio.run(scenario())
+    assert admission.in_flight == 2
+    admission.release("a", "op", None)
+    admission.release("a", "op", None)
+    assert admission.in_flight == 0
+
+
+def test_queued_tenants_are_served_fairly():
+    admission = _admission()
+    order = []
+
+    async def request(tenant):
+        await admission.acquire(tenant, "op")
+        order.append(tenant)
+
+    async def scenario():
+        await admission.acquire("a", "op")
+        waiting = [asyncio.create_task(request("a")) for _ in range(3)]
+        await asyncio.sleep(0)
+        waiting.append(asyncio.create_task(request("b")))
+        await asyncio.sleep(0)
+        # Each release hands the slot to the waiter with the smallest finish tag
+        for tenant in ["a", "b", "a", "a"]:
+            admission.release(tenant, "op", None)
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiting)
+
+    asyncio.run(scenario())
+    # b arrived after a's backlog but only waits for the operation already running
+    assert order == ["b", "a", "a", "a"]
+
+
+def test_tenant_cap_does_not_block_other_tenants():
+    admission = _admission(capacity=2, tenant_capacity=1)
+
+    async def scenario():
+        await admission.acquire("a", "op")
+        queued = asyncio.create_task(admission.acquire("a", "op"))
+        await asyncio.sleep(0)
+        assert not queued.done()
+        await admission.acquire("b", "op")
+        assert admission.in_flight == 2
+        admission.release("a", "op", None)
+        await queued
+
+    asyncio.run(scenario())
+    assert admission.in_flight == 2
+
+
+def test_sheds_when_expected_wait_exceeds_target():
+    admission = _admission(target_wait=0.5)
+
+    async def scenario():
+        await admission.acquire("a", "op")
+        with pytest.raises(Overloaded) as excinfo:
+            await admission.acquire("b", "op")
+        return excinfo.value
+
+    overloaded = asyncio.run(scenario())
+    assert overloaded.retry_after == 1
+    assert admission._queue == []
+    assert admission.in_flight == 1
+
+
+def test_sheds_after_waiting_the_target():
+    admission = _admission(target_wait=0.05, cost=0.01)
+
+    async def scenario():
+        await admission.acquire("a", "op")
+        with pytest.raises(Overloaded):
+            await admission.acquire("b", "op")
+
+    asyncio.run(scenario())
+    assert admission._queue == []
+    admission.release("a", "op", None)
+    assert admission.in_flight == 0
+
+
+def test_measured_durations_refine_the_estimate():
+    admission = _admission(cost=1.0)
+
+    async def scenario():
+        await admission.acquire("a", "op")
+
+    asyncio.run(scenario())
+    admission.release("a", "op", 3.0)
+    assert admission.service_time("op") == 3.0
+    asyncio.run(scenario())
+    admission.release("a", "op", 8.0)
+    assert admission.service_time("op") == pytest.approx(0.8 * 3.0 + 0.2 * 8.0)
+
+
+def test_shed_requests_keep_cors_headers_inside_the_trace(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    async def shed(tenant, operation):
+        raise Overloaded(retry_after=3)
+
+    monkeypatch.setattr(main.admission, "acquire", shed)
+    response = TestClient(main.app).post(
+        "/api/v1/clusters/", json={},
+        headers={"Authorization": "Bearer alice-token", "Origin": "https://console.example.com"}
+    )
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
+    assert "access-control-allow-origin" in response.headers
+
+    # Outermost first: the server span covers CORS and the admission queue wait
+    stack = [getattr(m.kwargs.get("dispatch"), "__name__", m.cls.__name__) for m in main.app.user_middleware]
+    assert stack.index("tracing_middleware") < stack.index("CORSMiddleware") < stack.index("AdmissionMiddleware")
@@ -0,0 +1,74 @@
+import json
+from unittest import mock
+
+from app.cache import LocalBroker, MemoryCache, RedisCache
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(default_ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=0)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_delete_invalidates_every_cache_on_the_broker():
+    broker = LocalBroker()
+    first = MemoryCache(broker=broker)
+    second = MemoryCache(broker=broker)
+    first.set("cluster:1", {"name": "a"})
+    second.set("cluster:1", {"name": "a"})
+    second.set("cluster:2", {"name": "b"})
+
+    first.delete("cluster:1")
+
+    assert first.get("cluster:1") is None
+    assert second.get("cluster:1") is None
+    assert second.get("cluster:2") == {"name": "b"}
+
+
+def _redis_cache(client):
+    cache = RedisCache(client, channel="invalidate")
+    _, kwargs = client.pubsub.return_value.subscribe.call_args
+    return cache, kwargs["invalidate"]
+
+
+def test_redis_invalidation_from_another_replica_drops_local_copy():
+    client = mock.MagicMock()
+    client.get.return_value = json.dumps({"name": "a"})
+    cache, on_invalidate = _redis_cache(client)
+    assert cache.get("cluster:1") == {"name": "a"}
+
+    client.get.return_value = json.dumps({"name": "b"})
+    assert cache.get("cluster:1") == {"name": "a"}  # Served by the near-cache
+    on_invalidate({"data": json.dumps({"origin": "other", "keys": ["cluster:1"]})})
+    assert cache.get("cluster:1") == {"name": "b"}
+
+
+def test_redis_outage_degrades_to_misses():
+    client = mock.MagicMock()
+    cache, _ = _redis_cache(client)
+    client.get.side_effect = ConnectionError("down")
+    client.set.side_effect = ConnectionError("down")
+    client.delete.side_effect = ConnectionError("down")
+
+    cache.set("auth:token:x", 1)
+    assert cache.get("auth:token:x") is None
+    cache.delete("auth:token:x")
+    assert not cache.available
+
+    client.get.side_effect = None
+    client.get.return_value = json.dumps(1)
+    assert cache.get("auth:token:x") == 1
+    assert cache.available
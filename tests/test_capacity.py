@@ -0,0 +1,104 @@
+from unittest import mock
+
+import pytest
+from kubernetes.client import (
+    V1Container, V1Node, V1NodeSpec, V1NodeStatus, V1ObjectMeta, V1Pod, V1PodSpec, V1ResourceRequirements
+)
+
+from app.capacity import CapacityMonitor, CapacityTracker, InsufficientCapacity
+from app.config import settings
+
+
+def _node(name, cpu, memory_gb):
+    return V1Node(
+        metadata=V1ObjectMeta(name=name),
+        spec=V1NodeSpec(),
+        status=V1NodeStatus(allocatable={"cpu": str(cpu), "memory": f"{memory_gb}Gi"}),
+    )
+
+
+def _pod(uid, namespace, cpu, memory_gb, labels=None, node=None):
+    container = V1Container(
+        name="main", resources=V1ResourceRequirements(requests={"cpu": str(cpu), "memory": f"{memory_gb}Gi"})
+    )
+    return V1Pod(
+        metadata=V1ObjectMeta(uid=uid, namespace=namespace, labels=labels),
+        spec=V1PodSpec(containers=[container], node_name=node),
+    )
+
+
+@pytest.fixture
+def tracker():
+    tracker = CapacityTracker(mock.MagicMock(), reservation_ttl=300, watch_timeout=60)
+    for name in ("node-a", "node-b"):
+        tracker._apply_node("ADDED", _node(name, 4, 8))
+    tracker._synced = {"nodes": True, "pods": True}
+    return tracker
+
+
+@pytest.fixture
+def monitor(tracker, monkeypatch):
+    monkeypatch.setattr(settings, "CAPACITY_ADMISSION_ENABLED", True)
+    monitor = CapacityMonitor(mock.MagicMock(services=lambda: []))
+    monitor.trackers = {"default": tracker}
+    return monitor
+
+
+def test_admission_reserves_until_rejected(monitor, tracker):
+    assert monitor.admit("default", "c1-ns", 3, 2, 4)
+    assert tracker.headroom()["cpu"] == 2
+    with pytest.raises(InsufficientCapacity) as rejected:
+        monitor.admit("default", "c2-ns", 2, 2, 4)
+    assert rejected.value.headroom["cpu"] == 2
+
+
+def test_each_instance_must_fit_on_one_node(monitor):
+    with pytest.raises(InsufficientCapacity):
+        monitor.admit("default", "c1-ns", 1, 6, 1)
+
+
+def test_unsynced_target_admits_without_reserving(monitor, tracker):
+    tracker._synced["pods"] = False
+    assert not monitor.admit("default", "c1-ns", 100, 4, 8)
+
+
+def test_release_returns_reserved_capacity(monitor, tracker):
+    monitor.admit("default", "c1-ns", 2, 2, 4)
+    monitor.release("default", "c1-ns", 2, 2, 4)
+    assert tracker.headroom()["cpu"] == 8
+
+
+def test_only_instance_pods_consume_a_reservation(monitor, tracker):
+    monitor.admit("default", "c1-ns", 1, 2, 4)
+    with tracker._lock:
+        tracker._apply_pod("ADDED", _pod("sidecar", "c1-ns", 2, 4))
+    # The unrelated pod takes room and the reservation still stands
+    assert tracker.headroom()["cpu"] == 4
+
+    with tracker._lock:
+        tracker._apply_pod("ADDED", _pod("instance", "c1-ns", 2, 4, labels={"managed-by": "cmp"}))
+    assert tracker.headroom()["cpu"] == 4
+    with tracker._lock:
+        tracker._apply_pod("DELETED", _pod("sidecar", "c1-ns", 2, 4))
+    assert tracker.headroom()["cpu"] == 6
+
+
+def test_move_reservation_follows_pooled_namespace(monitor, tracker):
+    monitor.admit("default", "c1-ns", 1, 2, 4)
+    monitor.move_reservation("default", "c1-ns", "cmp-pool-1")
+    with tracker._lock:
+        tracker._apply_pod("ADDED", _pod("instance", "cmp-pool-1", 2, 4, labels={"managed-by": "cmp"}))
+    assert tracker.headroom()["cpu"] == 6
+
+
+def test_pooled_instances_keep_their_room_in_the_pool_namespace(monitor, tracker):
+    monitor.admit("default", "c1-ns", 2, 2, 4)
+    monitor.transfer("default", "c1-ns", "cmp-vm-pool", 1, 2, 4)
+    assert tracker.headroom()["cpu"] == 4
+    with tracker._lock:
+        tracker._apply_pod("ADDED", _pod("launcher", "cmp-vm-pool", 2, 4, labels={"managed-by": "cmp"}))
+        tracker._apply_pod("ADDED", _pod("instance", "c1-ns", 2, 4, labels={"managed-by": "cmp"}))
+    assert tracker.headroom()["cpu"] == 4
+    # Never more than what was reserved
+    monitor.transfer("default", "c1-ns", "cmp-vm-pool", 5, 2, 4)
+    assert tracker.headroom()["cpu"] == 4
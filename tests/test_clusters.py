@@ -0,0 +1,188 @@
+import pytest
+
+from app.capacity import InsufficientCapacity, capacity_monitor
+from app.fleet import fleet_summary, rebuild_counters
+from app.k8s_service import k8s_registry
+from app.models import Cluster, Instance, InstanceStatus, InstanceType, User
+from app.placement import placement_scheduler
+from app.vm_pool import vm_pools
+
+
+class FakeKubernetes:
+    def __init__(self):
+        self.failing_namespaces = set()
+        self.failing_instances = set()
+        self.namespaces = []
+        self.calls = []
+
+    def create_namespace(self, name, labels=None):
+        self.namespaces.append(name)
+        return name not in self.failing_namespaces
+
+    def create_instances(self, instance_names, cpu, memory, instance_type, namespace):
+        return {name: True for name in instance_names}
+
+    def delete_instance(self, instance_name, instance_type, namespace):
+        self.calls.append(("delete", namespace, instance_name))
+        return instance_name not in self.failing_instances
+
+    def delete_instances(self, instance_names, instance_type, namespace):
+        return {name: self.delete_instance(name, instance_type, namespace) for name in instance_names}
+
+    def delete_namespace(self, name):
+        self.calls.append(("delete namespace", name))
+        return True
+
+    def stop_instance(self, instance_name, instance_type, namespace):
+        self.calls.append(("stop", namespace, instance_name))
+        return True
+
+
+@pytest.fixture
+def k8s(monkeypatch):
+    k8s = FakeKubernetes()
+    monkeypatch.setattr(k8s_registry, "get", lambda name=None: k8s)
+    monkeypatch.setattr(k8s_registry, "for_cluster", lambda cluster: k8s)
+    monkeypatch.setattr(placement_scheduler, "choose_target", lambda cpu, memory: "default")
+    return k8s
+
+
+@pytest.fixture
+def counted(db, cluster):
+    rebuild_counters(db)
+    return cluster
+
+
+@pytest.fixture
+def pooled(db, counted):
+    """A VM cluster whose first instance runs on a VM from the pool"""
+    counted.instance_type = InstanceType.VM
+    instance = db.query(Instance).filter(Instance.cluster_id == counted.id).order_by(Instance.id).first()
+    instance.k8s_resource_name = "cmp-vm-1"
+    instance.k8s_namespace = "cmp-vm-pool"
+    db.commit()
+    return counted
+
+
+def _bulk(api, *names, cpu=1.0, count=2, instance_type="container"):
+    return api.post("/api/v1/clusters/bulk", json={"clusters": [
+        {"name": name, "instance_type": instance_type, "cpu_per_instance": cpu,
+         "memory_per_instance": 1.0, "instance_count": count}
+        for name in names
+    ]})
+
+
+def _used(db):
+    db.expire_all()
+    user = db.query(User).filter(User.username == "alice").one()
+    return user.used_cpu, user.used_memory
+
+
+def _counted(db):
+    return sum(sum(statuses.values()) for statuses in fleet_summary(db)["totals"].values())
+
+
+def test_bulk_create_reserves_the_batch_quota(api, db, counted, k8s):
+    response = _bulk(api, "a", "b")
+    assert response.status_code == 200
+    assert response.json()["created"] == 2
+    assert _used(db) == (4.0, 4.0)
+    assert db.query(Instance).count() == _counted(db) == 6
+
+
+def test_failed_cluster_gives_its_quota_back(api, db, counted, k8s):
+    k8s.failing_namespaces.add("b-ns")
+    body = _bulk(api, "a", "b").json()
+    assert [result["status"] for result in body["results"]] == ["created", "failed"]
+    assert _used(db) == (2.0, 2.0)
+    assert {name for (name,) in db.query(Cluster.name)} == {"c1", "a"}
+    assert db.query(Instance).count() == _counted(db) == 4
+
+
+def test_rejected_cluster_gives_its_quota_back(api, db, counted, k8s, monkeypatch):
+    def admit(target, namespace, count, cpu, memory):
+        if namespace == "b-ns":
+            raise InsufficientCapacity(target, {"cpu": 0.5, "memory": 8.0})
+        return False
+
+    monkeypatch.setattr(capacity_monitor, "admit", admit)
+    body = _bulk(api, "a", "b").json()
+    assert [result["status"] for result in body["results"]] == ["created", "rejected"]
+    assert body["results"][1]["available"] == {"cpu": 0.5, "memory": 8.0}
+    assert _used(db) == (2.0, 2.0)
+    assert "b-ns" not in k8s.namespaces
+
+
+def test_batch_over_quota_is_refused_as_a_whole(api, db, counted, k8s):
+    response = _bulk(api, "a", "b", "c", count=4)
+    assert response.status_code == 403
+    assert _used(db) == (0.0, 0.0)
+    assert db.query(Cluster).count() == 1
+    assert k8s.namespaces == []
+
+
+def test_unexpected_error_rolls_the_batch_back(api, db, counted, k8s, monkeypatch):
+    released = []
+    placed = []
+
+    def choose_target(cpu, memory):
+        placed.append(cpu)
+        if len(placed) == 2:
+            raise RuntimeError("placement failed")
+        return "default"
+
+    monkeypatch.setattr(placement_scheduler, "choose_target", choose_target)
+    monkeypatch.setattr(capacity_monitor, "admit", lambda *args: True)
+    monkeypatch.setattr(capacity_monitor, "release", lambda target, namespace, *args: released.append(namespace))
+    with pytest.raises(RuntimeError):
+        _bulk(api, "a", "b")
+    assert _used(db) == (0.0, 0.0)
+    assert released == ["a-ns"]
+    assert db.query(Cluster).count() == 1
+    assert db.query(Instance).count() == _counted(db) == 2
+
+
+def test_pooled_vms_keep_their_capacity_reservation(api, db, counted, k8s, monkeypatch):
+    moved = []
+    released = []
+
+    def claim(cluster, instance):
+        if instance.instance_name.endswith("-0"):
+            instance.k8s_resource_name = "cmp-vm-1"
+            instance.k8s_namespace = "cmp-vm-pool"
+            instance.status = InstanceStatus.RUNNING
+            return True
+        return False
+
+    monkeypatch.setattr(vm_pools, "claim", claim)
+    monkeypatch.setattr(capacity_monitor, "admit", lambda *args: True)
+    monkeypatch.setattr(capacity_monitor, "transfer", lambda *args: moved.append(args))
+    monkeypatch.setattr(capacity_monitor, "release", lambda *args: released.append(args))
+    k8s.create_instances = lambda instance_names, *args, **kwargs: {name: False for name in instance_names}
+    body = _bulk(api, "a", instance_type="vm").json()
+    assert body["results"][0]["instances_failed"] == 1
+    assert moved == [("default", "a-ns", "cmp-vm-pool", 1, 1.0, 1.0)]
+    assert released == [("default", "a-ns", 1, 1.0, 1.0)]
+
+
+def test_delete_removes_pooled_vms_from_the_pool_namespace(api, db, pooled, k8s):
+    assert api.delete(f"/api/v1/clusters/{pooled.id}").status_code == 200
+    assert k8s.calls == [
+        ("delete", "cmp-vm-pool", "cmp-vm-1"),
+        ("delete", "c1-ns", "c1-instance-1"),
+        ("delete namespace", "c1-ns"),
+    ]
+
+
+def test_delete_stops_when_a_pooled_vm_survives(api, db, pooled, k8s):
+    k8s.failing_instances.add("cmp-vm-1")
+    response = api.delete(f"/api/v1/clusters/{pooled.id}")
+    assert response.status_code == 500
+    assert "cmp-vm-1" in response.json()["detail"]
+    assert ("delete namespace", "c1-ns") not in k8s.calls
+    assert db.query(Cluster).count() == 1
+
+
+def test_suspend_stops_pooled_vms_in_the_pool_namespace(api, db, pooled, k8s):
+    assert api.post(f"/api/v1/clusters/{pooled.id}/suspend").json()["detail"]["suspended"] == 2
+    assert k8s.calls == [("stop", "cmp-vm-pool", "cmp-vm-1"), ("stop", "c1-ns", "c1-instance-1")]
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+from app.coalescing import ReadBatcher, SingleFlight
+
+
+def _run(count, target):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(i):
+        barrier.wait()
+        results[i] = target(i)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_single_flight_shares_one_call():
+    calls, shared = [], []
+    flight = SingleFlight(on_shared=lambda: shared.append(1))
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    assert _run(8, lambda i: flight.do("key", slow)) == ["value"] * 8
+    assert len(calls) < 8
+    assert len(calls) + len(shared) == 8
+
+
+def test_single_flight_shares_errors_and_forgets_the_key():
+    flight = SingleFlight()
+
+    def failing():
+        raise ConnectionError("refused")
+
+    with pytest.raises(ConnectionError):
+        flight.do("key", failing)
+    assert flight.do("key", lambda: "value") == "value"
+
+
+def test_batcher_merges_concurrent_names():
+    fetches = []
+
+    def fetch(key, names):
+        fetches.append(set(names))
+        time.sleep(0.1)
+        return {name: f"{key}/{name}" for name in names}
+
+    batcher = ReadBatcher(window=0.02, fetch=fetch)
+    results = _run(10, lambda i: batcher.get("c1-ns", f"c1-instance-{i}"))
+    assert results == [f"c1-ns/c1-instance-{i}" for i in range(10)]
+    assert len(fetches) < 10
+    assert set().union(*fetches) == {f"c1-instance-{i}" for i in range(10)}
+
+
+def test_name_in_flight_waits_for_that_fetch():
+    started, release, fetches = threading.Event(), threading.Event(), []
+
+    def fetch(key, names):
+        fetches.append(set(names))
+        started.set()
+        release.wait(5)
+        return {name: "running" for name in names}
+
+    batcher = ReadBatcher(window=0, fetch=fetch)
+    first = threading.Thread(target=batcher.get, args=("c1-ns", "c1-instance-0"))
+    first.start()
+    started.wait(5)
+    results = []
+    second = threading.Thread(target=lambda: results.append(batcher.get("c1-ns", "c1-instance-0")))
+    second.start()
+    time.sleep(0.05)
+    release.set()
+    first.join()
+    second.join()
+    assert results == ["running"]
+    assert fetches == [{"c1-instance-0"}]
+
+
+def test_batcher_missing_names_and_errors():
+    batcher = ReadBatcher(window=0, fetch=lambda key, names: {})
+    assert batcher.get("c1-ns", "c1-instance-0") is None
+
+    def failing(key, names):
+        raise ConnectionError("refused")
+
+    with pytest.raises(ConnectionError):
+        ReadBatcher(window=0, fetch=failing).get("c1-ns", "c1-instance-0")
+
+
+def test_uncontended_read_does_not_wait_the_window():
+    batcher = ReadBatcher(window=5, fetch=lambda key, names: {name: "running" for name in names})
+    started = time.monotonic()
+    assert batcher.get("c1-ns", "c1-instance-0") == "running"
+    assert time.monotonic() - started < 1
+
+
+def test_reads_behind_a_fetch_in_flight_are_batched_until_it_finishes():
+    release, fetches = threading.Event(), []
+
+    def fetch(key, names):
+        fetches.append(set(names))
+        if len(fetches) == 1:
+            release.wait(5)
+        return {name: "running" for name in names}
+
+    batcher = ReadBatcher(window=5, fetch=fetch)
+    threads = [threading.Thread(target=batcher.get, args=("c1-ns", "c1-instance-0"))]
+    threads[0].start()
+    while not fetches:
+        time.sleep(0.001)
+    for i in (1, 2):
+        threads.append(threading.Thread(target=batcher.get, args=("c1-ns", f"c1-instance-{i}")))
+        threads[-1].start()
+    while "c1-ns" not in batcher._open or len(batcher._open["c1-ns"].names) < 2:
+        time.sleep(0.001)
+    started = time.monotonic()
+    release.set()
+    for thread in threads:
+        thread.join()
+    # The open batch is fetched once the first fetch is done, not after the window
+    assert time.monotonic() - started < 1
+    assert fetches == [{"c1-instance-0"}, {"c1-instance-1", "c1-instance-2"}]
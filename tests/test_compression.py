@@ -0,0 +1,83 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.compression import CompressionMiddleware, negotiate
+
+LARGE = "instance " * 500
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("", None),
+    ("*", "br"),
+    ("*;q=0.1, br;q=0", "gzip"),
+    ("GZIP;q=0.8, deflate", "gzip"),
+])
+def test_negotiate(accept_encoding, expected):
+    assert negotiate(accept_encoding, ["br", "gzip"]) == expected
+
+
+def _large(request):
+    return PlainTextResponse(LARGE)
+
+
+def _small(request):
+    return PlainTextResponse("ok")
+
+
+def _encoded(request):
+    return Response(gzip.compress(LARGE.encode()), headers={"Content-Encoding": "gzip"})
+
+
+def _stream(request):
+    async def lines():
+        for i in range(100):
+            yield f'{{"row": {i}}}\n'.encode()
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[
+        Route("/large", _large), Route("/small", _small), Route("/encoded", _encoded), Route("/stream", _stream),
+    ])
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    return TestClient(app)
+
+
+def test_large_responses_are_compressed(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(LARGE)
+    assert response.text == LARGE
+
+
+def test_small_and_unaccepted_responses_pass_through(client):
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.text == "ok"
+    identity = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert int(identity.headers["content-length"]) == len(LARGE)
+
+
+def test_encoded_responses_are_not_compressed_again(client):
+    response = client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+    assert response.text == LARGE
+
+
+def test_streams_are_compressed_as_they_stream(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.splitlines()[-1] == '{"row": 99}'
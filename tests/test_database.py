@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+import app.database
+from app.database import migrate_schema
+from app.models import Base
+
+# The clusters table as created by the first release
+OLD_CLUSTERS = """
+CREATE TABLE clusters (
+    id INTEGER PRIMARY KEY,
+    name VARCHAR NOT NULL UNIQUE,
+    namespace VARCHAR NOT NULL UNIQUE,
+    instance_type VARCHAR(9) NOT NULL,
+    cpu_per_instance FLOAT NOT NULL,
+    memory_per_instance FLOAT NOT NULL,
+    instance_count INTEGER NOT NULL,
+    owner_id INTEGER NOT NULL,
+    created_at DATETIME
+)
+"""
+
+
+@pytest.fixture
+def old_engine(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text(OLD_CLUSTERS))
+        conn.execute(text(
+            "INSERT INTO clusters (name, namespace, instance_type, cpu_per_instance, memory_per_instance,"
+            " instance_count, owner_id) VALUES ('c1', 'c1-ns', 'CONTAINER', 1, 1, 3, 1)"
+        ))
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(app.database, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def _columns(engine, table):
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+def test_missing_columns_are_added(old_engine):
+    assert "next_instance_index" not in _columns(old_engine, "clusters")
+    migrate_schema()
+    assert set(Base.metadata.tables["clusters"].columns.keys()) <= _columns(old_engine, "clusters")
+    with old_engine.connect() as conn:
+        assert conn.execute(text("SELECT name FROM clusters")).scalar() == "c1"
+
+
+def test_migration_is_idempotent(old_engine):
+    migrate_schema()
+    migrate_schema()
+    assert set(Base.metadata.tables["clusters"].columns.keys()) == _columns(old_engine, "clusters")
+
+
+def test_missing_indexes_are_created(old_engine):
+    def indexes():
+        return {index["name"] for index in inspect(old_engine).get_indexes("clusters")}
+
+    assert "ix_clusters_name" not in indexes()
+    migrate_schema()
+    assert {index.name for index in Base.metadata.tables["clusters"].indexes} <= indexes()
+
+
+def test_added_instance_index_continues_after_existing_instances(old_engine):
+    migrate_schema()
+    with old_engine.connect() as conn:
+        assert conn.execute(text("SELECT next_instance_index FROM clusters WHERE name = 'c1'")).scalar() == 3
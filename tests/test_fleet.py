@@ -0,0 +1,66 @@
+from app.fleet import apply_changes, fleet_summary, rebuild_counters
+from app.models import Instance, InstanceCounter, InstanceStatus
+
+
+def _counts(db):
+    return {
+        (owner_id, instance_type, status): count
+        for owner_id, instance_type, status, count in db.query(
+            InstanceCounter.owner_id, InstanceCounter.instance_type, InstanceCounter.status, InstanceCounter.count
+        )
+    }
+
+
+def test_rebuild_counts_existing_instances(db, cluster):
+    rebuild_counters(db)
+    assert _counts(db) == {(cluster.owner_id, "container", "running"): 2}
+
+
+def test_status_changes_move_counts(db, cluster):
+    rebuild_counters(db)
+    first, second = db.query(Instance).order_by(Instance.id).all()
+    apply_changes(db, [
+        (first, InstanceStatus.RUNNING, InstanceStatus.STOPPED),
+        (second, InstanceStatus.RUNNING, None),
+        (second, InstanceStatus.RUNNING, InstanceStatus.RUNNING),  # No change, ignored
+    ])
+    db.commit()
+    owner = cluster.owner_id
+    assert _counts(db) == {
+        (owner, "container", "running"): 0,
+        (owner, "container", "stopped"): 1,
+    }
+    summary = fleet_summary(db)
+    assert summary["totals"] == {"container": {"stopped": 1}}
+    assert summary["owners"] == {owner: {"container": {"stopped": 1}}}
+
+
+def test_deltas_accumulate_on_existing_rows(db, cluster):
+    first, second = db.query(Instance).order_by(Instance.id).all()
+    apply_changes(db, [(first, None, InstanceStatus.PENDING)])
+    apply_changes(db, [(second, None, InstanceStatus.PENDING)])
+    apply_changes(db, [(first, InstanceStatus.PENDING, InstanceStatus.RUNNING)])
+    db.commit()
+    owner = cluster.owner_id
+    assert _counts(db) == {
+        (owner, "container", "pending"): 1,
+        (owner, "container", "running"): 1,
+    }
+
+
+def test_instances_of_unknown_clusters_are_skipped(db, cluster):
+    orphan = Instance(cluster_id=cluster.id + 100, instance_name="orphan", status=InstanceStatus.RUNNING)
+    apply_changes(db, [(orphan, None, InstanceStatus.RUNNING)])
+    db.commit()
+    assert _counts(db) == {}
+
+
+def test_counters_match_a_recount(db, cluster):
+    first = db.query(Instance).order_by(Instance.id).first()
+    rebuild_counters(db)
+    first.status = InstanceStatus.SUSPENDED
+    apply_changes(db, [(first, InstanceStatus.RUNNING, InstanceStatus.SUSPENDED)])
+    db.commit()
+    incremental = {key: count for key, count in _counts(db).items() if count}
+    rebuild_counters(db)
+    assert _counts(db) == incremental
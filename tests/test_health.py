@@ -0,0 +1,92 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import app.health
+from app.config import settings
+from app.health import CachedCheck, readiness
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(app.health, "time", SimpleNamespace(
+        monotonic=lambda: clock.now, perf_counter=time.perf_counter, time=time.time
+    ))
+    return clock
+
+
+def test_result_is_reused_within_the_ttl(clock):
+    calls = []
+    check = CachedCheck("database", lambda: calls.append(1) or {"pool": "ok"}, ttl=5)
+    first = check.result()
+    clock.now += 4
+    assert check.result() is first
+    clock.now += 1
+    assert check.result() is not first
+    assert len(calls) == 2
+    assert first["healthy"] and first["pool"] == "ok"
+
+
+def test_failures_are_reported_not_raised(clock):
+    def check():
+        raise ConnectionError("connection refused")
+
+    result = CachedCheck("kubernetes", check, ttl=5).result()
+    assert result["healthy"] is False
+    assert result["error"] == "connection refused"
+    assert "latency_ms" in result
+
+
+def test_one_caller_refreshes_while_others_get_the_previous_result(clock):
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return {"call": len(calls)}
+
+    check = CachedCheck("kubernetes", slow, ttl=5)
+    check.result()
+    clock.now += 5
+    refresher = threading.Thread(target=check.result)
+    refresher.start()
+    while len(calls) < 2:
+        time.sleep(0.001)
+    # The refresh is in progress: no second refresh, the stale result is served
+    assert check.result()["call"] == 1
+    release.set()
+    refresher.join()
+    assert check.result()["call"] == 2
+    assert len(calls) == 2
+
+
+def _checks(monkeypatch, **healthy):
+    checks = {
+        name.replace("_", ":"): SimpleNamespace(result=lambda up=up: {"healthy": up})
+        for name, up in healthy.items()
+    }
+    monkeypatch.setattr(app.health, "checks", checks)
+
+
+def test_ready_with_database_and_a_target(monkeypatch):
+    _checks(monkeypatch, database=True, kubernetes_east=False, kubernetes_west=True)
+    assert readiness()["status"] == "ready"
+
+
+def test_unreachable_kubernetes_degrades(monkeypatch):
+    _checks(monkeypatch, database=True, kubernetes_east=False, kubernetes_west=False)
+    assert readiness()["status"] == "degraded"
+    monkeypatch.setattr(settings, "HEALTH_REQUIRE_K8S", True)
+    assert readiness()["status"] == "not_ready"
+
+
+def test_database_outage_is_not_ready(monkeypatch):
+    _checks(monkeypatch, database=False, kubernetes_east=True)
+    result = readiness()
+    assert result["status"] == "not_ready"
+    assert result["dependencies"]["kubernetes:east"] == {"healthy": True}
@@ -0,0 +1,84 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.k8s_service import pod_usage
+from app.live_usage import MAX_BACKOFF_SECONDS, NamespacePoller, UsageHistory
+
+KEY = ("east", "c1-ns")
+
+
+def _poll(second, **usage):
+    return {name: (f"2026-05-04T10:00:{second:02d}Z", cpu, 1.0) for name, cpu in usage.items()}
+
+
+def test_history_keeps_the_latest_samples():
+    history = UsageHistory(size=3)
+    for second in range(5):
+        history.record(KEY, _poll(second, **{"c1-instance-0": float(second)}))
+    assert [cpu for _, cpu, _ in history.samples(KEY, "c1-instance-0")] == [2.0, 3.0, 4.0]
+    assert history.latest(KEY, "c1-instance-0") == (datetime(2026, 5, 4, 10, 0, 4), 4.0, 1.0)
+
+
+def test_repeated_metrics_timestamps_are_recorded_once():
+    history = UsageHistory(size=10)
+    history.record(KEY, _poll(0, **{"c1-instance-0": 1.0}))
+    history.record(KEY, _poll(0, **{"c1-instance-0": 1.0}))
+    assert len(history.samples(KEY, "c1-instance-0")) == 1
+
+
+def test_instances_missing_from_a_poll_lose_their_history():
+    history = UsageHistory(size=10)
+    history.record(KEY, _poll(0, **{"c1-instance-0": 1.0, "c1-instance-1": 1.0}))
+    history.record(KEY, _poll(1, **{"c1-instance-1": 2.0}))
+    assert history.samples(KEY, "c1-instance-0") == []
+    assert len(history.samples(KEY, "c1-instance-1")) == 2
+    history.drop(KEY)
+    assert history.latest(KEY, "c1-instance-1") is None
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.failing = True
+
+    def get(self, target):
+        def list_pod_metrics(namespace):
+            if self.failing:
+                raise ConnectionError("refused")
+            return _poll(0, **{"c1-instance-0": 0.5})
+        return SimpleNamespace(list_pod_metrics=list_pod_metrics)
+
+
+def test_failing_namespace_backs_off_until_it_recovers():
+    registry, history = FakeRegistry(), UsageHistory(size=10)
+    poller = NamespacePoller(registry, KEY, history, interval=15)
+    assert [poller.poll() for _ in range(3)] == [30, 60, 120]
+    for _ in range(5):
+        poller.poll()
+    assert poller.poll() == MAX_BACKOFF_SECONDS
+    registry.failing = False
+    assert poller.poll() == 15
+    assert poller.failures == 0
+    assert history.latest(KEY, "c1-instance-0")[1] == 0.5
+
+
+def test_inactive_poller_records_nothing():
+    registry, history = FakeRegistry(), UsageHistory(size=10)
+    registry.failing = False
+    poller = NamespacePoller(registry, KEY, history, interval=15)
+    poller.active = False
+    poller.poll()
+    assert history.latest(KEY, "c1-instance-0") is None
+
+
+def test_pod_usage_sums_containers_and_names_vms_after_their_vm():
+    item = {
+        "metadata": {"name": "virt-launcher-cmp-vm-1a2b-xyz", "labels": {"vm.kubevirt.io/name": "cmp-vm-1a2b"}},
+        "containers": [
+            {"usage": {"cpu": "250m", "memory": "512Mi"}},
+            {"usage": {"cpu": "750000000n", "memory": "1536Mi"}},
+        ],
+    }
+    assert pod_usage(item) == ("cmp-vm-1a2b", pytest.approx(1.0), pytest.approx(2.0))
+    assert pod_usage({"metadata": {"name": "c1-instance-0"}, "containers": []}) == ("c1-instance-0", 0.0, 0.0)
@@ -0,0 +1,104 @@
+import json
+import logging
+import queue
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import app.logging_config
+from app.logging_config import JsonFormatter, NonBlockingQueueHandler, RateLimitFilter, SamplingFilter
+
+
+def _record(name="app.k8s_service", level=logging.INFO, msg="Created pod %s", args=("c1-instance-0",)):
+    return logging.LogRecord(name, level, __file__, 0, msg, args, None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(app.logging_config, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_filters_match_the_logger_and_its_children():
+    sampling = SamplingFilter("app.k8s_service", 0.0)
+    assert not sampling.filter(_record("app.k8s_service"))
+    assert not sampling.filter(_record("app.k8s_service.pods"))
+    assert sampling.filter(_record("app.k8s_service_extra"))
+    assert sampling.filter(_record("app.routers"))
+
+
+def test_sampling_keeps_a_fraction_below_warning(monkeypatch):
+    sampling = SamplingFilter("app", 0.25)
+    values = iter([0.1, 0.3, 0.2, 0.9])
+    monkeypatch.setattr(app.logging_config.random, "random", lambda: next(values))
+    assert [sampling.filter(_record()) for _ in range(4)] == [True, False, True, False]
+    assert sampling.filter(_record(level=logging.WARNING))
+
+
+def test_rate_limit_per_message_template(clock):
+    limiter = RateLimitFilter("app", per_second=1, burst=2)
+    # Every iteration of a loop shares the template, whatever its arguments
+    passed = [limiter.filter(_record(args=(f"c1-instance-{i}",))) for i in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert limiter.filter(_record(msg="Deleted pod %s"))
+
+
+def test_rate_limit_reports_suppressed_records(clock):
+    limiter = RateLimitFilter("app", per_second=1, burst=1)
+    first = _record()
+    assert limiter.filter(first)
+    assert first.suppressed == 0
+    for _ in range(3):
+        assert not limiter.filter(_record())
+    clock.now += 1
+    resumed = _record()
+    assert limiter.filter(resumed)
+    assert resumed.suppressed == 3
+
+
+def test_rate_limit_ignores_other_loggers(clock):
+    limiter = RateLimitFilter("app.k8s_service", per_second=1, burst=1)
+    assert all(limiter.filter(_record("app.routers")) for _ in range(5))
+
+
+def test_json_formatter_includes_extra_fields():
+    record = _record()
+    record.cluster_id = 7
+    record.trace_id, record.span_id = "a" * 32, "b" * 16
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"] == "Created pod c1-instance-0"
+    assert payload["level"] == "INFO"
+    assert payload["logger"] == "app.k8s_service"
+    assert payload["cluster_id"] == 7
+    assert payload["trace_id"] == "a" * 32
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    for _ in range(5):
+        handler.handle(_record())
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_warnings_are_never_rate_limited(clock):
+    limiter = RateLimitFilter("app", per_second=1, burst=1)
+    assert all(limiter.filter(_record(level=logging.WARNING)) for _ in range(5))
+
+
+def test_arguments_are_merged_before_the_hand_off():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    names = ["c1-instance-0"]
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = logging.LogRecord("app", logging.ERROR, __file__, 0, "Failed %s", (names,), sys.exc_info())
+    handler.handle(record)
+    names.append("c1-instance-1")  # Changed after logging, must not show up
+
+    queued = handler.queue.get_nowait()
+    assert queued.getMessage() == "Failed ['c1-instance-0']"
+    assert queued.args is None and queued.exc_info is None
+    assert "RuntimeError: boom" in json.loads(JsonFormatter().format(queued))["exc_info"]
@@ -0,0 +1,113 @@
+import threading
+
+from app.namespace_pool import CLUSTER_ANNOTATION, POOL_LABEL, NamespacePool
+
+
+class FakeNamespaces:
+    """Namespaces of one target with resource-version checked updates"""
+
+    def __init__(self):
+        self.name = "east"
+        self.core_api = None
+        self.namespaces = {}  # name -> {"labels", "annotations", "resource_version"}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _next_version(self):
+        self._version += 1
+        return str(self._version)
+
+    def create_namespace(self, name, labels=None):
+        with self._lock:
+            self.namespaces[name] = {
+                "labels": dict(labels or {}), "annotations": {}, "resource_version": self._next_version()
+            }
+        return True
+
+    def list_namespaces(self, label_selector):
+        key, value = label_selector.split("=")
+        with self._lock:
+            return {
+                name: namespace["resource_version"]
+                for name, namespace in self.namespaces.items()
+                if namespace["labels"].get(key) == value
+            }
+
+    def update_namespace_metadata(self, name, labels, annotations=None, resource_version=None):
+        with self._lock:
+            namespace = self.namespaces.get(name)
+            if namespace is None:
+                return False
+            if resource_version is not None and resource_version != namespace["resource_version"]:
+                return False
+            namespace["labels"].update(labels)
+            namespace["annotations"].update(annotations or {})
+            namespace["resource_version"] = self._next_version()
+            return True
+
+
+def _pool(service, size=3):
+    return NamespacePool(service, size=size, prefix="cmp-pool", refill_seconds=60)
+
+
+def test_refill_creates_missing_namespaces():
+    service = FakeNamespaces()
+    pool = _pool(service)
+    pool.refill()
+    assert len(service.list_namespaces(f"{POOL_LABEL}=available")) == 3
+    assert all(name.startswith("cmp-pool-") for name in service.namespaces)
+    pool.refill()
+    assert len(service.namespaces) == 3
+
+
+def test_claim_relabels_and_annotates():
+    service = FakeNamespaces()
+    pool = _pool(service)
+    pool.refill()
+    name = pool.claim("c1")
+    assert service.namespaces[name]["labels"][POOL_LABEL] == "claimed"
+    assert service.namespaces[name]["annotations"][CLUSTER_ANNOTATION] == "c1"
+
+
+def test_empty_pool_returns_none():
+    pool = _pool(FakeNamespaces(), size=1)
+    assert pool.claim("c1") is None
+    pool.refill()
+    assert pool.claim("c1") is not None
+    assert pool.claim("c2") is None
+
+
+def test_racing_replicas_claim_distinct_namespaces():
+    service = FakeNamespaces()
+    first, second = _pool(service), _pool(service)
+    first.refill()
+    second.refill()
+    claims, barrier = [], threading.Barrier(6)
+
+    def claim(pool, cluster):
+        barrier.wait()
+        claims.append(pool.claim(cluster))
+
+    threads = [
+        threading.Thread(target=claim, args=(pool, f"c{i}"))
+        for i, pool in enumerate([first, second] * 3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Both replicas listed the same three namespaces: each is claimed once
+    claimed = [name for name in claims if name is not None]
+    assert len(claimed) == 3
+    assert set(claimed) == set(service.namespaces)
+
+
+def test_released_namespace_becomes_available_again():
+    service = FakeNamespaces()
+    pool = _pool(service, size=1)
+    pool.refill()
+    name = pool.claim("c1")
+    pool.release(name)
+    pool.refill()
+    assert pool.claim("c2") == name
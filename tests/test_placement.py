@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+
+import app.placement
+from app.placement import PlacementScheduler
+
+
+class FakeRegistry:
+    def __init__(self, capacity, default="east"):
+        self.capacity = capacity
+        self.default = default
+        self.reads = []
+
+    def names(self):
+        return list(self.capacity)
+
+    def get(self, name):
+        def get_free_capacity():
+            self.reads.append(name)
+            if isinstance(self.capacity[name], Exception):
+                raise self.capacity[name]
+            return dict(self.capacity[name])
+        return SimpleNamespace(get_free_capacity=get_free_capacity)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(app.placement, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_single_target_is_used_without_reading_capacity(clock):
+    registry = FakeRegistry({"east": {"cpu": 0, "memory": 0}})
+    assert PlacementScheduler(registry, ttl=30).choose_target(4, 8) == "east"
+    assert registry.reads == []
+
+
+def test_most_free_cpu_among_targets_that_fit(clock):
+    registry = FakeRegistry({
+        "east": {"cpu": 8, "memory": 4},
+        "west": {"cpu": 6, "memory": 16},
+        "north": {"cpu": 5, "memory": 16},
+    })
+    assert PlacementScheduler(registry, ttl=30).choose_target(4, 8) == "west"
+
+
+def test_most_free_cpu_when_nothing_fits(clock):
+    registry = FakeRegistry({"east": {"cpu": 2, "memory": 2}, "west": {"cpu": 3, "memory": 1}})
+    assert PlacementScheduler(registry, ttl=30).choose_target(4, 8) == "west"
+
+
+def test_placements_are_deducted_until_the_next_refresh(clock):
+    registry = FakeRegistry({"east": {"cpu": 8, "memory": 16}, "west": {"cpu": 7, "memory": 16}})
+    scheduler = PlacementScheduler(registry, ttl=30)
+    assert [scheduler.choose_target(2, 2) for _ in range(3)] == ["east", "west", "east"]
+    assert len(registry.reads) == 2
+    clock.now += 30
+    assert scheduler.choose_target(2, 2) == "east"
+    assert len(registry.reads) == 4
+
+
+def test_unreadable_targets_are_skipped(clock):
+    registry = FakeRegistry({"east": ConnectionError("refused"), "west": {"cpu": 1, "memory": 1}})
+    assert PlacementScheduler(registry, ttl=30).choose_target(4, 8) == "west"
+
+
+def test_default_target_when_no_capacity_is_known(clock):
+    registry = FakeRegistry({"east": ConnectionError("refused"), "west": ConnectionError("refused")}, default="west")
+    assert PlacementScheduler(registry, ttl=30).choose_target(1, 1) == "west"
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+import app.replicas
+from app.cache import MemoryCache
+from app.replicas import ReplicaRouter, is_replica_session
+
+
+def _request(token=None):
+    return SimpleNamespace(headers={"authorization": f"Bearer {token}"} if token else {})
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(app.replicas, "cache", MemoryCache())
+    router = ReplicaRouter(["sqlite://", "sqlite://"], max_lag=5, check_interval=2)
+    yield router
+    for replica in router.replicas:
+        replica.engine.dispose()
+
+
+def _lags(router, *lags):
+    for replica, lag in zip(router.replicas, lags):
+        if isinstance(lag, Exception):
+            def measure(error=lag):
+                raise error
+        else:
+            def measure(lag=lag):
+                return lag
+        replica.measure_lag = measure
+    router.check()
+
+
+def _read(router, token=None):
+    db = router.session(_request(token))
+    try:
+        return db.info.get("replica") if is_replica_session(db) else "primary"
+    finally:
+        db.close()
+
+
+def test_reads_are_spread_over_healthy_replicas(router):
+    _lags(router, 0.0, 1.0)
+    assert [_read(router) for _ in range(4)] == ["replica-0", "replica-1"] * 2
+
+
+def test_lagging_and_failing_replicas_get_no_reads(router):
+    _lags(router, 6.0, 1.0)
+    assert {_read(router) for _ in range(4)} == {"replica-1"}
+    _lags(router, 0.0, ConnectionError("refused"))
+    assert {_read(router) for _ in range(4)} == {"replica-0"}
+    assert router.status() == {"replica-0": 0.0, "replica-1": None}
+
+
+def test_primary_without_a_usable_replica(router):
+    assert _read(router) == "primary"  # not measured yet
+    _lags(router, 10.0, ConnectionError("refused"))
+    assert _read(router) == "primary"
+
+
+def test_reads_after_a_write_go_to_the_primary(router):
+    _lags(router, 0.0, 0.0)
+    router.mark_write(_request("alice-token"))
+    assert _read(router, "alice-token") == "primary"
+    assert _read(router, "bob-token").startswith("replica-")
+    assert _read(router).startswith("replica-")
+
+
+def test_unauthenticated_writes_are_not_marked(router):
+    _lags(router, 0.0, 0.0)
+    router.mark_write(_request())
+    assert _read(router).startswith("replica-")
@@ -0,0 +1,136 @@
+from types import SimpleNamespace
+
+import pytest
+from kubernetes.client.rest import ApiException
+
+import app.resilience
+from app.config import settings
+from app.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(app.resilience, "time", SimpleNamespace(
+        monotonic=lambda: clock.now, sleep=lambda seconds: setattr(clock, "now", clock.now + seconds)
+    ))
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+
+def test_opens_after_consecutive_failures(breaker):
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_trial_through(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # Only one trial at a time
+
+
+def test_successful_trial_closes(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_trial_reopens(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+class FlakyCall:
+    """Fails with the given statuses, then succeeds"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def __call__(self, _request_timeout, **kwargs):
+        self.calls += 1
+        if self.statuses:
+            raise ApiException(status=self.statuses.pop(0))
+        return "ok"
+
+
+@pytest.fixture
+def caller(breaker, monkeypatch):
+    monkeypatch.setattr(settings, "K8S_RETRY_MAX_ATTEMPTS", 4)
+    monkeypatch.setattr(settings, "K8S_CALL_DEADLINE_SECONDS", 300.0)
+    return ResilientCaller("test", breaker)
+
+
+def test_retried_call_counts_once(caller, breaker):
+    flaky = FlakyCall(503, 503, 503)
+    assert caller.call("get", flaky) == "ok"
+    assert flaky.calls == 4
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failure_is_counted_after_the_retries(caller, breaker):
+    for _ in range(2):
+        with pytest.raises(ApiException):
+            caller.call("list", FlakyCall(503, 503, 503, 503))
+    assert breaker.state == CircuitBreaker.CLOSED
+    with pytest.raises(ApiException):
+        caller.call("list", FlakyCall(503, 503, 503, 503))
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        caller.call("list", FlakyCall())
+
+
+def test_half_open_trial_keeps_its_retries(caller, breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert caller.call("get", FlakyCall(503)) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_creates_are_not_retried(caller):
+    flaky = FlakyCall(503)
+    with pytest.raises(ApiException):
+        caller.call("create", flaky)
+    assert flaky.calls == 1
+
+
+def test_client_errors_do_not_open_the_circuit(caller, breaker):
+    for _ in range(5):
+        with pytest.raises(ApiException):
+            caller.call("get", FlakyCall(404))
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,102 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.schedules
+from app.models import Cluster, InstanceType, Schedule, ScheduleRun
+from app.schedules import ScheduleRunner, next_run_at
+
+EVERY_DAY = "mon,tue,wed,thu,fri,sat,sun"
+
+
+def test_local_time_follows_daylight_saving_start():
+    # Europe/Berlin moves from UTC+1 to UTC+2 on 2026-03-29
+    assert next_run_at("08:00", EVERY_DAY, "Europe/Berlin", datetime(2026, 3, 28, 12)) == datetime(2026, 3, 29, 6)
+    assert next_run_at("08:00", EVERY_DAY, "Europe/Berlin", datetime(2026, 3, 27, 12)) == datetime(2026, 3, 28, 7)
+
+
+def test_local_time_follows_daylight_saving_end():
+    # and back to UTC+1 on 2026-10-25
+    assert next_run_at("08:00", "sun", "Europe/Berlin", datetime(2026, 10, 24)) == datetime(2026, 10, 25, 7)
+
+
+def test_skipped_local_time_runs_once():
+    # 02:30 does not exist on the day clocks jump from 02:00 to 03:00
+    assert next_run_at("02:30", "sun", "Europe/Berlin", datetime(2026, 3, 28)) == datetime(2026, 3, 29, 1, 30)
+
+
+def test_repeated_local_time_runs_at_first_occurrence():
+    # 02:30 happens twice on the day clocks fall back, the schedule runs on the first
+    first = next_run_at("02:30", "sun", "Europe/Berlin", datetime(2026, 10, 24))
+    assert first == datetime(2026, 10, 25, 0, 30)
+    assert next_run_at("02:30", "sun", "Europe/Berlin", first) == datetime(2026, 11, 1, 1, 30)
+
+
+def test_weekdays_in_the_schedule_timezone():
+    # Monday 23:30 in New York is already Tuesday in UTC
+    assert next_run_at("23:30", "mon", "America/New_York", datetime(2026, 3, 9, 3)) == datetime(2026, 3, 10, 3, 30)
+
+
+def test_next_run_is_strictly_after():
+    assert next_run_at("09:00", EVERY_DAY, "UTC", datetime(2026, 5, 4, 9)) == datetime(2026, 5, 5, 9)
+    assert next_run_at("09:00", "mon", "UTC", datetime(2026, 5, 4, 9)) == datetime(2026, 5, 11, 9)
+
+
+def test_unknown_timezone():
+    with pytest.raises(ValueError):
+        next_run_at("09:00", "mon", "Mars/Olympus_Mons", datetime(2026, 5, 4))
+
+
+@pytest.fixture
+def runner(engine, monkeypatch):
+    monkeypatch.setattr(app.schedules, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    return ScheduleRunner(interval=60, batch_size=10, concurrency=4, rate=1000)
+
+
+def test_overlapping_schedules_of_one_cluster_run_in_due_order(runner, db, cluster, monkeypatch):
+    calls = []
+    running = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def action(name, done_key):
+        def run(db, cluster):
+            with lock:
+                overlaps.extend(other for other in running if other[1] == cluster.id)
+                running.append((name, cluster.id))
+                calls.append((name, cluster.id))
+            time.sleep(0.05)
+            with lock:
+                running.remove((name, cluster.id))
+            return {done_key: 1, "queued": 0, "failed": 0}
+        return run
+
+    monkeypatch.setattr(app.schedules, "ACTIONS", {
+        "suspend": (action("suspend", "suspended"), "suspended"),
+        "resume": (action("resume", "resumed"), "resumed"),
+    })
+    other = Cluster(name="c2", namespace="c2-ns", instance_type=InstanceType.CONTAINER, cpu_per_instance=1,
+                    memory_per_instance=1, instance_count=0, owner_id=cluster.owner_id)
+    db.add(other)
+    now = datetime(2026, 5, 4, 9)
+    # Claimed in one batch: the resume fell due after the suspend of the same cluster
+    db.add_all([
+        Schedule(owner_id=cluster.owner_id, cluster_id=cluster.id, action="resume", time_of_day="08:59",
+                 days=EVERY_DAY, next_run_at=now - timedelta(minutes=1)),
+        Schedule(owner_id=cluster.owner_id, cluster_id=cluster.id, action="suspend", time_of_day="08:58",
+                 days=EVERY_DAY, next_run_at=now - timedelta(minutes=2)),
+        Schedule(owner_id=cluster.owner_id, action="suspend", time_of_day="08:59",
+                 days=EVERY_DAY, next_run_at=now - timedelta(minutes=1)),
+    ])
+    db.commit()
+
+    assert runner.run_due(now) == 3
+    assert overlaps == []
+    assert [name for name, cluster_id in calls if cluster_id == cluster.id] == ["suspend", "resume", "suspend"]
+    assert [name for name, cluster_id in calls if cluster_id == other.id] == ["suspend"]
+    db.expire_all()
+    assert {schedule.last_status for schedule in db.query(Schedule)} == {"succeeded"}
+    assert db.query(ScheduleRun).count() == 4
@@ -0,0 +1,46 @@
+import importlib.util
+import random
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func
+
+from app.auth import find_user_by_token
+from app.fleet import fleet_summary
+from app.models import Cluster, Instance, User
+from app.tokens import hash_token
+
+SCRIPT = Path(__file__).parent.parent / "scripts" / "seed_data.py"
+
+
+@pytest.fixture(scope="module")
+def seed_data():
+    spec = importlib.util.spec_from_file_location("seed_data", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_seed_inserts_users_and_instances(engine, db, seed_data):
+    inserted = seed_data.seed(engine, users=20, instances=200, batch_size=16, rng=random.Random(1))
+    assert inserted["users"] == db.query(User).count() == 20
+    assert inserted["instances"] == db.query(Instance).count() <= 200
+    assert inserted["clusters"] == db.query(Cluster).count()
+    assert db.query(func.sum(Cluster.instance_count)).scalar() == inserted["instances"]
+
+    user = find_user_by_token(db, hash_token(seed_data.seed_token(inserted["first_user_id"])))
+    assert user.username == f"seed-user-{inserted['first_user_id']}"
+    clusters = db.query(Cluster).filter(Cluster.owner_id == user.id).all()
+    assert user.used_cpu == pytest.approx(sum(c.cpu_per_instance * c.instance_count for c in clusters))
+    assert all(c.next_instance_index == c.instance_count for c in clusters)
+
+    totals = fleet_summary(db)["totals"]
+    assert sum(sum(statuses.values()) for statuses in totals.values()) == inserted["instances"]
+
+
+def test_seed_appends_after_existing_rows(engine, db, cluster, seed_data):
+    inserted = seed_data.seed(engine, users=5, instances=20, rng=random.Random(2))
+    assert inserted["first_user_id"] == cluster.owner_id + 1
+    assert db.query(User).count() == 6
+    assert db.query(Instance).count() == 2 + inserted["instances"]
+    assert db.query(Cluster).filter(Cluster.name == "c1").one().instance_count == 2
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+
+from app.models import Cluster, InstanceType
+from app.schemas import ClusterResponse
+from app.serialization import (
+    FieldSelection, RowSerializer, cluster_serializer, instance_serializer, schema_columns
+)
+
+CLUSTER_ROW = (1, "c1", "c1-ns", InstanceType.VM, 2.0, 4.0, 3, 7, datetime(2026, 5, 4, 10, 30))
+
+
+def test_columns_follow_the_schema():
+    assert cluster_serializer.keys == [
+        name for name in ClusterResponse.model_fields if hasattr(Cluster, name)
+    ]
+
+
+def test_row_matches_the_response_model():
+    document = cluster_serializer.one(CLUSTER_ROW)
+    assert document == ClusterResponse(**dict(zip(cluster_serializer.keys, CLUSTER_ROW))).model_dump(mode="json")
+    assert document["instance_type"] == "vm"
+    assert document["created_at"] == "2026-05-04T10:30:00"
+
+
+def test_null_values_are_kept():
+    row = CLUSTER_ROW[:-1] + (None,)
+    assert cluster_serializer.one(row)["created_at"] is None
+
+
+def test_subset_keeps_column_order_and_is_reused():
+    subset = cluster_serializer.subset(["created_at", "name", "id"])
+    assert subset.keys == ["id", "name", "created_at"]
+    assert subset is cluster_serializer.subset(["id", "name", "created_at"])
+    assert subset.one((1, "c1", datetime(2026, 5, 4))) == {"id": 1, "name": "c1", "created_at": "2026-05-04T00:00:00"}
+    assert cluster_serializer.subset(cluster_serializer.keys) is cluster_serializer
+
+
+def test_many():
+    serializer = RowSerializer(schema_columns(Cluster, ClusterResponse)[:2])
+    assert serializer.many([(1, "a"), (2, "b")]) == [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+
+
+def _selection(fields):
+    return FieldSelection(fields, cluster_serializer, {"instances": instance_serializer})
+
+
+def test_selection_of_top_level_and_nested_fields():
+    selection = _selection("name, id,instances.status")
+    assert selection.serializer.keys == ["id", "name"]
+    assert selection.nested["instances"].keys == ["status"]
+
+
+def test_naming_a_collection_selects_all_of_its_fields():
+    assert _selection("id,instances").nested["instances"] is instance_serializer
+
+
+def test_unnamed_collections_are_left_out():
+    assert _selection("id").nested == {}
+
+
+def test_unknown_or_empty_fields_are_rejected():
+    with pytest.raises(ValueError, match="owner"):
+        _selection("id,owner")
+    with pytest.raises(ValueError, match="instances.size"):
+        _selection("instances.size")
+    with pytest.raises(ValueError):
+        _selection(" , ")
+
+
+def test_project_a_full_document():
+    document = cluster_serializer.one(CLUSTER_ROW)
+    document["instances"] = [{"id": 5, "status": "running", "instance_name": "c1-instance-0"}]
+    assert _selection("id,instances.status").project(document) == {"id": 1, "instances": [{"status": "running"}]}
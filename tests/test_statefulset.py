@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from kubernetes.client.rest import ApiException
+
+from app.k8s_service import STATEFULSET_LABEL, KubernetesService
+from app.models import InstanceStatus
+
+
+@pytest.fixture
+def service():
+    service = KubernetesService("test")
+    service.core_api = MagicMock()
+    service.apps_api = MagicMock()
+    return service
+
+
+def test_manifest_creates_pods_in_parallel(service):
+    manifest = service.get_statefulset_manifest("c1-instance", 3, 1.0, 2.0, "c1-ns")
+    spec = manifest["spec"]
+    assert manifest["metadata"] == {
+        "name": "c1-instance", "namespace": "c1-ns",
+        "labels": {"managed-by": "cmp", "instance-type": "container", STATEFULSET_LABEL: "c1-instance"},
+    }
+    assert spec["replicas"] == 3
+    assert spec["podManagementPolicy"] == "Parallel"
+    assert spec["selector"]["matchLabels"] == {STATEFULSET_LABEL: "c1-instance"}
+    assert spec["template"]["metadata"]["labels"][STATEFULSET_LABEL] == "c1-instance"
+    resources = spec["template"]["spec"]["containers"][0]["resources"]
+    assert resources["requests"] == {"cpu": "1.0", "memory": "2048Mi"}
+
+
+def test_create_is_one_call(service):
+    assert service.create_statefulset("c1-instance", 3, 1.0, 2.0, "c1-ns")
+    service.apps_api.create_namespaced_stateful_set.assert_called_once()
+    service.apps_api.patch_namespaced_stateful_set_scale.assert_not_called()
+
+
+def test_existing_statefulset_is_scaled_instead(service):
+    service.apps_api.create_namespaced_stateful_set.side_effect = ApiException(status=409)
+    assert service.create_statefulset("c1-instance", 3, 1.0, 2.0, "c1-ns")
+    scale = service.apps_api.patch_namespaced_stateful_set_scale
+    scale.assert_called_once()
+    assert scale.call_args.kwargs["body"] == {"spec": {"replicas": 3}}
+
+
+def test_missing_statefulset_counts_as_deleted(service):
+    service.apps_api.delete_namespaced_stateful_set.side_effect = ApiException(status=404)
+    assert service.delete_statefulset("c1-instance", "c1-ns")
+
+
+def _pod(name, phase):
+    return SimpleNamespace(metadata=SimpleNamespace(name=name), status=SimpleNamespace(phase=phase))
+
+
+def test_statuses_of_all_pods_from_one_list(service):
+    service.core_api.list_namespaced_pod.return_value = SimpleNamespace(items=[
+        _pod("c1-instance-0", "Running"), _pod("c1-instance-1", "Pending"), _pod("c1-instance-2", "Failed"),
+    ])
+    assert service.get_statefulset_statuses("c1-instance", "c1-ns") == {
+        "c1-instance-0": InstanceStatus.RUNNING,
+        "c1-instance-1": InstanceStatus.PENDING,
+        "c1-instance-2": InstanceStatus.FAILED,
+    }
+    list_pods = service.core_api.list_namespaced_pod
+    list_pods.assert_called_once()
+    assert list_pods.call_args.kwargs["label_selector"] == f"{STATEFULSET_LABEL}=c1-instance"
+
+
+def test_unreadable_statuses_are_none(service):
+    service.core_api.list_namespaced_pod.side_effect = ApiException(status=403)
+    assert service.get_statefulset_statuses("c1-instance", "c1-ns") is None
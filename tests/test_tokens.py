@@ -0,0 +1,47 @@
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+import app.database
+from app.auth import find_user_by_token
+from app.database import hash_legacy_tokens
+from app.models import User
+from app.tokens import TOKEN_PREFIX_LENGTH, hash_token, token_prefix
+
+
+def test_tokens_are_stored_as_keyed_digests(db, cluster):
+    user = db.query(User).filter(User.username == "alice").one()
+    assert user.token_hash == hash_token("alice-token") != "alice-token"
+    assert len(user.token_hash) == 64
+    assert user.token_prefix == token_prefix(user.token_hash)
+    assert len(user.token_prefix) == TOKEN_PREFIX_LENGTH
+
+
+def test_lookup_by_digest(db, cluster):
+    assert find_user_by_token(db, hash_token("alice-token")).username == "alice"
+    assert find_user_by_token(db, hash_token("bob-token")) is None
+
+
+def test_lookup_compares_the_full_digest(db, cluster):
+    user = db.query(User).filter(User.username == "alice").one()
+    # Same prefix, different digest
+    forged = user.token_prefix + "0" * (64 - TOKEN_PREFIX_LENGTH)
+    assert find_user_by_token(db, forged) is None
+
+
+def test_legacy_plaintext_tokens_are_hashed(engine, db, monkeypatch):
+    with engine.begin() as conn:
+        for name in ("alice", "bob", "carol"):
+            conn.execute(text(
+                "INSERT INTO users (username, token, quota_cpu, quota_memory, used_cpu, used_memory)"
+                " VALUES (:name, :token, 10, 10, 0, 0)"
+            ), {"name": name, "token": f"{name}-token"})
+    monkeypatch.setattr(app.database, "SessionLocal", sessionmaker(bind=engine))
+
+    hash_legacy_tokens(batch_size=2)
+
+    assert db.query(User).filter(User.token_prefix.is_(None)).count() == 0
+    for name in ("alice", "bob", "carol"):
+        assert find_user_by_token(db, hash_token(f"{name}-token")).username == name
+    # Already hashed rows are left alone on the next start
+    hash_legacy_tokens()
+    assert find_user_by_token(db, hash_token("bob-token")).username == "bob"
@@ -0,0 +1,111 @@
+import logging
+import sys
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import tracing
+from app.config import settings
+
+
+def test_helpers_are_no_ops_when_disabled():
+    @tracing.traced
+    def add(a, b):
+        return a + b
+
+    assert not tracing.tracing_enabled()
+    assert add(1, 2) == 3
+    with tracing.start_span("unused") as span:
+        assert span is None
+    assert tracing.get_finished_spans() == []
+
+
+def test_otlp_without_its_package_falls_back_to_the_file(monkeypatch, tmp_path, caplog):
+    monkeypatch.setitem(sys.modules, "opentelemetry.exporter.otlp.proto.grpc.trace_exporter", None)
+    monkeypatch.setattr(settings, "TRACING_FILE_PATH", str(tmp_path / "traces.jsonl"))
+    exporter = tracing._build_exporter("otlp")
+    assert isinstance(exporter, tracing.FileSpanExporter)
+    assert exporter.path == str(tmp_path / "traces.jsonl")
+    assert "opentelemetry-exporter-otlp-proto-grpc" in caplog.text
+
+
+@pytest.fixture(scope="module")
+def spans():
+    """Tracing with the in-memory exporter; the tracer provider can only be set once per process"""
+    enabled, exporter = settings.TRACING_ENABLED, settings.TRACING_EXPORTER
+    settings.TRACING_ENABLED, settings.TRACING_EXPORTER = True, "memory"
+    assert tracing.setup_tracing()
+    yield tracing._memory_exporter
+    tracing.shutdown_tracing()
+    settings.TRACING_ENABLED, settings.TRACING_EXPORTER = enabled, exporter
+
+
+@pytest.fixture
+def finished(spans):
+    spans.clear()
+    return tracing.get_finished_spans
+
+
+def test_traced_records_arguments_and_failure(finished):
+    @tracing.traced(name="k8s.create")
+    def create(instance_name, cpu, succeed=True):
+        return succeed
+
+    create("c1-instance-0", 2.0)
+    create("c1-instance-1", 1.0, succeed=False)
+
+    ok, failed = finished()
+    assert ok.name == "k8s.create"
+    assert ok.attributes["arg.instance_name"] == "c1-instance-0"
+    assert ok.attributes["arg.cpu"] == 2.0
+    assert ok.attributes["result.success"] is True
+    assert ok.status.is_ok
+    assert failed.attributes["result.success"] is False
+    assert not failed.status.is_ok
+
+
+def test_bound_context_parents_spans_in_other_threads(finished):
+    def work():
+        with tracing.start_span("worker"):
+            pass
+
+    with tracing.start_span("request") as parent:
+        thread = threading.Thread(target=tracing.bind_context(work))
+        thread.start()
+        thread.join()
+
+    worker, request = finished()
+    assert worker.parent.span_id == parent.get_span_context().span_id
+    assert worker.context.trace_id == request.context.trace_id
+
+
+def test_server_span_continues_the_incoming_trace(finished):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    headers = {"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"}
+    with tracing.server_span("GET /clusters", headers):
+        pass
+
+    (span,) = finished()
+    assert format(span.context.trace_id, "032x") == trace_id
+    assert format(span.parent.span_id, "016x") == "00f067aa0ba902b7"
+
+
+def test_sql_statements_get_client_spans(finished):
+    engine = create_engine("sqlite://")
+    tracing.instrument_engine(engine)
+    with tracing.start_span("request"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    statement = next(span for span in finished() if span.name == "db.select")
+    assert statement.attributes["db.statement"] == "SELECT 1"
+    assert statement.attributes["db.system"] == "sqlite"
+
+
+def test_log_records_carry_the_trace_id(spans):
+    record = logging.LogRecord("test", logging.INFO, __file__, 0, "message", None, None)
+    with tracing.start_span("request") as span:
+        tracing.TraceContextFilter().filter(record)
+    assert record.trace_id == format(span.get_span_context().trace_id, "032x")
+    assert record.span_id == format(span.get_span_context().span_id, "016x")
@@ -0,0 +1,100 @@
+import asyncio
+
+import orjson
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.auth import find_user_by_token, require_admin
+from app.config import settings
+from app.models import Base, ImportCheckpoint
+from app.tokens import hash_token
+from app.transfer import EXPORT_TABLES, Importer, InvalidExport, export_lines
+
+
+@pytest.fixture
+def target():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _rows(engine):
+    with engine.connect() as conn:
+        return {
+            name: [tuple(row) for row in conn.execute(select(Base.metadata.tables[name]).order_by("id"))]
+            for name in EXPORT_TABLES
+        }
+
+
+def test_export_format(engine, cluster):
+    lines = [orjson.loads(line) for line in export_lines(engine)]
+    assert lines[0]["format"] == "kubekloud-export" and lines[0]["export_id"]
+    assert [line["table"] for line in lines[1:-1]] == ["users", "clusters", "instances", "instances"]
+    assert lines[-1] == {"end": True, "rows": {"users": 1, "clusters": 1, "instances": 2}}
+
+
+def test_round_trip(engine, cluster, target):
+    importer = Importer(target, batch_size=1)
+    importer.feed(export_lines(engine))
+    result = importer.finish()
+    assert result["inserted"] == {"users": 1, "clusters": 1, "instances": 2}
+    assert result["resumed_from"] is None
+    assert _rows(target) == _rows(engine)
+    with Session(target) as db:
+        # Tokens travel as digests and still authenticate
+        assert find_user_by_token(db, hash_token("alice-token")).username == "alice"
+
+
+def test_truncated_import_resumes_after_its_checkpoint(engine, cluster, target):
+    lines = list(export_lines(engine))
+    interrupted = Importer(target, batch_size=1)
+    interrupted.feed(lines[:4])  # header, user, cluster, first instance
+    with pytest.raises(InvalidExport, match="ended early"):
+        interrupted.finish()
+    with Session(target) as db:
+        checkpoint = db.get(ImportCheckpoint, interrupted.export_id)
+        assert (checkpoint.table_name, checkpoint.completed_at) == ("instances", None)
+
+    resumed = Importer(target, batch_size=1)
+    resumed.feed(lines)
+    result = resumed.finish()
+    assert result["resumed_from"] == {"table": "instances", "id": checkpoint.last_id}
+    assert result["skipped"] == 3
+    assert result["inserted"] == {"users": 0, "clusters": 0, "instances": 1}
+    assert _rows(target) == _rows(engine)
+
+    # A completed import is not applied twice
+    again = Importer(target, batch_size=1)
+    again.feed(lines)
+    assert again.finish()["skipped"] == 4
+
+
+def test_invalid_streams_are_rejected(target):
+    with pytest.raises(InvalidExport, match="header"):
+        Importer(target).feed([b'{"table": "users", "row": {"id": 1}}\n'])
+    with pytest.raises(InvalidExport, match="JSON"):
+        Importer(target).feed([b"not json\n"])
+    with pytest.raises(InvalidExport, match="empty"):
+        Importer(target).finish()
+
+
+def _admin(token):
+    return asyncio.run(require_admin(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)))
+
+
+def test_transfer_requires_the_admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    with pytest.raises(HTTPException) as disabled:
+        _admin("anything")
+    assert disabled.value.status_code == 403
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    with pytest.raises(HTTPException) as wrong:
+        _admin("alice-token")
+    assert wrong.value.status_code == 401
+    _admin("admin-secret")
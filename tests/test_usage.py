@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.usage
+from app.models import Instance, InstanceStatus, UsageEvent, UsageRollup
+from app.usage import UsageAggregator
+
+
+@pytest.fixture
+def aggregator(engine, monkeypatch):
+    monkeypatch.setattr(app.usage, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    return UsageAggregator(interval=60, delay=0, max_hours=100)
+
+
+def _event(db, cluster, instance, status, occurred_at):
+    db.add(UsageEvent(
+        instance_id=instance.id, cluster_id=cluster.id, owner_id=cluster.owner_id,
+        cpu=cluster.cpu_per_instance, memory=cluster.memory_per_instance,
+        status=status.value, occurred_at=occurred_at
+    ))
+    db.commit()
+
+
+def _rollups(db, granularity):
+    return {
+        row.period_start: row.instance_hours
+        for row in db.query(UsageRollup).filter(UsageRollup.granularity == granularity)
+    }
+
+
+def test_instances_running_at_start_are_charged_per_hour(db, cluster, aggregator):
+    assert aggregator.roll_up(now=datetime(2026, 5, 4, 10, 30)) == 0
+    assert aggregator.roll_up(now=datetime(2026, 5, 4, 12, 10)) == 2
+    rows = db.query(UsageRollup).order_by(UsageRollup.period_start).all()
+    assert [(row.period_start.hour, row.instance_hours, row.cpu_hours, row.memory_gb_hours) for row in rows] == [
+        (10, 2.0, 2.0, 2.0), (11, 2.0, 2.0, 2.0)
+    ]
+
+
+def test_status_changes_split_the_hour(db, cluster, aggregator):
+    aggregator.roll_up(now=datetime(2026, 5, 4, 10, 0))
+    first = db.query(Instance).order_by(Instance.id).first()
+    _event(db, cluster, first, InstanceStatus.STOPPED, datetime(2026, 5, 4, 10, 30))
+    _event(db, cluster, first, InstanceStatus.RUNNING, datetime(2026, 5, 4, 11, 15))
+    aggregator.roll_up(now=datetime(2026, 5, 4, 12, 0))
+    assert _rollups(db, "hour") == {datetime(2026, 5, 4, 10): 1.5, datetime(2026, 5, 4, 11): 1.75}
+
+
+def test_completed_days_are_rolled_up(db, cluster, aggregator):
+    aggregator.roll_up(now=datetime(2026, 5, 4, 22, 0))
+    aggregator.roll_up(now=datetime(2026, 5, 5, 2, 0))
+    assert _rollups(db, "hour") == {
+        datetime(2026, 5, 4, 22): 2.0, datetime(2026, 5, 4, 23): 2.0,
+        datetime(2026, 5, 5, 0): 2.0, datetime(2026, 5, 5, 1): 2.0,
+    }
+    assert _rollups(db, "day") == {datetime(2026, 5, 4): 4.0}
+
+
+def test_idle_hours_are_skipped_up_to_midnight(db, cluster, aggregator):
+    aggregator.roll_up(now=datetime(2026, 5, 4, 8, 0))
+    for instance in db.query(Instance).all():
+        _event(db, cluster, instance, InstanceStatus.STOPPED, datetime(2026, 5, 4, 8, 30))
+    # 08:00-09:00, 09:00-midnight in one window, then the next day up to 10:00
+    assert aggregator.roll_up(now=datetime(2026, 5, 5, 10, 0)) == 3
+    assert _rollups(db, "hour") == {datetime(2026, 5, 4, 8): 1.0}
+    assert _rollups(db, "day") == {datetime(2026, 5, 4): 1.0}
+
+
+def test_rolled_up_hours_are_not_repeated(db, cluster, aggregator):
+    aggregator.roll_up(now=datetime(2026, 5, 4, 10, 0))
+    aggregator.roll_up(now=datetime(2026, 5, 4, 11, 0))
+    assert aggregator.roll_up(now=datetime(2026, 5, 4, 11, 30)) == 0
+    assert db.query(UsageRollup).count() == 1
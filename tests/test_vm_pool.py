@@ -0,0 +1,177 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.config import settings
+from app.k8s_service import MANAGED_BY_LABEL, MANAGED_BY_VALUE, KubernetesService
+from app.models import Cluster, Instance, InstanceStatus, InstanceType
+from app.vm_pool import INSTANCE_ANNOTATION, POOL_LABEL, SHAPE_LABEL, VMPool, VMPools
+
+
+class FakeVMs:
+    """VirtualMachines of one target with resource-version checked claims"""
+
+    def __init__(self, name="east"):
+        self.name = name
+        self.custom_api = None
+        self.namespaces = set()
+        self.vms = {}  # name -> {"labels", "annotations", "running", "resource_version"}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _next_version(self):
+        self._version += 1
+        return str(self._version)
+
+    def create_namespace(self, name, labels=None):
+        self.namespaces.add(name)
+        return True
+
+    def create_stopped_vm(self, name, cpu, memory, namespace, labels):
+        with self._lock:
+            self.vms[name] = {
+                "labels": dict(labels), "annotations": {}, "running": False,
+                "shape": (cpu, memory), "resource_version": self._next_version(),
+            }
+        return True
+
+    def list_vms(self, namespace, label_selector):
+        key, value = label_selector.split("=")
+        with self._lock:
+            return {
+                name: {"labels": dict(vm["labels"]), "resource_version": vm["resource_version"]}
+                for name, vm in self.vms.items() if vm["labels"].get(key) == value
+            }
+
+    def claim_vm(self, name, namespace, labels, annotations, resource_version):
+        with self._lock:
+            vm = self.vms.get(name)
+            if vm is None or vm["resource_version"] != resource_version:
+                return False
+            vm["labels"].update(labels)
+            vm["annotations"].update(annotations)
+            vm["running"] = True
+            vm["resource_version"] = self._next_version()
+            return True
+
+
+def _pool(service, shapes=None):
+    return VMPool(service, shapes or {"2x4": 2, "1x2": 1}, namespace="cmp-vm-pool", refill_seconds=60)
+
+
+def test_refill_creates_stopped_vms_per_shape():
+    service = FakeVMs()
+    _pool(service).refill()
+    assert service.namespaces == {"cmp-vm-pool"}
+    shapes = sorted(vm["labels"][SHAPE_LABEL] for vm in service.vms.values())
+    assert shapes == ["1x2", "2x4", "2x4"]
+    assert not any(vm["running"] for vm in service.vms.values())
+    assert {vm["shape"] for vm in service.vms.values()} == {(2.0, 4.0), (1.0, 2.0)}
+
+
+def test_pooled_vm_launcher_pods_use_up_capacity_reservations():
+    service = KubernetesService("test")
+    service.custom_api = MagicMock()
+    assert service.create_stopped_vm("cmp-vm-1", 2, 4, "cmp-vm-pool", labels={POOL_LABEL: "available"})
+    body = service.custom_api.create_namespaced_custom_object.call_args.kwargs["body"]
+    assert body["spec"]["running"] is False
+    assert body["spec"]["template"]["metadata"]["labels"][MANAGED_BY_LABEL] == MANAGED_BY_VALUE
+
+
+def test_shapes_are_normalised():
+    assert _pool(FakeVMs(), {"2.0x4.0": 1, "0.5x1": 1}).shapes == {"2x4": 1, "0.5x1": 1}
+
+
+def test_claim_starts_a_vm_of_the_shape():
+    service = FakeVMs()
+    pool = _pool(service)
+    pool.refill()
+    name = pool.claim(1.0, 2.0, "c1-instance-0")
+    vm = service.vms[name]
+    assert vm["running"] and vm["labels"][SHAPE_LABEL] == "1x2"
+    assert vm["labels"][POOL_LABEL] == "claimed"
+    assert vm["labels"]["app"] == "c1-instance-0"
+    assert vm["annotations"][INSTANCE_ANNOTATION] == "c1-instance-0"
+    assert pool.claim(1.0, 2.0, "c1-instance-1") is None
+
+
+def test_unknown_shape_is_not_claimed():
+    pool = _pool(FakeVMs())
+    pool.refill()
+    assert pool.claim(4.0, 8.0, "c1-instance-0") is None
+
+
+def test_refill_replaces_claimed_vms():
+    service = FakeVMs()
+    pool = _pool(service)
+    pool.refill()
+    pool.claim(2.0, 4.0, "c1-instance-0")
+    pool.refill()
+    assert len(service.list_vms("cmp-vm-pool", f"{POOL_LABEL}=available")) == 3
+    assert len(service.vms) == 4
+
+
+def test_racing_replicas_claim_distinct_vms():
+    service = FakeVMs()
+    first, second = _pool(service), _pool(service)
+    first.refill()
+    second.refill()
+    claims, barrier = [], threading.Barrier(4)
+
+    def claim(pool, instance):
+        barrier.wait()
+        claims.append(pool.claim(2.0, 4.0, instance))
+
+    threads = [
+        threading.Thread(target=claim, args=(pool, f"c1-instance-{i}"))
+        for i, pool in enumerate([first, second] * 2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    claimed = [name for name in claims if name is not None]
+    assert len(claimed) == len(set(claimed)) == 2
+
+
+class FakeRegistry:
+    default = "east"
+
+    def __init__(self, service):
+        self.service = service
+
+    def services(self):
+        return [self.service]
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    monkeypatch.setattr(settings, "VM_POOL_SHAPES", {"2x4": 1})
+    service = FakeVMs()
+    pools = VMPools(FakeRegistry(service))
+    pools.pools["east"].refill()
+    return pools
+
+
+def _cluster(instance_type=InstanceType.VM):
+    return Cluster(name="c1", namespace="c1-ns", instance_type=instance_type,
+                   cpu_per_instance=2.0, memory_per_instance=4.0, instance_count=1)
+
+
+def test_claimed_vm_backs_the_instance(pools):
+    instance = Instance(instance_name="c1-instance-0", status=InstanceStatus.PENDING)
+    assert pools.claim(_cluster(), instance)
+    assert instance.k8s_namespace == "cmp-vm-pool"
+    assert instance.k8s_resource_name in pools.pools["east"].service.vms
+    assert instance.status == InstanceStatus.RUNNING
+
+    second = Instance(instance_name="c1-instance-1", status=InstanceStatus.PENDING)
+    assert not pools.claim(_cluster(), second)
+    assert second.k8s_resource_name is None
+
+
+def test_containers_are_never_pooled(pools):
+    instance = Instance(instance_name="c1-instance-0", status=InstanceStatus.PENDING)
+    assert not pools.claim(_cluster(InstanceType.CONTAINER), instance)
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from app.cache import cache, instance_status_key
+from app.config import settings
+from app.models import Instance, InstanceStatus, Operation, OperationKind, OperationStatus
+from app.work_queue import claim_operations, complete_operation, enqueue_operation, renew_lease
+
+
+def _enqueue_stop(db, cluster):
+    instance = db.query(Instance).filter(Instance.cluster_id == cluster.id).first()
+    operation = enqueue_operation(db, OperationKind.STOP_INSTANCE, cluster, instance,
+                                  target_status=InstanceStatus.SUSPENDED)
+    db.commit()
+    return operation.id, instance.id
+
+
+def test_claimed_operation_is_leased_to_one_worker(db, cluster):
+    _enqueue_stop(db, cluster)
+    assert len(claim_operations(db, "worker-a", 10)) == 1
+    assert claim_operations(db, "worker-b", 10) == []
+
+
+def test_expired_lease_is_reclaimed_and_stale_completion_dropped(db, cluster, monkeypatch):
+    operation_id, instance_id = _enqueue_stop(db, cluster)
+    monkeypatch.setattr(settings, "WORK_QUEUE_LEASE_SECONDS", -1.0)
+    [stale] = claim_operations(db, "worker-a", 10)
+    monkeypatch.setattr(settings, "WORK_QUEUE_LEASE_SECONDS", 60.0)
+
+    [current] = claim_operations(db, "worker-b", 10)
+    assert current.lease_owner == "worker-b"
+    assert current.attempts == 2
+    assert not renew_lease(db, stale, "worker-a")
+
+    assert complete_operation(db, current, "worker-b", False, "boom")
+    assert not complete_operation(db, stale, "worker-a", True)
+
+    operation = db.get(Operation, operation_id)
+    assert operation.status == OperationStatus.QUEUED
+    assert operation.last_error == "boom"
+    assert db.get(Instance, instance_id).status == InstanceStatus.PENDING
+
+
+def test_completion_applies_target_status(db, cluster):
+    operation_id, instance_id = _enqueue_stop(db, cluster)
+    [operation] = claim_operations(db, "worker-a", 10)
+    assert renew_lease(db, operation, "worker-a")
+    assert complete_operation(db, operation, "worker-a", True)
+
+    operation = db.get(Operation, operation_id)
+    assert operation.status == OperationStatus.SUCCEEDED
+    assert operation.lease_owner is None
+    assert db.get(Instance, instance_id).status == InstanceStatus.SUSPENDED
+
+
+def test_last_failed_attempt_restores_previous_status(db, cluster, monkeypatch):
+    monkeypatch.setattr(settings, "WORK_QUEUE_MAX_ATTEMPTS", 1)
+    operation_id, instance_id = _enqueue_stop(db, cluster)
+    [operation] = claim_operations(db, "worker-a", 10)
+    assert complete_operation(db, operation, "worker-a", False, "boom")
+
+    assert db.get(Operation, operation_id).status == OperationStatus.FAILED
+    assert db.get(Instance, instance_id).status == InstanceStatus.RUNNING
+
+
+def test_retry_waits_for_backoff(db, cluster):
+    operation_id, _ = _enqueue_stop(db, cluster)
+    [operation] = claim_operations(db, "worker-a", 10)
+    complete_operation(db, operation, "worker-a", False, "boom")
+
+    assert claim_operations(db, "worker-a", 10) == []
+    db.get(Operation, operation_id).available_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert len(claim_operations(db, "worker-a", 10)) == 1
+
+
+def test_cached_instance_status_is_dropped(db, cluster):
+    instance = db.query(Instance).filter(Instance.cluster_id == cluster.id).first()
+    cache.set(instance_status_key(instance.id), InstanceStatus.RUNNING.value, ttl=60)
+    operation_id, instance_id = _enqueue_stop(db, cluster)
+    assert cache.get(instance_status_key(instance_id)) is None
+
+    cache.set(instance_status_key(instance_id), InstanceStatus.RUNNING.value, ttl=60)
+    [operation] = claim_operations(db, "worker-a", 10)
+    assert complete_operation(db, operation, "worker-a", True)
+    assert cache.get(instance_status_key(instance_id)) is None